@@ -0,0 +1,20 @@
+"""
+Agent Registry - Short names for the agent classes
+
+Shared by the parameter sweep and the benchmark suite so neither has to
+import the other. Agent modules are imported on first use.
+"""
+
+import importlib
+
+AGENT_CLASSES = {
+    "stockagent": ("stockagent", "StockAgentTrader"),
+    "fingpt": ("fingpt", "FinGPTAgent"),
+    "tradingagents": ("tradingagents", "TradingAgentsSystem"),
+}
+
+
+def load_agent_class(key):
+    """Import and return the agent class registered under `key`"""
+    module_name, class_name = AGENT_CLASSES[key]
+    return getattr(importlib.import_module(module_name), class_name)
@@ -0,0 +1,398 @@
+"""
+Compact Agent State - Struct-of-arrays ledgers and bounded decision history
+
+The simulator owns one AgentLedger and attaches every registered agent to it:
+
+    ledger = AgentLedger(["STOCK"])
+    ledger.attach(agent)
+
+After attaching, agent.cash / agent.positions read and write rows of the
+shared arrays instead of per-agent floats and dicts, so 10k agents cost a few
+hundred KB of ledger memory (sweep.BacktestMarket attaches the agents
+registered with it). Only cash and positions move: the concrete agents
+still carry a __dict__ for their other attributes, since the framework's
+BaseTradingAgent declares no __slots__.
+
+Decision history lives in a DecisionRing with a fixed capacity; evicted
+decisions go to an optional spill sink (e.g. the trade log) instead of
+growing forever. close_spills(agents) writes out
+whatever the sinks still buffer when a run ends.
+
+Every recorded decision carries the simulation tick it was made on and a
+confidence (NaN when the agent's model gives none), so stores can index
+decisions by tick rather than by position in the history.
+"""
+
+import json
+import sys
+import numpy as np
+
+ACTION_CODES = {"hold": 0, "buy": 1, "sell": 2}
+ACTION_NAMES = {code: name for name, code in ACTION_CODES.items()}
+
+
+# ============================================================================
+# SHARED LEDGER
+# ============================================================================
+
+class AgentLedger:
+    """Cash, positions and last-decision fields for all agents, one row each"""
+
+    def __init__(self, symbols, capacity=1024):
+        self.symbols = list(symbols)
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.size = 0
+        self.slots = {}
+        self._allocate(max(1, capacity))
+
+    def _allocate(self, capacity):
+        """Create (or grow) the column arrays to hold `capacity` agents"""
+        columns = {
+            "agent_ids": np.zeros(capacity, dtype=np.int64),
+            "starting_cash": np.zeros(capacity, dtype=np.float64),
+            "cash": np.zeros(capacity, dtype=np.float64),
+            "positions": np.zeros((capacity, len(self.symbols)), dtype=np.int64),
+            "last_action": np.zeros(capacity, dtype=np.int8),
+            "last_quantity": np.zeros(capacity, dtype=np.int64),
+            "decision_count": np.zeros(capacity, dtype=np.int64),
+        }
+        for name, array in columns.items():
+            old = getattr(self, name, None)
+            if old is not None:
+                array[:self.size] = old[:self.size]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def add(self, agent_id, starting_cash, positions=None):
+        """Reserve a row for an agent and return its slot"""
+        if agent_id in self.slots:
+            raise ValueError(f"Agent {agent_id} already has ledger slot {self.slots[agent_id]}")
+
+        if self.size == self.capacity:
+            self._allocate(self.capacity * 2)
+
+        slot = self.size
+        self.size += 1
+        self.slots[agent_id] = slot
+        self.agent_ids[slot] = agent_id
+        self.starting_cash[slot] = starting_cash
+        self.cash[slot] = starting_cash
+        for symbol, quantity in (positions or {}).items():
+            self.positions[slot, self._symbol_column(symbol)] = quantity
+        return slot
+
+    def attach(self, agent):
+        """Move an agent's cash/positions into the ledger and bind it to its row"""
+        cash = agent.cash
+        positions = dict(agent.positions)
+        slot = self.add(agent.agent_id, cash, positions)
+        agent._ledger = self
+        agent._slot = slot
+        agent._cash = None
+        agent._positions = None
+        return slot
+
+    def _symbol_column(self, symbol):
+        column = self.symbol_index.get(symbol)
+        if column is None:
+            column = len(self.symbols)
+            self.symbols.append(symbol)
+            self.symbol_index[symbol] = column
+            self.positions = np.hstack([
+                self.positions,
+                np.zeros((self.capacity, 1), dtype=self.positions.dtype)
+            ])
+        return column
+
+    def record_decision(self, slot, decision):
+        """Store the last-decision fields for one agent"""
+        self.last_action[slot] = ACTION_CODES.get(decision.get("action", "hold"), 0)
+        try:
+            self.last_quantity[slot] = int(decision.get("quantity", 0) or 0)
+        except (TypeError, ValueError):
+            self.last_quantity[slot] = 0
+        self.decision_count[slot] += 1
+
+    def equity(self, prices):
+        """Vectorized cash + marked positions for every agent"""
+        marks = np.array([prices.get(symbol, 0.0) for symbol in self.symbols])
+        n = self.size
+        return self.cash[:n] + self.positions[:n] @ marks
+
+    @property
+    def nbytes(self):
+        return sum(
+            getattr(self, name).nbytes
+            for name in ("agent_ids", "starting_cash", "cash", "positions",
+                         "last_action", "last_quantity", "decision_count")
+        )
+
+    def bytes_per_agent(self):
+        return self.nbytes / self.capacity
+
+
+class PositionView:
+    """Dict-like view of one ledger row, used as agent.positions"""
+
+    __slots__ = ("_ledger", "_slot")
+
+    def __init__(self, ledger, slot):
+        self._ledger = ledger
+        self._slot = slot
+
+    def __getitem__(self, symbol):
+        column = self._ledger.symbol_index.get(symbol)
+        if column is None:
+            raise KeyError(symbol)
+        return int(self._ledger.positions[self._slot, column])
+
+    def __setitem__(self, symbol, quantity):
+        column = self._ledger._symbol_column(symbol)
+        self._ledger.positions[self._slot, column] = quantity
+
+    def _held(self):
+        """Symbols with a nonzero position in this row"""
+        row = self._ledger.positions[self._slot]
+        return [symbol for symbol, quantity in zip(self._ledger.symbols, row) if quantity]
+
+    def __contains__(self, symbol):
+        return self.get(symbol) != 0
+
+    def __iter__(self):
+        return iter(self._held())
+
+    def __len__(self):
+        return len(self._held())
+
+    def get(self, symbol, default=0):
+        column = self._ledger.symbol_index.get(symbol)
+        if column is None:
+            return default
+        return int(self._ledger.positions[self._slot, column])
+
+    def items(self):
+        return [(symbol, self[symbol]) for symbol in self._held()]
+
+    def keys(self):
+        return self._held()
+
+    def values(self):
+        return [self[symbol] for symbol in self._held()]
+
+    def __repr__(self):
+        return f"PositionView({dict(self.items())})"
+
+
+class LedgerStateMixin:
+    """Routes agent.cash / agent.positions to an AgentLedger row once attached"""
+
+    __slots__ = ("_ledger", "_slot", "_cash", "_positions")
+
+    @property
+    def cash(self):
+        ledger = getattr(self, "_ledger", None)
+        if ledger is None:
+            return self._cash
+        return float(ledger.cash[self._slot])
+
+    @cash.setter
+    def cash(self, value):
+        ledger = getattr(self, "_ledger", None)
+        if ledger is None:
+            self._ledger = None
+            self._cash = value
+        else:
+            ledger.cash[self._slot] = value
+
+    @property
+    def positions(self):
+        ledger = getattr(self, "_ledger", None)
+        if ledger is None:
+            if getattr(self, "_positions", None) is None:
+                self._positions = {}
+            return self._positions
+        return PositionView(ledger, self._slot)
+
+    @positions.setter
+    def positions(self, value):
+        ledger = getattr(self, "_ledger", None)
+        if ledger is None:
+            self._ledger = None
+            self._positions = value
+        else:
+            ledger.positions[self._slot, :] = 0
+            for symbol, quantity in value.items():
+                ledger.positions[self._slot, ledger._symbol_column(symbol)] = quantity
+
+    def _begin_tick(self, simulator):
+        """Note the simulation tick this on_tick call decides for"""
+        self.current_tick = simulation_tick(self, simulator)
+        return self.current_tick
+
+    def _record_decision(self, decision):
+        """Append to the bounded history and update the ledger's last-decision row"""
+        decision["tick"] = getattr(self, "current_tick", None)
+        decision.setdefault("confidence", float("nan"))
+        self.decisions.append(decision)
+        ledger = getattr(self, "_ledger", None)
+        if ledger is not None:
+            ledger.record_decision(self._slot, decision)
+
+
+def simulation_tick(agent, simulator):
+    """
+    The simulator's tick counter when it keeps one (TickScheduler proxies,
+    BacktestMarket), else one past the agent's previous tick
+    """
+    tick = getattr(simulator, "tick", None)
+    if isinstance(tick, (int, np.integer)) and not isinstance(tick, bool):
+        return int(tick)
+    previous = getattr(agent, "current_tick", None)
+    return 0 if previous is None else previous + 1
+
+
+def account_view(agent, simulator):
+    """
+    (cash, positions) an agent should decide on: the scheduler's snapshot when
+    it runs off the tick loop (async mode), otherwise its live state
+    """
+    snapshots = getattr(simulator, "account_snapshots", None)
+    if snapshots and agent.agent_id in snapshots:
+        return snapshots[agent.agent_id]
+    return agent.cash, agent.positions
+
+
+# ============================================================================
+# BOUNDED DECISION HISTORY
+# ============================================================================
+
+class DecisionRing:
+    """Fixed-capacity decision history; evicted entries go to `spill` if set"""
+
+    __slots__ = ("capacity", "spill", "total", "_items", "_start", "_count")
+
+    def __init__(self, capacity=256, spill=None):
+        self.capacity = max(1, capacity)
+        self.spill = spill
+        self.total = 0
+        self._items = [None] * self.capacity
+        self._start = 0
+        self._count = 0
+
+    def append(self, item):
+        if self._count < self.capacity:
+            self._items[(self._start + self._count) % self.capacity] = item
+            self._count += 1
+        else:
+            evicted = self._items[self._start]
+            self._items[self._start] = item
+            self._start = (self._start + 1) % self.capacity
+            if self.spill is not None:
+                self.spill(evicted)
+        self.total += 1
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._items[(self._start + i) % self.capacity]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("decision index out of range")
+        return self._items[(self._start + index) % self.capacity]
+
+    def last(self):
+        return self[-1] if self._count else None
+
+    def clear(self):
+        self._items = [None] * self.capacity
+        self._start = 0
+        self._count = 0
+
+    def nbytes(self):
+        """Approximate retained bytes (list plus shallow size of each entry)"""
+        return sys.getsizeof(self._items) + sum(
+            sys.getsizeof(item) for item in self if item is not None
+        )
+
+
+class JsonlSpill:
+    """Spill sink that appends evicted decisions to a JSON-lines trade log"""
+
+    def __init__(self, path, agent_name=None, buffer_size=256):
+        self.path = path
+        self.agent_name = agent_name
+        self.buffer_size = buffer_size
+        self._buffer = []
+
+    def __call__(self, decision):
+        record = dict(decision)
+        if self.agent_name:
+            record.setdefault("agent", self.agent_name)
+        self._buffer.append(json.dumps(record, default=str))
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        with open(self.path, "a") as f:
+            f.write("\n".join(self._buffer) + "\n")
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+
+
+def close_spills(agents):
+    """Flush and close the spill sink of every agent's decision rings (run teardown)"""
+    for agent in agents:
+        for name in ("decisions", "analyst_reports"):
+            ring = getattr(agent, name, None)
+            close = getattr(getattr(ring, "spill", None), "close", None)
+            if close is not None:
+                close()
+
+
+# ============================================================================
+# MEMORY REPORTING
+# ============================================================================
+
+def agent_memory_bytes(agent):
+    """Approximate bytes held by one agent, including its share of the ledger"""
+    total = sys.getsizeof(agent)
+    instance_dict = getattr(agent, "__dict__", None)
+    if instance_dict is not None:
+        total += sys.getsizeof(instance_dict)
+
+    for name in ("decisions", "analyst_reports"):
+        history = getattr(agent, name, None)
+        if isinstance(history, DecisionRing):
+            total += history.nbytes()
+        elif history is not None:
+            total += sys.getsizeof(history) + sum(sys.getsizeof(h) for h in history)
+
+    ledger = getattr(agent, "_ledger", None)
+    if ledger is not None:
+        total += ledger.bytes_per_agent()
+    else:
+        total += sys.getsizeof(agent.positions)
+    return total
+
+
+def memory_report(agents):
+    """Per-agent memory summary: {"agents", "total_bytes", "bytes_per_agent", "max_bytes"}"""
+    sizes = [agent_memory_bytes(agent) for agent in agents]
+    total = sum(sizes)
+    return {
+        "agents": len(sizes),
+        "total_bytes": total,
+        "bytes_per_agent": total / len(sizes) if sizes else 0,
+        "max_bytes": max(sizes) if sizes else 0,
+    }
@@ -0,0 +1,262 @@
+"""
+End-to-End Benchmark Suite
+
+Runs each agent class at several population sizes against a local fake LLM
+server and records ticks/sec, LLM calls/sec, p50/p99 decision latency and
+peak RSS. Each case runs in a fresh process so peak RSS is per case.
+
+Cases replay a seeded random-walk price series through market_data.DataFeed
+and sweep.BacktestMarket, so only in-repo modules (plus the agent classes'
+framework base) are needed.
+
+    python benchmark.py                                   # default matrix
+    python benchmark.py --agents stockagent --sizes 1 10 --ticks 20
+    python benchmark.py --compare results/benchmark_<old>.json
+    python benchmark.py --decision-store results/decisions   # keep every decision
+
+Results are written as JSON (one file per commit) so two runs can be
+diffed with --compare.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import multiprocessing
+
+from agent_registry import AGENT_CLASSES, load_agent_class
+from fake_llm_server import FakeLLMServer, LATENCY_DISTRIBUTIONS
+
+# Metrics where a higher value is better; everything else is lower-is-better
+HIGHER_IS_BETTER = {"ticks_per_sec", "llm_calls_per_sec"}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+# ============================================================================
+# SINGLE CASE (runs in a child process)
+# ============================================================================
+
+def synthetic_feed(cache_dir, start, interval, bars, seed=7, price=100.0, volatility=0.002):
+    """DataFeed over a seeded random-walk STOCK series written to cache_dir"""
+    import numpy as np
+    from market_data import DataFeed, convert_file
+
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0.0, volatility, bars)))
+    first = int(np.datetime64(start, "ns").astype(np.int64))
+    timestamps = first + np.arange(bars, dtype=np.int64) * int(interval.total_seconds() * 1e9)
+    source = os.path.join(cache_dir, "STOCK.npz")
+    np.savez(source, timestamp=timestamps, close=close, volume=np.full(bars, 10000.0))
+    convert_file(source, cache_dir, "STOCK")
+    return DataFeed(cache_dir, ["STOCK"])
+
+
+def run_case(agent_key, population, ticks, api_base, mode, decision_store=None):
+    """Benchmark one agent class at one population size (decision_store: directory to keep decisions in)"""
+    import openai
+    from agent_state import memory_report
+    from decision_store import DecisionStore
+    from market_data import to_ns
+    from sweep import BacktestMarket
+    from tick_scheduler import TickScheduler
+
+    class ReplayScheduler(TickScheduler):
+        """Moves the feed onto each tick and settles the market after it"""
+
+        def step(self, current_time):
+            self.simulator.feed.seek(to_ns(current_time))
+            super().step(current_time)
+            self.simulator.end_tick()
+
+    openai.api_base = api_base
+    openai.api_key = "fake-benchmark-key"
+
+    class_name = AGENT_CLASSES[agent_key][1]
+    try:
+        agent_class = load_agent_class(agent_key)
+    except ImportError as e:
+        raise RuntimeError(f"Cannot import {class_name} ({e}); the agent classes need the "
+                           f"framework package (framework.simulator.base_agent) on PYTHONPATH") from e
+
+    start = datetime(2025, 1, 1, 9, 30)
+    interval = timedelta(minutes=1)
+    cache_dir = tempfile.mkdtemp(prefix="benchmark_")
+    sim = BacktestMarket(synthetic_feed(cache_dir, start, interval, ticks))
+
+    agents = []
+    for agent_id in range(1, population + 1):
+        agent = agent_class(agent_id, f"{class_name}-{agent_id}", 10000)
+        sim.register_agent(agent_id, agent)
+        agents.append(agent)
+
+    scheduler = ReplayScheduler(sim, agents, mode=mode, tick_interval=interval,
+                                max_workers=min(64, population))
+
+    store = DecisionStore(decision_store) if decision_store else None
+    started = time.perf_counter()
+    scheduler.run(start, start + interval * ticks, decision_store=store,
+                  run_id=f"{agent_key}-{population}-{mode}")
+    elapsed = time.perf_counter() - started
+    if store is not None:
+        store.close()
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+    latencies = list(scheduler.decision_latencies)
+    return {
+        "agent": agent_key,
+        "population": population,
+        "ticks": ticks,
+        "mode": mode,
+        "elapsed_sec": elapsed,
+        "ticks_per_sec": ticks / elapsed if elapsed > 0 else 0.0,
+        "decisions": scheduler.stats["decisions"],
+        "decision_latency_p50_ms": percentile(latencies, 50) * 1000,
+        "decision_latency_p99_ms": percentile(latencies, 99) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+        "bytes_per_agent": memory_report(agents)["bytes_per_agent"],
+    }
+
+
+# ============================================================================
+# SUITE
+# ============================================================================
+
+def run_suite(agents, sizes, ticks, mode, latency, latency_ms, error_rate, decision_store=None):
+    cases = []
+    context = multiprocessing.get_context("spawn")
+
+    with FakeLLMServer(latency=latency, latency_ms=latency_ms, error_rate=error_rate) as server:
+        for agent_key in agents:
+            for population in sizes:
+                server.reset_stats()
+                print(f"→ {agent_key} x {population} agents, {ticks} ticks ({mode})")
+
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    case = pool.submit(run_case, agent_key, population, ticks,
+                                       server.api_base, mode, decision_store).result()
+
+                case["llm_calls"] = server.stats["requests"]
+                case["llm_errors"] = server.stats["errors"]
+                case["llm_calls_per_sec"] = (
+                    server.stats["requests"] / case["elapsed_sec"] if case["elapsed_sec"] > 0 else 0.0
+                )
+                cases.append(case)
+                print(f"  ✓ {case['ticks_per_sec']:.2f} ticks/s, "
+                      f"{case['llm_calls_per_sec']:.1f} LLM calls/s, "
+                      f"p50 {case['decision_latency_p50_ms']:.1f} ms, "
+                      f"p99 {case['decision_latency_p99_ms']:.1f} ms, "
+                      f"peak RSS {case['peak_rss_mb']:.1f} MB")
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "ticks": ticks, "mode": mode, "latency": latency,
+            "latency_ms": latency_ms, "error_rate": error_rate,
+        },
+        "cases": cases,
+    }
+
+
+def compare(baseline, current, threshold=0.10):
+    """Print per-metric deltas between two result files; return regressions"""
+    key = lambda case: (case["agent"], case["population"], case["mode"])
+    old_cases = {key(case): case for case in baseline["cases"]}
+    regressions = []
+
+    print(f"\nComparing {baseline.get('commit')} → {current.get('commit')}")
+    print("-" * 80)
+    for case in current["cases"]:
+        old = old_cases.get(key(case))
+        if old is None:
+            continue
+        for metric in ("ticks_per_sec", "llm_calls_per_sec", "decision_latency_p50_ms",
+                       "decision_latency_p99_ms", "peak_rss_mb"):
+            before, after = old.get(metric, 0), case.get(metric, 0)
+            if not before:
+                continue
+            change = (after - before) / before
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = "✗" if worse > threshold else "✓"
+            if worse > threshold:
+                regressions.append((key(case), metric, before, after))
+            print(f"  {flag} {case['agent']:<14} n={case['population']:<5} "
+                  f"{metric:<26} {before:>10.2f} → {after:>10.2f} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark trading agents against a fake LLM server")
+    parser.add_argument("--agents", nargs="+", choices=sorted(AGENT_CLASSES), default=sorted(AGENT_CLASSES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 10, 100])
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync")
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="result file (default: results/benchmark_<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="regression threshold (fraction)")
+    parser.add_argument("--decision-store", help="directory to keep every case's decisions in (DecisionStore)")
+    args = parser.parse_args()
+
+    results = run_suite(args.agents, args.sizes, args.ticks, args.mode,
+                        args.latency, args.latency_ms, args.error_rate, args.decision_store)
+
+    output = args.output or os.path.join("results", f"benchmark_{results['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Results saved: {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+        print("\n✓ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Checkpoints - Periodic, incremental snapshots of a running simulation
+
+A snapshot is a set of named components. Each is pickled, hashed and stored
+once as a zlib-compressed blob:
+
+    rng             random / numpy global RNG state
+    ledger          AgentLedger columns
+    execution       pending ExecutionEngine orders (the simulated book)
+    feed            DataFeed position
+    scheduler       TickScheduler tick counter and stats
+    agent/<id>      agent attributes, including DecisionRing contents
+
+Blobs are content-addressed, so components that did not change since the
+last checkpoint (idle agents, an empty order book) are never rewritten.
+The tick thread only copies state; pickling, compression and disk writes
+happen on a background thread, and a checkpoint that comes due while the
+previous one is still waiting to be written is skipped, before any state is
+copied, rather than waited for.
+
+Resuming restores every component into freshly built objects. Combined with
+an llm_client ResponseCache recorded in "read_write" mode (and replayed in
+"replay" mode), the resumed run makes the same decisions as the original.
+
+    checkpointer = Checkpointer("results/checkpoint", capture=lambda: capture_simulation(agents, ledger))
+    scheduler.run(start, end, checkpointer=checkpointer)
+
+    snapshot = load_checkpoint("results/checkpoint")
+    restore_simulation(snapshot["components"], agents, ledger)
+    scheduler.resume(snapshot)
+"""
+
+import copy
+import hashlib
+import json
+import os
+import pickle
+import queue
+import random
+import threading
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from agent_state import DecisionRing
+
+MANIFEST = "manifest.json"
+LEDGER_COLUMNS = ("agent_ids", "starting_cash", "cash", "positions",
+                  "last_action", "last_quantity", "decision_count")
+ORDER_COLUMNS = ("order_ids", "agent_ids", "symbol_codes", "sides", "remaining",
+                 "reference_prices", "release_ns")
+# Live bindings that are re-created, not restored
+SKIPPED_ATTRIBUTES = ("_ledger", "_slot", "speculator")
+
+
+# ============================================================================
+# CAPTURE / RESTORE
+# ============================================================================
+
+def _slot_names(obj):
+    names = []
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get("__slots__", ())
+        names.extend([slots] if isinstance(slots, str) else slots)
+    return [n for n in names if n not in ("__dict__", "__weakref__")]
+
+
+def _copy_value(value):
+    if isinstance(value, DecisionRing):
+        return {"__ring__": True, "capacity": value.capacity, "total": value.total, "items": list(value)}
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if isinstance(value, (list, dict, set)):
+        return copy.copy(value)
+    return value
+
+
+def capture_agent(agent):
+    """Shallow copy of an agent's slots and attributes; rings become plain lists"""
+    state = {}
+    for name in _slot_names(agent):
+        if name in SKIPPED_ATTRIBUTES or not hasattr(agent, name):
+            continue
+        state[name] = _copy_value(getattr(agent, name))
+    for name, value in getattr(agent, "__dict__", {}).items():
+        if name not in SKIPPED_ATTRIBUTES:
+            state[name] = _copy_value(value)
+    if getattr(agent, "_ledger", None) is not None:
+        # Cash and positions live in the ledger component
+        state.pop("_cash", None)
+        state.pop("_positions", None)
+    return state
+
+
+def restore_agent(agent, state):
+    for name, value in state.items():
+        if isinstance(value, dict) and value.get("__ring__"):
+            ring = getattr(agent, name, None)
+            spill = ring.spill if isinstance(ring, DecisionRing) else None
+            ring = DecisionRing(value["capacity"], spill)
+            for item in value["items"]:
+                ring.append(item)
+            ring.total = value["total"]
+            value = ring
+        setattr(agent, name, value)
+
+
+def capture_ledger(ledger):
+    n = ledger.size
+    state = {name: getattr(ledger, name)[:n].copy() for name in LEDGER_COLUMNS}
+    state["symbols"] = list(ledger.symbols)
+    state["slots"] = dict(ledger.slots)
+    return state
+
+
+def restore_ledger(ledger, state):
+    n = len(state["agent_ids"])
+    ledger.symbols = list(state["symbols"])
+    ledger.symbol_index = {symbol: i for i, symbol in enumerate(ledger.symbols)}
+    ledger.size = 0
+    # Drop the old columns so _allocate does not copy stale rows over
+    for name in LEDGER_COLUMNS:
+        setattr(ledger, name, None)
+    ledger._allocate(max(ledger.capacity, n))
+    for name in LEDGER_COLUMNS:
+        getattr(ledger, name)[:n] = state[name]
+    ledger.size = n
+    ledger.slots = dict(state["slots"])
+
+
+def capture_execution(engine):
+    n = engine.size
+    state = {name: getattr(engine, name)[:n].copy() for name in ORDER_COLUMNS}
+    state["symbols"] = list(engine.symbols)
+    state["next_order_id"] = engine.next_order_id
+    state["stats"] = dict(engine.stats)
+    return state
+
+
+def restore_execution(engine, state):
+    n = len(state["order_ids"])
+    engine.symbols = list(state["symbols"])
+    engine.symbol_index = {symbol: i for i, symbol in enumerate(engine.symbols)}
+    engine.size = 0
+    engine._allocate(max(engine.capacity, n))
+    for name in ORDER_COLUMNS:
+        getattr(engine, name)[:n] = state[name]
+    engine.size = n
+    engine.next_order_id = state["next_order_id"]
+    engine.stats.update(state["stats"])
+
+
+def capture_rng():
+    return {"random": random.getstate(), "numpy": np.random.get_state()}
+
+
+def restore_rng(state):
+    random.setstate(state["random"])
+    np.random.set_state(state["numpy"])
+
+
+def capture_simulation(agents, ledger=None, execution=None, feed=None, extra=None):
+    """Component dict for one snapshot; cheap copies only, safe to serialize later"""
+    components = {"rng": capture_rng()}
+    if ledger is not None:
+        components["ledger"] = capture_ledger(ledger)
+    if execution is not None:
+        components["execution"] = capture_execution(execution)
+    if feed is not None:
+        components["feed"] = {"current_time": feed.current_time, "cursor": dict(feed._cursor)}
+    for agent in agents:
+        components[f"agent/{agent.agent_id}"] = capture_agent(agent)
+    for name, value in (extra or {}).items():
+        components[name] = _copy_value(value)
+    return components
+
+
+def restore_simulation(components, agents, ledger=None, execution=None, feed=None):
+    """Load a snapshot's components back into freshly constructed objects"""
+    restore_rng(components["rng"])
+    if ledger is not None and "ledger" in components:
+        restore_ledger(ledger, components["ledger"])
+    if execution is not None and "execution" in components:
+        restore_execution(execution, components["execution"])
+    if feed is not None and "feed" in components:
+        feed.current_time = components["feed"]["current_time"]
+        feed._cursor = dict(components["feed"]["cursor"])
+    for agent in agents:
+        state = components.get(f"agent/{agent.agent_id}")
+        if state is not None:
+            restore_agent(agent, state)
+
+
+# ============================================================================
+# CHECKPOINT WRITER
+# ============================================================================
+
+class Checkpointer:
+    """Writes content-addressed snapshots on a background thread"""
+
+    def __init__(self, directory, capture, every_ticks=100, every_seconds=None, compress_level=1):
+        self.directory = Path(directory)
+        self.blob_dir = self.directory / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.capture = capture
+        self.every_ticks = every_ticks
+        self.every_seconds = every_seconds
+        self.compress_level = compress_level
+
+        self.sequence = 0
+        self._last_tick = None
+        self._last_time = time.monotonic()
+        self._queue = queue.Queue(maxsize=1)
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        self.stats = {"saved": 0, "skipped": 0, "blobs_written": 0, "blobs_reused": 0,
+                      "bytes_written": 0, "capture_seconds": 0.0}
+        self.error = None
+
+    def due(self, tick):
+        if self._last_tick is None:
+            self._last_tick = tick
+            return False
+        if self.every_ticks and tick - self._last_tick >= self.every_ticks:
+            return True
+        return bool(self.every_seconds) and time.monotonic() - self._last_time >= self.every_seconds
+
+    def after_tick(self, tick, current_time, extra=None):
+        """Call once per tick; snapshots when due without blocking the loop"""
+        if self.due(tick):
+            self.save(tick, current_time, extra)
+
+    def save(self, tick, current_time, extra=None, block=False):
+        """
+        Capture now and hand the snapshot to the writer; False if skipped.
+        extra may be a callable returning components, evaluated before capture.
+        """
+        if not block and self._queue.full():
+            # Previous snapshot still waiting for the writer: skip before paying
+            # for the capture, the loop never waits
+            self.stats["skipped"] += 1
+            return False
+
+        started = time.perf_counter()
+        extra = extra() if callable(extra) else extra
+        components = self.capture()
+        components.update(extra or {})
+        self.stats["capture_seconds"] += time.perf_counter() - started
+        self._last_tick = tick
+        self._last_time = time.monotonic()
+
+        self.sequence += 1
+        job = {"sequence": self.sequence, "tick": tick, "current_time": current_time,
+               "components": components}
+        # Only this thread puts, so a queue that was not full still has room
+        self._queue.put(job)
+        return True
+
+    def _write_loop(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            try:
+                self._write(job)
+            except Exception as e:
+                self.error = e
+                print(f"✗ Checkpoint {job['sequence']} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, job):
+        blobs = {}
+        for name, value in job["components"].items():
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            digest = hashlib.sha1(payload).hexdigest()
+            path = self.blob_dir / digest
+            if path.exists():
+                self.stats["blobs_reused"] += 1
+            else:
+                data = zlib.compress(payload, self.compress_level)
+                tmp = path.with_suffix(".tmp")
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+                self.stats["blobs_written"] += 1
+                self.stats["bytes_written"] += len(data)
+            blobs[name] = digest
+
+        manifest = {
+            "sequence": job["sequence"],
+            "tick": job["tick"],
+            "current_time": pickle.dumps(job["current_time"]).hex(),
+            "written_at": time.time(),
+            "components": blobs,
+        }
+        tmp = self.directory / (MANIFEST + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.directory / MANIFEST)
+        self.stats["saved"] += 1
+
+        # Blobs no longer referenced by the current manifest
+        live = set(blobs.values())
+        for path in self.blob_dir.iterdir():
+            if path.name not in live and not path.name.endswith(".tmp"):
+                path.unlink()
+
+    def flush(self):
+        """Wait until every queued snapshot is on disk"""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+
+
+def load_checkpoint(directory):
+    """Latest snapshot as {"sequence", "tick", "current_time", "components"}, or None"""
+    directory = Path(directory)
+    manifest_path = directory / MANIFEST
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+
+    components = {}
+    for name, digest in manifest["components"].items():
+        with open(directory / "blobs" / digest, "rb") as f:
+            components[name] = pickle.loads(zlib.decompress(f.read()))
+    return {
+        "sequence": manifest["sequence"],
+        "tick": manifest["tick"],
+        "current_time": pickle.loads(bytes.fromhex(manifest["current_time"])),
+        "components": components,
+    }
@@ -0,0 +1,129 @@
+"""
+Trading Agent CLI - One entry point for running and inspecting simulations
+
+    python cli.py sample            - Sample data for all agents (no API calls)
+    python cli.py run               - Real agent code (requires OPENAI_API_KEY)
+    python cli.py view [csv|charts] - Show results / open CSV / open charts
+    python cli.py view live [--url] - Watch a running simulation's live metrics
+    python cli.py trend             - Did the market go up or down?
+    python cli.py compare           - Metrics table + significance tests
+    python cli.py report [--force]  - Regenerate CSVs, xlsx, summary and charts
+
+Each subcommand imports what it needs inside its handler, so `view` and
+`trend` never load openai, pandas or scipy.
+"""
+
+import argparse
+import sys
+
+
+def cmd_run(args):
+    import run_simulations
+    run_simulations.main(mode=2)
+
+
+def cmd_sample(args):
+    import run_simulations
+    run_simulations.main(mode=1)
+
+
+def cmd_view(args):
+    import view_results
+    if args.target == "csv":
+        view_results.open_csv_in_excel()
+    elif args.target == "charts":
+        view_results.open_visualizations()
+    elif args.target == "live":
+        view_results.watch_live(args.url, args.refresh)
+    else:
+        view_results.view_results()
+
+
+def cmd_trend(args):
+    import check_market_trend
+    check_market_trend.check_market_trend()
+
+
+def cmd_compare(args):
+    from metrics import load_results, compute_metrics
+
+    results = load_results(args.results_dir)
+    if not results:
+        print(f"✗ No results found in {args.results_dir}/")
+        print("  Run a simulation first: python cli.py sample")
+        return 1
+
+    print("=" * 80)
+    print("AGENT COMPARISON")
+    print("=" * 80)
+    print(f"\n{'agent':<16}{'trades':>8}{'win rate':>10}{'total profit':>16}"
+          f"{'avg profit':>14}{'sharpe':>9}{'PF':>7}")
+    print("-" * 80)
+    for result in results.values():
+        m = compute_metrics(result)
+        print(f"{m['agent']:<16}{m['total_trades']:>8}{m['win_rate']:>9.1f}%"
+              f"{m['total_profit']:>16.2f}{m['average_profit']:>14.2f}"
+              f"{m['sharpe_ratio']:>9.3f}{m['profit_factor']:>7.2f}")
+
+    if args.no_stats:
+        return 0
+
+    try:
+        from metrics import significance_tests
+        tests = significance_tests(results)
+    except ImportError:
+        print("\n⚠ scipy not installed - skipping significance tests")
+        return 0
+
+    print("\nStatistical significance (two-sample t-test on trade profits):")
+    print("-" * 80)
+    for name, test in tests.items():
+        verdict = "SIGNIFICANT" if test["significant"] else "NOT SIGNIFICANT"
+        print(f"  {name}: p-value {test['p_value']:.4f} ({verdict})")
+    return 0
+
+
+def cmd_report(args):
+    from reports import build_reports
+    summary = build_reports(args.results_dir, args.viz_dir, args.workers, args.force)
+    return 1 if summary["failed"] else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Trading agent comparison toolkit")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("run", help="run real agent code (requires OPENAI_API_KEY)").set_defaults(func=cmd_run)
+    subparsers.add_parser("sample", help="generate sample results (no API calls)").set_defaults(func=cmd_sample)
+
+    view = subparsers.add_parser("view", help="show results in the console")
+    view.add_argument("target", nargs="?", choices=["csv", "charts", "live"],
+                      help="open the CSV or charts, or watch live metrics")
+    view.add_argument("--url", default="http://127.0.0.1:8766", help="live metrics endpoint")
+    view.add_argument("--refresh", type=float, default=2.0, help="live refresh seconds")
+    view.set_defaults(func=cmd_view)
+
+    subparsers.add_parser("trend", help="check whether the market went up or down").set_defaults(func=cmd_trend)
+
+    compare = subparsers.add_parser("compare", help="compare agent metrics")
+    compare.add_argument("--results-dir", default="results")
+    compare.add_argument("--no-stats", action="store_true", help="skip scipy significance tests")
+    compare.set_defaults(func=cmd_compare)
+
+    report = subparsers.add_parser("report", help="regenerate report artifacts (incremental)")
+    report.add_argument("--results-dir", default="results")
+    report.add_argument("--viz-dir", default="visualizations")
+    report.add_argument("--workers", type=int, default=None, help="process pool size")
+    report.add_argument("--force", action="store_true", help="rebuild every artifact")
+    report.set_defaults(func=cmd_report)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
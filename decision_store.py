@@ -0,0 +1,504 @@
+"""
+Decision Store - Deduplicated columnar storage of agent decisions and reasoning
+
+Decisions and analyst reports are keyed by (run, agent, tick) and written
+in compressed .npz segments of fixed-width columns:
+
+    run, agent, kind, reasoning, extra   ids into one interned string table
+    tick, action, quantity, confidence, price
+    key_points                           offsets + string ids (ragged)
+
+LLM reasoning repeats heavily across ticks and runs, so each distinct
+string is stored once in strings.jsonl (with its byte offset in
+strings.idx, so strings are read one at a time, never loaded whole) and
+rows only hold its id. Fields
+without a column of their own (sentiment, outlook, original_quantity, ...)
+are kept as one interned JSON "extra" string per row.
+
+manifest.json keeps per-segment statistics (runs, agents, action counts,
+confidence and tick ranges), so a query only opens segments that can
+match and only decompresses the columns it filters on or returns:
+
+    store = DecisionStore("results/decisions")
+    store.append("run-1", "FinGPT", 42, decision, price=101.5)
+    store.flush()
+    sells = store.query(action="sell", min_confidence=0.8)
+    store.records(sells)[:5]
+
+A store also works as a DecisionRing spill sink (store.spill(run, agent),
+or store.attach(run, agents) for every ring), and store.ingest_agent(run,
+agent) saves whatever is still in the rings. Only one process may write to
+a store at a time; store.close() releases it.
+"""
+
+import functools
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from agent_state import ACTION_CODES, ACTION_NAMES
+
+MANIFEST = "manifest.json"
+STRINGS = "strings.jsonl"
+STRINGS_INDEX = "strings.idx"
+WRITER_LOCK = "writer.lock"
+COLUMN_FIELDS = ("tick", "action", "quantity", "confidence", "reasoning", "key_points", "kind")
+RINGS = ("decisions", "analyst_reports")
+NO_STRING = -1
+NO_ACTION = -1
+
+
+def decision_tick(decision, default):
+    """The simulation tick recorded on a decision, else `default`"""
+    tick = decision.get("tick")
+    return default if tick is None else tick
+
+
+class DecisionSpill:
+    """
+    DecisionRing spill sink; keys evicted decisions by their recorded tick
+    (records without one are numbered 0, 1, 2, ... per agent)
+    """
+
+    def __init__(self, store, run, agent, kind=None):
+        self.store = store
+        self.run = run
+        self.agent = agent
+        self.kind = kind
+        self.evicted = 0
+
+    def __call__(self, decision):
+        tick = decision_tick(decision, self.evicted)
+        self.store.append(self.run, self.agent, tick, decision, kind=self.kind)
+        self.evicted += 1
+
+
+class DecisionStore:
+    """
+    Append-only segmented store with an interned string table.
+
+    Strings are read lazily through the byte offsets in strings.idx, so
+    opening a store and filtering on run/agent/kind (whose ids the manifest
+    keeps) never loads the table; only records() decodes strings. A store
+    has a single writer: the first append takes an exclusive lock on
+    writer.lock (held until close()), and a second writing process fails
+    instead of corrupting the string table or the manifest.
+    """
+
+    def __init__(self, path, segment_rows=65536, compress=True):
+        self.path = Path(path)
+        self.segment_dir = self.path / "segments"
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_rows = segment_rows
+        self.compress = compress
+
+        self.string_refs = 0
+        self.string_ids = None
+        self._new_strings = []
+        self._strings_file = None
+        self._offsets = None
+        self._lock = None
+        self._load()
+        self._reset_buffer()
+
+    def _load(self):
+        """Read the manifest and the size of the string index"""
+        manifest_path = self.path / MANIFEST
+        if manifest_path.exists():
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        else:
+            manifest = {"segments": []}
+        self.segments = manifest["segments"]
+        self.labels = manifest.get("labels")
+        self._strings_flushed = self._index_strings()
+        if self.labels is None:
+            # Stores written before labels were kept in the manifest
+            self.labels = dict(self._known_ids())
+        self._offsets = None
+
+    def _index_strings(self):
+        """Number of strings on disk; (re)builds strings.idx when it is missing or short"""
+        strings_path, index_path = self.path / STRINGS, self.path / STRINGS_INDEX
+        if not strings_path.exists():
+            return 0
+        indexed = index_path.stat().st_size // 8 if index_path.exists() else 0
+        size = strings_path.stat().st_size
+        offsets = np.fromfile(index_path, dtype="<i8") if indexed else np.zeros(0, dtype="<i8")
+        end = None
+        if indexed:
+            with open(strings_path, "rb") as f:
+                f.seek(int(offsets[-1]))
+                f.readline()
+                end = f.tell()
+        if end == size:
+            return indexed
+
+        offsets, position = [], 0
+        with open(strings_path, "rb") as f:
+            for line in f:
+                offsets.append(position)
+                position += len(line)
+        np.array(offsets, dtype="<i8").tofile(index_path)
+        return len(offsets)
+
+    # ------------------------------------------------------------------------
+    # Interning
+    # ------------------------------------------------------------------------
+
+    def _known_ids(self):
+        """Text -> id for every stored string (loaded on the first write, for deduplication)"""
+        if self.string_ids is None:
+            self.string_ids = {}
+            strings_path = self.path / STRINGS
+            if strings_path.exists():
+                with open(strings_path, "r", encoding="utf-8") as f:
+                    for string_id, line in enumerate(f):
+                        self.string_ids[json.loads(line)] = string_id
+        return self.string_ids
+
+    def intern(self, text):
+        if text is None:
+            return NO_STRING
+        text = str(text)
+        self.string_refs += 1
+        string_ids = self._known_ids()
+        string_id = string_ids.get(text)
+        if string_id is None:
+            string_id = self._strings_flushed + len(self._new_strings)
+            string_ids[text] = string_id
+            self._new_strings.append(text)
+        return string_id
+
+    def _label(self, text):
+        """Intern a run/agent/kind name and remember its id for query filters"""
+        string_id = self.intern(text)
+        if string_id != NO_STRING:
+            self.labels[str(text)] = string_id
+        return string_id
+
+    def string(self, string_id):
+        if string_id == NO_STRING:
+            return None
+        if string_id >= self._strings_flushed:
+            return self._new_strings[string_id - self._strings_flushed]
+        if self._offsets is None or len(self._offsets) < self._strings_flushed:
+            self._offsets = np.fromfile(self.path / STRINGS_INDEX, dtype="<i8")
+        if self._strings_file is None:
+            self._strings_file = open(self.path / STRINGS, "rb")
+        self._strings_file.seek(int(self._offsets[string_id]))
+        return json.loads(self._strings_file.readline().decode("utf-8"))
+
+    def _lookup(self, texts):
+        """Existing string ids for query filters (unknown strings match nothing)"""
+        if texts is None:
+            return None
+        if isinstance(texts, str):
+            texts = [texts]
+        return [self.labels[t] for t in texts if t in self.labels]
+
+    # ------------------------------------------------------------------------
+    # Single writer
+    # ------------------------------------------------------------------------
+
+    def _acquire_writer(self):
+        """Take the store's write lock, then re-read what other writers left on disk"""
+        if self._lock is not None:
+            return
+        lock = open(self.path / WRITER_LOCK, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock.close()
+            raise RuntimeError(f"Decision store {self.path} is already open for writing "
+                               f"in another process") from None
+        self._lock = lock
+        self.string_ids = None
+        self._load()
+
+    def _release_writer(self):
+        if self._lock is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._lock.fileno(), fcntl.LOCK_UN)
+        else:
+            self._lock.seek(0)
+            msvcrt.locking(self._lock.fileno(), msvcrt.LK_UNLCK, 1)
+        self._lock.close()
+        self._lock = None
+
+    # ------------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------------
+
+    def _reset_buffer(self):
+        self._buffer = {name: [] for name in (
+            "run", "agent", "kind", "tick", "action", "quantity", "confidence",
+            "price", "reasoning", "extra", "kp_counts", "kp_ids")}
+
+    def append(self, run, agent, tick, decision, price=None, kind=None):
+        """Buffer one decision (or analyst report) dict"""
+        self._acquire_writer()
+        buffer = self._buffer
+        kind = kind or decision.get("kind", "decision")
+        action = decision.get("action")
+        key_points = decision.get("key_points") or []
+        if isinstance(key_points, str):
+            key_points = [key_points]
+
+        try:
+            quantity = float(decision.get("quantity", 0) or 0)
+        except (TypeError, ValueError):
+            quantity = 0.0
+        try:
+            confidence = float(decision["confidence"]) if decision.get("confidence") is not None else np.nan
+        except (TypeError, ValueError):
+            confidence = np.nan
+
+        extra = {k: v for k, v in decision.items() if k not in COLUMN_FIELDS}
+
+        buffer["run"].append(self._label(run))
+        buffer["agent"].append(self._label(agent))
+        buffer["kind"].append(self._label(kind))
+        buffer["tick"].append(int(tick))
+        buffer["action"].append(ACTION_CODES.get(action, NO_ACTION) if action is not None else NO_ACTION)
+        buffer["quantity"].append(quantity)
+        buffer["confidence"].append(confidence)
+        buffer["price"].append(np.nan if price is None else float(price))
+        buffer["reasoning"].append(self.intern(decision.get("reasoning")))
+        buffer["extra"].append(self.intern(json.dumps(extra, sort_keys=True, default=str)) if extra else NO_STRING)
+        buffer["kp_counts"].append(len(key_points))
+        buffer["kp_ids"].extend(self.intern(point) for point in key_points)
+
+        if len(buffer["tick"]) >= self.segment_rows:
+            self.flush()
+
+    def spill(self, run, agent, kind=None):
+        return DecisionSpill(self, run, agent, kind)
+
+    def attach(self, run, agents):
+        """Spill every agent's evicted decisions and analyst reports into the store"""
+        for agent in agents:
+            for name in RINGS:
+                ring = getattr(agent, name, None)
+                if ring is not None:
+                    ring.spill = self.spill(run, agent.name)
+
+    def extend(self, run, agent, records, first=0):
+        """Append records in history order, numbering those without a tick from `first`"""
+        for offset, record in enumerate(records):
+            self.append(run, agent, decision_tick(record, first + offset), record)
+
+    def ingest_agent(self, run, agent):
+        """
+        Store the decisions (and analyst reports) still held in an agent's rings,
+        keyed by their recorded tick (else their position in the agent's history)
+        """
+        for name in RINGS:
+            ring = getattr(agent, name, None)
+            if ring is None:
+                continue
+            self.extend(run, agent.name, ring, getattr(ring, "total", len(ring)) - len(ring))
+
+    def flush(self):
+        """Write buffered rows as a new segment and persist the string table"""
+        if self._lock is None:
+            # Nothing was appended: a reader never rewrites the manifest
+            return
+        buffer = self._buffer
+        rows = len(buffer["tick"])
+        if rows:
+            columns = {
+                "run": np.array(buffer["run"], dtype=np.int32),
+                "agent": np.array(buffer["agent"], dtype=np.int32),
+                "kind": np.array(buffer["kind"], dtype=np.int32),
+                "tick": np.array(buffer["tick"], dtype=np.int64),
+                "action": np.array(buffer["action"], dtype=np.int8),
+                "quantity": np.array(buffer["quantity"], dtype=np.float64),
+                "confidence": np.array(buffer["confidence"], dtype=np.float64),
+                "price": np.array(buffer["price"], dtype=np.float64),
+                "reasoning": np.array(buffer["reasoning"], dtype=np.int32),
+                "extra": np.array(buffer["extra"], dtype=np.int32),
+                "kp_offsets": np.concatenate([[0], np.cumsum(buffer["kp_counts"])]).astype(np.int64),
+                "kp_ids": np.array(buffer["kp_ids"], dtype=np.int32),
+            }
+            name = f"seg_{len(self.segments):06d}.npz"
+            save = np.savez_compressed if self.compress else np.savez
+            save(self.segment_dir / name, **columns)
+
+            confidence = columns["confidence"]
+            has_confidence = ~np.isnan(confidence)
+            actions, counts = np.unique(columns["action"], return_counts=True)
+            self.segments.append({
+                "file": name,
+                "rows": rows,
+                "runs": sorted(set(buffer["run"])),
+                "agents": sorted(set(buffer["agent"])),
+                "kinds": sorted(set(buffer["kind"])),
+                "actions": {str(int(a)): int(c) for a, c in zip(actions, counts)},
+                "confidence": [float(confidence[has_confidence].min()), float(confidence[has_confidence].max())]
+                if has_confidence.any() else None,
+                "ticks": [int(columns["tick"].min()), int(columns["tick"].max())],
+            })
+            self._reset_buffer()
+
+        self._write_strings()
+        self._write_manifest()
+
+    def _write_strings(self):
+        if not self._new_strings:
+            return
+        lines = [(json.dumps(text) + "\n").encode("utf-8") for text in self._new_strings]
+        with open(self.path / STRINGS, "ab") as f:
+            position = f.tell()
+            f.write(b"".join(lines))
+        offsets = position + np.concatenate([[0], np.cumsum([len(line) for line in lines])[:-1]])
+        with open(self.path / STRINGS_INDEX, "ab") as f:
+            f.write(offsets.astype("<i8").tobytes())
+        self._strings_flushed += len(self._new_strings)
+        self._new_strings = []
+
+    def _write_manifest(self):
+        tmp = self.path / (MANIFEST + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"segments": self.segments, "labels": self.labels}, f)
+        os.replace(tmp, self.path / MANIFEST)
+
+    def close(self):
+        """Flush, release the write lock and close the string table"""
+        try:
+            self.flush()
+        finally:
+            self._release_writer()
+            if self._strings_file is not None:
+                self._strings_file.close()
+                self._strings_file = None
+
+    # ------------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------------
+
+    def _segment_may_match(self, segment, runs, agents, kinds, action, min_confidence, max_confidence, ticks):
+        if runs is not None and not set(runs) & set(segment["runs"]):
+            return False
+        if agents is not None and not set(agents) & set(segment["agents"]):
+            return False
+        if kinds is not None and not set(kinds) & set(segment["kinds"]):
+            return False
+        if action is not None and not segment["actions"].get(str(action)):
+            return False
+        if min_confidence is not None or max_confidence is not None:
+            bounds = segment["confidence"]
+            if bounds is None:
+                return False
+            if min_confidence is not None and bounds[1] < min_confidence:
+                return False
+            if max_confidence is not None and bounds[0] > max_confidence:
+                return False
+        if ticks is not None:
+            lo, hi = ticks
+            if segment["ticks"][1] < lo or segment["ticks"][0] > hi:
+                return False
+        return True
+
+    def query(self, action=None, min_confidence=None, max_confidence=None, runs=None,
+              agents=None, kinds=None, ticks=None,
+              columns=("run", "agent", "tick", "kind", "action", "quantity", "confidence", "price",
+                       "reasoning", "extra")):
+        """
+        Rows matching every given filter, as {column: array} (string columns
+        hold ids; see records()). ticks is an inclusive (lo, hi) range.
+        """
+        action_code = ACTION_CODES[action] if action is not None else None
+        runs, agents, kinds = self._lookup(runs), self._lookup(agents), self._lookup(kinds)
+        with_key_points = "key_points" in columns
+        columns = [c for c in columns if c != "key_points"]
+        parts = {name: [] for name in columns}
+        key_points = []
+
+        for segment in self.segments:
+            if not self._segment_may_match(segment, runs, agents, kinds, action_code,
+                                           min_confidence, max_confidence, ticks):
+                continue
+            with np.load(self.segment_dir / segment["file"]) as data:
+                mask = np.ones(segment["rows"], dtype=bool)
+                if action_code is not None:
+                    mask &= data["action"] == action_code
+                if min_confidence is not None or max_confidence is not None:
+                    confidence = data["confidence"]
+                    if min_confidence is not None:
+                        mask &= confidence > min_confidence
+                    if max_confidence is not None:
+                        mask &= confidence <= max_confidence
+                for name, values in (("run", runs), ("agent", agents), ("kind", kinds)):
+                    if values is not None:
+                        mask &= np.isin(data[name], values)
+                if ticks is not None:
+                    tick = data["tick"]
+                    mask &= (tick >= ticks[0]) & (tick <= ticks[1])
+
+                rows = np.flatnonzero(mask)
+                if not len(rows):
+                    continue
+                for name in columns:
+                    parts[name].append(data[name][rows])
+                if with_key_points:
+                    offsets, ids = data["kp_offsets"], data["kp_ids"]
+                    key_points.extend(ids[offsets[r]:offsets[r + 1]] for r in rows)
+
+        result = {name: np.concatenate(chunks) if chunks else np.zeros(0) for name, chunks in parts.items()}
+        if with_key_points:
+            result["key_points"] = key_points
+        return result
+
+    def count(self, **filters):
+        return len(self.query(columns=("tick",), **filters)["tick"])
+
+    def records(self, result):
+        """Decode a query result back into decision dicts"""
+        string = functools.lru_cache(maxsize=None)(self.string)
+        names = [n for n in result if n != "key_points"]
+        n = len(result[names[0]]) if names else len(result.get("key_points", []))
+        records = []
+        for i in range(n):
+            record = {}
+            for name in names:
+                value = result[name][i]
+                if name in ("run", "agent", "kind", "reasoning"):
+                    record[name] = string(int(value))
+                elif name == "extra":
+                    text = string(int(value))
+                    if text:
+                        record.update(json.loads(text))
+                elif name == "action":
+                    record[name] = ACTION_NAMES.get(int(value))
+                elif name in ("tick",):
+                    record[name] = int(value)
+                else:
+                    record[name] = None if np.isnan(value) else float(value)
+            if "key_points" in result:
+                record["key_points"] = [string(int(s)) for s in result["key_points"][i]]
+            records.append(record)
+        return records
+
+    def stats(self):
+        disk = sum(p.stat().st_size for p in self.path.rglob("*") if p.is_file())
+        return {
+            "rows": sum(s["rows"] for s in self.segments) + len(self._buffer["tick"]),
+            "segments": len(self.segments),
+            "unique_strings": self._strings_flushed + len(self._new_strings),
+            "string_refs": self.string_refs,
+            "disk_bytes": disk,
+        }
@@ -0,0 +1,403 @@
+"""
+Execution Engine - Partial fills against book depth, market impact, fees and latency
+
+Agents submit orders at the mid price they saw. Here an order only becomes
+eligible once its latency has elapsed, then walks the opposite side of the
+book at the tick it is matched (a market that publishes no bids/asks at
+all is treated as one unlimited level at its mid price):
+
+    fill price  = depth VWAP * (1 +/- impact), impact from the order's share
+                  of visible depth ("linear" or "sqrt" model, or "none")
+    fee         = fee_bps of notional + fee_per_share, at least min_fee
+    unfilled    = rests until the next tick (partial="rest") or is
+                  cancelled (partial="cancel"); a resting order older than
+                  max_age seconds is cancelled as expired
+
+Orders on the same symbol and side consume depth in arrival order. All
+eligible orders of a tick are matched in one vectorized pass, so cost grows
+with numpy array sizes rather than with Python loops over orders.
+
+Queued orders hold their agent's cash (buys, at the reference price plus
+fees) and shares (sells): reserved() reports them so order checks can
+subtract them, and settle() re-clamps each fill against the agent's cash
+and holdings at fill time, when spread, impact and fees are known.
+
+    engine = ExecutionEngine(fee_bps=1.0, latency=0.5)
+    engine.submit(agent_id, "STOCK", "BUY", 10, price, current_time)
+    fills = engine.match(current_time, simulator.get_market_data)
+    settle(fills, agents)
+"""
+
+import numpy as np
+
+from market_data import to_ns
+from risk import _exclusive_group_cumsum
+
+IMPACT_MODELS = ("none", "linear", "sqrt")
+PARTIAL_POLICIES = ("rest", "cancel")
+SIDES = {"BUY": 1, "SELL": -1}
+SIDE_NAMES = {1: "BUY", -1: "SELL"}
+
+
+class ExecutionEngine:
+    """Order queue plus a vectorized per-tick matcher"""
+
+    def __init__(self, impact="sqrt", impact_coef=0.1, fee_bps=1.0, fee_per_share=0.0,
+                 min_fee=0.0, latency=0.0, max_slippage_bps=None, partial="rest", max_age=None,
+                 capacity=1024):
+        if impact not in IMPACT_MODELS:
+            raise ValueError(f"Unknown impact model: {impact} (expected one of {IMPACT_MODELS})")
+        if partial not in PARTIAL_POLICIES:
+            raise ValueError(f"Unknown partial-fill policy: {partial} (expected one of {PARTIAL_POLICIES})")
+
+        self.impact = impact
+        self.impact_coef = impact_coef
+        self.fee_bps = fee_bps
+        self.fee_per_share = fee_per_share
+        self.min_fee = min_fee
+        self.latency = latency
+        self.max_slippage_bps = max_slippage_bps
+        self.partial = partial
+        self.max_age = max_age
+        self.fill_listeners = []  # called with each match()'s fills, e.g. live_metrics
+
+        self.symbols = []
+        self.symbol_index = {}
+        self.size = 0
+        self.next_order_id = 1
+        self._allocate(max(1, capacity))
+
+        self.stats = {
+            "submitted": 0, "filled_orders": 0, "partial_fills": 0, "cancelled": 0, "expired": 0,
+            "filled_quantity": 0, "settle_rejected": 0, "fees": 0.0, "slippage_cost": 0.0,
+        }
+
+    def _allocate(self, capacity):
+        """Create (or grow) the pending-order columns"""
+        columns = {
+            "order_ids": np.zeros(capacity, dtype=np.int64),
+            "agent_ids": np.zeros(capacity, dtype=np.int64),
+            "symbol_codes": np.zeros(capacity, dtype=np.int32),
+            "sides": np.zeros(capacity, dtype=np.int8),
+            "remaining": np.zeros(capacity, dtype=np.int64),
+            "reference_prices": np.zeros(capacity, dtype=np.float64),
+            "release_ns": np.zeros(capacity, dtype=np.int64),
+        }
+        for name, array in columns.items():
+            old = getattr(self, name, None)
+            if old is not None:
+                array[:self.size] = old[:self.size]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    # ------------------------------------------------------------------------
+    # Order entry
+    # ------------------------------------------------------------------------
+
+    def submit(self, agent_id, symbol, side, quantity, price, timestamp):
+        """Queue an order; it becomes eligible after the configured latency"""
+        if side not in SIDES:
+            raise ValueError(f"Unknown order side: {side}")
+        if symbol not in self.symbol_index:
+            self.symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        if self.size == self.capacity:
+            self._allocate(self.capacity * 2)
+
+        latency = self.latency(agent_id) if callable(self.latency) else self.latency
+        i = self.size
+        order_id = self.next_order_id
+        self.order_ids[i] = order_id
+        self.agent_ids[i] = agent_id
+        self.symbol_codes[i] = self.symbol_index[symbol]
+        self.sides[i] = SIDES[side]
+        self.remaining[i] = int(quantity)
+        self.reference_prices[i] = price
+        self.release_ns[i] = to_ns(timestamp) + int(latency * 1e9)
+        self.size += 1
+        self.next_order_id += 1
+        self.stats["submitted"] += 1
+        return order_id
+
+    @property
+    def pending(self):
+        return self.size
+
+    def _reserved_cash(self, rows):
+        """Cash a buy still needs at its reference price, fees included"""
+        notional = self.remaining[rows] * self.reference_prices[rows]
+        fees = notional * self.fee_bps / 10000 + self.remaining[rows] * self.fee_per_share
+        return notional + np.maximum(fees, self.min_fee)
+
+    def queued(self):
+        """(agent_ids, symbols, sides, remaining, reserved cash) columns of every queued order"""
+        n = self.size
+        rows = np.arange(n)
+        cash = np.where(self.sides[:n] > 0, self._reserved_cash(rows), 0.0)
+        symbols = np.array([self.symbols[c] for c in self.symbol_codes[:n]], dtype=object)
+        return self.agent_ids[:n].copy(), symbols, self.sides[:n].copy(), self.remaining[:n].copy(), cash
+
+    def reserved(self, agent_id):
+        """(cash, {symbol: shares}) held by an agent's queued buys and sells"""
+        n = self.size
+        mine = self.agent_ids[:n] == agent_id
+        buys = np.flatnonzero(mine & (self.sides[:n] > 0))
+        sells = np.flatnonzero(mine & (self.sides[:n] < 0))
+        shares = {}
+        for code, quantity in zip(self.symbol_codes[sells], self.remaining[sells]):
+            symbol = self.symbols[code]
+            shares[symbol] = shares.get(symbol, 0) + int(quantity)
+        return float(self._reserved_cash(buys).sum()), shares
+
+    def reservations(self):
+        """{agent_id: (cash, {symbol: shares})} for every agent with queued orders"""
+        n = self.size
+        if not n:
+            return {}
+        agents, inverse = np.unique(self.agent_ids[:n], return_inverse=True)
+        buys = self.sides[:n] > 0
+        cash = np.bincount(inverse, weights=np.where(buys, self._reserved_cash(np.arange(n)), 0.0),
+                           minlength=len(agents))
+        result = {int(agent_id): (float(cash[i]), {}) for i, agent_id in enumerate(agents)}
+        for row in np.flatnonzero(~buys):
+            shares = result[int(self.agent_ids[row])][1]
+            symbol = self.symbols[self.symbol_codes[row]]
+            shares[symbol] = shares.get(symbol, 0) + int(self.remaining[row])
+        return result
+
+    # ------------------------------------------------------------------------
+    # Matching
+    # ------------------------------------------------------------------------
+
+    def _books(self, get_market_data, codes, sides):
+        """(groups x levels) price / size arrays for each (symbol, side) group"""
+        books = []
+        for code, side in zip(codes, sides):
+            data = get_market_data(self.symbols[code]) or {}
+            book_side = "asks" if side > 0 else "bids"
+            if book_side in data:
+                # A published but empty (or zero-size) side leaves the order resting
+                levels = [level for level in data[book_side] or [] if level[1] > 0]
+            elif data.get("mid_price"):
+                # No depth published at all: one unlimited level at the mid
+                levels = [(data["mid_price"], np.inf)]
+            else:
+                levels = []
+            books.append(levels)
+
+        depth = max((len(levels) for levels in books), default=0)
+        prices = np.zeros((len(books), max(depth, 1)))
+        sizes = np.zeros((len(books), max(depth, 1)))
+        for g, levels in enumerate(books):
+            if levels:
+                level_array = np.asarray(levels, dtype=np.float64)
+                prices[g, :len(levels)] = level_array[:, 0]
+                sizes[g, :len(levels)] = np.floor(level_array[:, 1])
+        return prices, sizes
+
+    def match(self, timestamp, get_market_data):
+        """Fill every eligible order against the current books; returns a fills dict of arrays"""
+        now = to_ns(timestamp)
+        n = self.size
+        eligible = np.flatnonzero(self.release_ns[:n] <= now)
+        if not len(eligible):
+            return empty_fills()
+
+        # Group by (symbol, side), arrival order within each group
+        codes = self.symbol_codes[eligible]
+        sides = self.sides[eligible]
+        order = np.lexsort((self.order_ids[eligible], sides, codes))
+        rows = eligible[order]
+        codes, sides = codes[order], sides[order]
+        group_keys = codes.astype(np.int64) * 2 + (sides > 0)
+        starts = np.flatnonzero(np.r_[True, group_keys[1:] != group_keys[:-1]])
+        group_of = np.cumsum(np.r_[True, group_keys[1:] != group_keys[:-1]]) - 1
+
+        prices, sizes = self._books(get_market_data, codes[starts], sides[starts])
+
+        # Each order owns the interval [lo, hi) of its group's cumulative demand;
+        # each level offers [level_lo, level_hi) of cumulative depth
+        demand = self.remaining[rows].astype(np.float64)
+        cumulative = np.cumsum(demand)
+        group_base = (cumulative - demand)[starts][group_of]
+        hi = cumulative - group_base
+        lo = hi - demand
+        level_hi = np.cumsum(sizes, axis=1)
+        level_lo = np.concatenate([np.zeros((len(starts), 1)), level_hi[:, :-1]], axis=1)
+        overlap = np.minimum(hi[:, None], level_hi[group_of]) - np.maximum(lo[:, None], level_lo[group_of])
+        overlap = np.clip(np.nan_to_num(overlap, nan=0.0, posinf=0.0, neginf=0.0), 0.0, None)
+
+        level_prices = prices[group_of]
+        side_sign = sides.astype(np.float64)
+        reference = self.reference_prices[rows]
+        if self.max_slippage_bps is not None:
+            limit = reference * (1 + side_sign * self.max_slippage_bps / 10000)
+            overlap[side_sign[:, None] * (level_prices - limit[:, None]) > 0] = 0.0
+
+        filled = np.floor(overlap.sum(axis=1))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            vwap = np.where(filled > 0, (overlap * level_prices).sum(axis=1) / filled, 0.0)
+
+        if self.impact != "none":
+            visible = sizes.sum(axis=1)[group_of]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                participation = np.where(np.isfinite(visible) & (visible > 0), filled / visible, 0.0)
+            if self.impact == "sqrt":
+                participation = np.sqrt(participation)
+            fill_prices = vwap * (1 + side_sign * self.impact_coef * participation)
+        else:
+            fill_prices = vwap
+
+        notional = filled * fill_prices
+        fees = np.where(filled > 0, np.maximum(
+            self.min_fee, notional * self.fee_bps / 10000 + filled * self.fee_per_share), 0.0)
+
+        order_ids = self.order_ids[rows]
+        agent_ids = self.agent_ids[rows]
+
+        # Update the queue: remove filled orders, rest or cancel the remainder
+        remaining = self.remaining[rows] - filled.astype(np.int64)
+        self.remaining[rows] = remaining
+        done = remaining <= 0
+        if self.partial == "cancel":
+            self.stats["cancelled"] += int(np.sum(~done))
+            done[:] = True
+        elif self.max_age is not None:
+            # Books that never offer a match (halted, no depth, past the slippage limit)
+            expired = ~done & (now - self.release_ns[rows] >= int(self.max_age * 1e9))
+            self.stats["expired"] += int(np.sum(expired))
+            done |= expired
+        self._compact(rows[done])
+
+        hit = filled > 0
+        self.stats["filled_orders"] += int(np.sum(hit & (remaining <= 0)))
+        self.stats["partial_fills"] += int(np.sum(hit & (remaining > 0)))
+        self.stats["filled_quantity"] += int(filled.sum())
+        self.stats["fees"] += float(fees.sum())
+        self.stats["slippage_cost"] += float(np.sum(side_sign * (fill_prices - reference) * filled))
+
+        fills = {
+            "order_ids": order_ids[hit],
+            "agent_ids": agent_ids[hit],
+            "symbols": np.array([self.symbols[c] for c in codes[hit]], dtype=object),
+            "sides": sides[hit],
+            "quantities": filled[hit].astype(np.int64),
+            "prices": fill_prices[hit],
+            "fees": fees[hit],
+            "reference_prices": reference[hit],
+        }
+        for listener in self.fill_listeners:
+            listener(fills)
+        return fills
+
+    def _compact(self, rows):
+        """Drop finished orders, keeping the rest in arrival order"""
+        if not len(rows):
+            return
+        keep = np.ones(self.size, dtype=bool)
+        keep[rows] = False
+        kept = int(keep.sum())
+        for name in ("order_ids", "agent_ids", "symbol_codes", "sides", "remaining",
+                     "reference_prices", "release_ns"):
+            column = getattr(self, name)
+            column[:kept] = column[:self.size][keep]
+        self.size = kept
+
+    def cancel_all(self):
+        """Cancel every queued order (e.g. at the end of a run)"""
+        self.stats["cancelled"] += self.size
+        self.size = 0
+
+
+def empty_fills():
+    return {
+        "order_ids": np.zeros(0, dtype=np.int64),
+        "agent_ids": np.zeros(0, dtype=np.int64),
+        "symbols": np.zeros(0, dtype=object),
+        "sides": np.zeros(0, dtype=np.int8),
+        "quantities": np.zeros(0, dtype=np.int64),
+        "prices": np.zeros(0),
+        "fees": np.zeros(0),
+        "reference_prices": np.zeros(0),
+    }
+
+
+# ============================================================================
+# SETTLEMENT
+# ============================================================================
+
+def _drop(fills, keep, stats):
+    """Shrink fills to `keep` shares each (fees pro rata) and count what was dropped"""
+    quantities = fills["quantities"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = np.where(quantities > 0, keep / quantities, 0.0)
+    dropped_fees = fills["fees"] * (1 - ratio)
+    if stats is not None:
+        stats["settle_rejected"] += int(np.sum(quantities - keep))
+        stats["filled_quantity"] -= int(np.sum(quantities - keep))
+        stats["fees"] -= float(dropped_fees.sum())
+    fills["fees"] = fills["fees"] - dropped_fees
+    fills["quantities"] = keep.astype(np.int64)
+
+
+def settle(fills, agents, stats=None):
+    """
+    Apply fills to agents ({agent_id: agent}): cash pays price and fees,
+    positions move. Each fill is first clamped to what the agent can pay for
+    (buys) or holds (sells) at this point; dropped shares count in
+    stats["settle_rejected"] when the engine's stats are passed.
+    """
+    keep = fills["quantities"].copy()
+    for i, (agent_id, symbol, side, quantity, price, fee) in enumerate(zip(
+            fills["agent_ids"], fills["symbols"], fills["sides"],
+            fills["quantities"], fills["prices"], fills["fees"])):
+        agent = agents[int(agent_id)]
+        filled, price, fee = int(quantity), float(price), float(fee)
+        if side > 0:
+            quantity = min(filled, max(int(agent.cash / (price + fee / filled)), 0))
+        else:
+            quantity = min(filled, max(agent.positions.get(symbol, 0), 0))
+        keep[i] = quantity
+        signed = int(side) * quantity
+        agent.cash -= signed * price + fee * quantity / filled
+        agent.positions[symbol] = agent.positions.get(symbol, 0) + signed
+    if np.any(keep < fills["quantities"]):
+        _drop(fills, keep, stats)
+    return fills
+
+
+def settle_ledger(fills, ledger, stats=None):
+    """
+    Vectorized settlement straight into an AgentLedger's columns, with the
+    same clamp as settle(). Within one batch, a fill is limited by the cash
+    and shares left after the agent's earlier fills at their full size.
+    """
+    if not len(fills["agent_ids"]):
+        return fills
+
+    slots = np.array([ledger.slots[int(a)] for a in fills["agent_ids"]])
+    columns = np.array([ledger._symbol_column(s) for s in fills["symbols"]])
+    quantities = fills["quantities"].astype(np.float64)
+    buys = fills["sides"] > 0
+    unit_cost = fills["prices"] + fills["fees"] / quantities
+
+    by_slot = np.argsort(slots, kind="stable")
+    spent_before = np.empty_like(quantities)
+    spent_before[by_slot] = _exclusive_group_cumsum(
+        slots[by_slot], np.where(buys, quantities * unit_cost, 0.0)[by_slot])
+    holding = slots * ledger.positions.shape[1] + columns
+    by_holding = np.argsort(holding, kind="stable")
+    sold_before = np.empty_like(quantities)
+    sold_before[by_holding] = _exclusive_group_cumsum(
+        holding[by_holding], np.where(buys, 0.0, quantities)[by_holding])
+
+    limit = np.where(buys, (ledger.cash[slots] - spent_before) / unit_cost,
+                     ledger.positions[slots, columns] - sold_before)
+    keep = np.minimum(quantities, np.maximum(np.floor(limit), 0)).astype(np.int64)
+    if np.any(keep < fills["quantities"]):
+        _drop(fills, keep, stats)
+
+    signed = fills["sides"].astype(np.int64) * fills["quantities"]
+    np.add.at(ledger.cash, slots, -(signed * fills["prices"] + fills["fees"]))
+    np.add.at(ledger.positions, (slots, columns), signed)
+    return fills
@@ -0,0 +1,195 @@
+"""
+Fake LLM Server - Local OpenAI-compatible endpoint for benchmarks and tests
+
+Serves POST /v1/chat/completions with configurable latency and error
+distributions and answers with a JSON blob every agent stage can parse.
+No network access or API key needed:
+
+    with FakeLLMServer(latency="lognormal", latency_ms=200, error_rate=0.02) as server:
+        openai.api_base = server.api_base
+        openai.api_key = "fake"
+        ...
+
+Or standalone:  python fake_llm_server.py --port 8765 --latency-ms 150
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+class FakeLLMServer:
+    """Threaded HTTP server that imitates the chat completions API"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency="fixed", latency_ms=0.0,
+                 latency_jitter=0.5, error_rate=0.0, malformed_rate=0.0, seed=42):
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency}")
+
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.stats = {"requests": 0, "errors": 0, "malformed": 0, "prompt_chars": 0}
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_base(self):
+        return self.url + "/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_stats(self):
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+    # ------------------------------------------------------------------------
+    # Response generation
+    # ------------------------------------------------------------------------
+
+    def _sample(self):
+        """Draw (delay seconds, outcome) for one request"""
+        with self._lock:
+            mean = self.latency_ms / 1000.0
+            if self.latency == "fixed":
+                delay = mean
+            elif self.latency == "uniform":
+                delay = self._rng.uniform(mean * (1 - self.latency_jitter), mean * (1 + self.latency_jitter))
+            elif self.latency == "exponential":
+                delay = self._rng.expovariate(1 / mean) if mean > 0 else 0.0
+            else:
+                delay = mean * self._rng.lognormvariate(0, self.latency_jitter) if mean > 0 else 0.0
+
+            roll = self._rng.random()
+            if roll < self.error_rate:
+                outcome = "error"
+            elif roll < self.error_rate + self.malformed_rate:
+                outcome = "malformed"
+            else:
+                outcome = "ok"
+
+            decision = {
+                "action": self._rng.choice(["buy", "sell", "hold"]),
+                "quantity": self._rng.randint(1, 50),
+                "reasoning": "benchmark response",
+                "confidence": round(self._rng.random(), 2),
+                "sentiment": round(self._rng.uniform(-1, 1), 2),
+                "expected_change_pct": round(self._rng.uniform(-3, 3), 2),
+                "risk_score": round(self._rng.random(), 2),
+                "recommended_size_pct": self._rng.randint(5, 40),
+                "outlook": self._rng.choice(["bullish", "bearish", "neutral"]),
+                "key_points": ["volume", "momentum"],
+                "trend": self._rng.choice(["up", "down", "sideways"]),
+                "recommendation": self._rng.choice(["buy", "sell", "hold"]),
+            }
+        return max(0.0, delay), outcome, decision
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+                    return
+
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+
+                delay, outcome, decision = server._sample()
+                time.sleep(delay)
+
+                with server._lock:
+                    server.stats["requests"] += 1
+                    server.stats["prompt_chars"] += prompt_chars
+                    if outcome != "ok":
+                        server.stats["errors" if outcome == "error" else "malformed"] += 1
+
+                if outcome == "error":
+                    self._send(500, {"error": {"message": "injected failure", "type": "server_error"}})
+                    return
+
+                content = "not json at all" if outcome == "malformed" else json.dumps(decision)
+                prompt_tokens = prompt_chars // 4
+                completion_tokens = len(content) // 4
+                self._send(200, {
+                    "id": f"chatcmpl-fake-{server.stats['requests']}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                })
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake OpenAI-compatible chat server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.host, args.port, args.latency, args.latency_ms,
+                           error_rate=args.error_rate, malformed_rate=args.malformed_rate)
+    print(f"✓ Fake LLM server listening on {server.api_base}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
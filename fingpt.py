@@ -1,50 +1,123 @@
 ﻿"""FinGPT - Financial AI Trading System"""
-import openai
 import json
 from framework.simulator.base_agent import BaseTradingAgent
+from agent_state import LedgerStateMixin, DecisionRing, account_view
+from prompt_templates import PromptTemplate
+from llm_client import CacheMiss, chat_completion
+from risk import submit_decision
 
-class FinGPTAgent(BaseTradingAgent):
+SYSTEM_PROMPT = "You are FinGPT, a financial AI."
+
+SENTIMENT_PROMPT = PromptTemplate(
+    """Analyze market sentiment for stock at ${price:.2f}.
+Return JSON:
+{{"sentiment": <-1 to 1>, "confidence": <0 to 1>}}""",
+    system=SYSTEM_PROMPT,
+    name="fingpt.sentiment"
+)
+
+PREDICTION_PROMPT = PromptTemplate(
+    """Predict price movement for stock at ${price:.2f}.
+Market sentiment: {sentiment:.2f}
+
+Return JSON:
+{{"expected_change_pct": <percentage>, "confidence": <0-1>}}""",
+    system=SYSTEM_PROMPT,
+    name="fingpt.prediction"
+)
+
+RISK_PROMPT = PromptTemplate(
+    """Assess risk for this trade.
+Portfolio Value: ${portfolio_value:.2f}
+Expected Change: {expected_change:.1f}%
+Risk Tolerance: {risk_tolerance}
+
+Return JSON:
+{{"risk_score": <0-1>, "recommended_size_pct": <0-100>}}""",
+    system=SYSTEM_PROMPT,
+    name="fingpt.risk"
+)
+
+DECISION_PROMPT = PromptTemplate(
+    """Make trading decision.
+Price: ${price:.2f}
+Expected Change: {expected_change:.1f}%
+Risk Score: {risk_score:.2f}
+Recommended Position: {recommended_size:.0f}% of portfolio
+Cash Available: ${cash:.2f}
+Current Position: {position} shares
+
+Return JSON:
+{{"action": "buy|sell|hold", "quantity": <number>, "reasoning": "<brief>"}}""",
+    system=SYSTEM_PROMPT,
+    name="fingpt.decision"
+)
+
+class FinGPTAgent(LedgerStateMixin, BaseTradingAgent):
     """FinGPT-based trading with sentiment and prediction"""
     
+    DECISION_HISTORY = 256
+    RISK_PROFILE = {"buy_scale": "risk_tolerance"}  # applied by risk.submit_decision / RiskEngine
+    
     def __init__(self, agent_id, name, starting_cash):
         super().__init__(agent_id, name, starting_cash)
         self.model = "gpt-3.5-turbo"
         self.risk_tolerance = 0.5
-        self.decisions = []
+        self.temperature = 0.5
+        self.decisions = DecisionRing(self.DECISION_HISTORY)
+        self.speculator = None  # speculation.Speculator to prefetch next-tick decisions
         
     def on_tick(self, current_time, simulator):
         """FinGPT workflow: Sentiment  Prediction  Risk  Decision"""
         
+        self._begin_tick(simulator)
         market_data = simulator.get_market_data("STOCK")
         current_price = market_data["mid_price"]
         
         if not current_price:
             return
         
+        cash, positions = account_view(self, simulator)
+        state = (current_price, cash, positions.get("STOCK", 0))
+        
         try:
-            # Step 1: Sentiment analysis
-            sentiment = self._analyze_sentiment(current_price)
-            
-            # Step 2: Price prediction
-            prediction = self._predict_price(current_price, sentiment)
-            
-            # Step 3: Risk assessment
-            risk = self._assess_risk(current_price, prediction)
-            
-            # Step 4: Trading decision
-            decision = self._make_decision(current_price, sentiment, prediction, risk)
+            decision = self.speculator.take(state) if self.speculator else None
+            if decision is None:
+                decision = self._run_pipeline(*state)
             
             # Execute
-            self._execute_decision(decision, simulator, current_price)
+            filled = self._execute_decision(decision, simulator, current_price)
+            
+            if self.speculator:
+                # Next tick, assuming the order fills here and the price holds
+                self.speculator.launch(
+                    (current_price, state[1] - filled * current_price, state[2] + filled),
+                    self._run_pipeline
+                )
             
+        except CacheMiss:
+            # Strict replay: a missing response must fail the run, not become a hold
+            raise
         except Exception as e:
             print(f"{self.name} error: {e}")
     
+    def _run_pipeline(self, price, cash, position):
+        """Sentiment, prediction, risk and decision calls for one market state"""
+        # Step 1: Sentiment analysis
+        sentiment = self._analyze_sentiment(price)
+        
+        # Step 2: Price prediction
+        prediction = self._predict_price(price, sentiment)
+        
+        # Step 3: Risk assessment
+        risk = self._assess_risk(price, prediction, cash, position)
+        
+        # Step 4: Trading decision
+        return self._make_decision(price, sentiment, prediction, risk, cash, position)
+    
     def _analyze_sentiment(self, price):
         """Analyze market sentiment"""
-        prompt = f"""Analyze market sentiment for stock at ${price:.2f}.
-Return JSON:
-{{"sentiment": <-1 to 1>, "confidence": <0 to 1>}}"""
+        prompt = SENTIMENT_PROMPT.render(price=price)
         
         return self._call_llm(prompt)
     
@@ -52,85 +125,65 @@ Return JSON:
         """Predict price movement"""
         sent_score = sentiment.get("sentiment", 0)
         
-        prompt = f"""Predict price movement for stock at ${price:.2f}.
-Market sentiment: {sent_score:.2f}
-
-Return JSON:
-{{"expected_change_pct": <percentage>, "confidence": <0-1>}}"""
+        prompt = PREDICTION_PROMPT.render(price=price, sentiment=sent_score)
         
         return self._call_llm(prompt)
     
-    def _assess_risk(self, price, prediction):
+    def _assess_risk(self, price, prediction, cash=None, position=None):
         """Assess trading risk"""
-        portfolio_value = self.cash + self.positions.get("STOCK", 0) * price
+        cash = self.cash if cash is None else cash
+        position = self.positions.get("STOCK", 0) if position is None else position
+        portfolio_value = cash + position * price
         
-        prompt = f"""Assess risk for this trade.
-Portfolio Value: ${portfolio_value:.2f}
-Expected Change: {prediction.get('expected_change_pct', 0):.1f}%
-Risk Tolerance: {self.risk_tolerance}
-
-Return JSON:
-{{"risk_score": <0-1>, "recommended_size_pct": <0-100>}}"""
+        prompt = RISK_PROMPT.render(
+            portfolio_value=portfolio_value,
+            expected_change=prediction.get('expected_change_pct', 0),
+            risk_tolerance=self.risk_tolerance
+        )
         
         return self._call_llm(prompt)
     
-    def _make_decision(self, price, sentiment, prediction, risk):
+    def _make_decision(self, price, sentiment, prediction, risk, cash=None, position=None):
         """Make final trading decision"""
         expected_change = prediction.get("expected_change_pct", 0)
         recommended_size = risk.get("recommended_size_pct", 20)
         
-        prompt = f"""Make trading decision.
-Price: ${price:.2f}
-Expected Change: {expected_change:.1f}%
-Risk Score: {risk.get('risk_score', 0.5):.2f}
-Recommended Position: {recommended_size:.0f}% of portfolio
-Cash Available: ${self.cash:.2f}
-Current Position: {self.positions.get('STOCK', 0)} shares
-
-Return JSON:
-{{"action": "buy|sell|hold", "quantity": <number>, "reasoning": "<brief>"}}"""
+        prompt = DECISION_PROMPT.render(
+            price=price,
+            expected_change=expected_change,
+            risk_score=risk.get('risk_score', 0.5),
+            recommended_size=recommended_size,
+            cash=self.cash if cash is None else cash,
+            position=self.positions.get('STOCK', 0) if position is None else position
+        )
         
         return self._call_llm(prompt)
     
     def _execute_decision(self, decision, simulator, current_price):
-        """Execute trading decision"""
-        action = decision.get("action", "hold")
-        quantity = decision.get("quantity", 0)
-        
-        if action == "buy" and quantity > 0:
-            max_affordable = int(self.cash / current_price)
-            quantity = min(quantity, max_affordable)
-            quantity = int(quantity * self.risk_tolerance)
-            if quantity > 0:
-                simulator.submit_order(self.agent_id, "STOCK", "BUY", quantity, current_price)
-        
-        elif action == "sell" and quantity > 0:
-            current_position = self.positions.get("STOCK", 0)
-            quantity = min(quantity, current_position)
-            if quantity > 0:
-                simulator.submit_order(self.agent_id, "STOCK", "SELL", quantity, current_price)
-        
-        self.decisions.append(decision)
+        """Execute trading decision; returns the signed quantity submitted"""
+        submitted = submit_decision(self, decision, simulator, current_price)
+        self._record_decision(decision)
+        return submitted
     
     def _call_llm(self, prompt):
         """Call FinGPT (using GPT-3.5 as proxy)"""
         try:
-            response = openai.ChatCompletion.create(
+            content = chat_completion(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are FinGPT, a financial AI."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.5,
+                messages=prompt.messages,
+                temperature=self.temperature,
+                stage=prompt.name,
+                agent=self.agent_id,
                 max_tokens=250
             )
             
-            content = response.choices[0].message.content
             start = content.find("{")
             end = content.rfind("}") + 1
             
             if start != -1 and end > start:
                 return json.loads(content[start:end])
             return {}
+        except CacheMiss:
+            raise
         except:
             return {}
@@ -0,0 +1,280 @@
+"""
+Live Metrics - Rolling per-agent metrics served over local HTTP while a run is going
+
+The tick loop calls publisher.after_tick(tick, current_time). Each tick only
+folds cash/position changes into per-agent trade counters (a few array
+operations); once per `interval` seconds a snapshot is built and stored for
+the HTTP thread to serve:
+
+    GET /metrics            latest snapshot
+    GET /history?since=N    snapshots with seq > N (bounded ring)
+    GET /health             {"ok": true}
+
+Snapshot fields per agent: equity, pnl, pnl_pct, trades, wins, losses,
+win_rate, trades_per_sec. Run-wide: LLM call count and mean latency,
+decision latency p50/p95 (with a TickScheduler), and cache hit rate.
+
+Wins and losses use average-cost accounting, so no agent code has to
+report trades. With an ExecutionEngine (execution=...), every fill is
+folded at its own price net of fees. Without one, the tick's cash and
+position changes are all there is: one blended per-share price covers every
+symbol an agent traded that tick, and a buy and sell of the same symbol
+within one tick net out and are not counted.
+
+    with MetricsPublisher(agents, simulator, ledger=ledger, port=8766) as publisher:
+        scheduler.run(start, end, publisher=publisher)
+
+    python cli.py view live --url http://127.0.0.1:8766
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+
+class MetricsPublisher:
+    """Folds trades every tick, publishes a snapshot every `interval` seconds"""
+
+    def __init__(self, agents, simulator, ledger=None, symbols=("STOCK",), interval=1.0,
+                 scheduler=None, history=600, host="127.0.0.1", port=0, execution=None):
+        self.agents = list(agents)
+        self.simulator = simulator
+        self.ledger = ledger
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.scheduler = scheduler
+        self.execution = execution
+        self._rows = {a.agent_id: i for i, a in enumerate(self.agents)}
+        self._columns = {s: j for j, s in enumerate(self.symbols)}
+        self._fills = []
+        if execution is not None:
+            execution.fill_listeners.append(self._fills.append)
+
+        n, s = len(self.agents), len(self.symbols)
+        self.starting_cash = np.array([a.cash for a in self.agents], dtype=np.float64)
+        self._cash, self._positions = self._read_state()
+        self._avg_cost = np.zeros((n, s))
+        self.trades = np.zeros(n, dtype=np.int64)
+        self.wins = np.zeros(n, dtype=np.int64)
+        self.losses = np.zeros(n, dtype=np.int64)
+        self._interval_trades = np.zeros(n, dtype=np.int64)
+
+        self.seq = 0
+        self.latest = None
+        self.history = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._last_publish = time.monotonic()
+        self._tick = 0
+
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ------------------------------------------------------------------------
+    # Tick loop side
+    # ------------------------------------------------------------------------
+
+    def _read_state(self):
+        if self.ledger is not None:
+            slots = [self.ledger.slots[a.agent_id] for a in self.agents]
+            columns = [self.ledger._symbol_column(s) for s in self.symbols]
+            return self.ledger.cash[slots].copy(), self.ledger.positions[np.ix_(slots, columns)].astype(np.float64)
+        cash = np.array([a.cash for a in self.agents], dtype=np.float64)
+        positions = np.array([[a.positions.get(s, 0) for s in self.symbols] for a in self.agents],
+                             dtype=np.float64).reshape(len(self.agents), len(self.symbols))
+        return cash, positions
+
+    def _fold_fills(self):
+        """Average-cost accounting over each fill, in fill order, at its fee-inclusive price"""
+        batches = list(self._fills)
+        del self._fills[:]
+        held = self._positions.copy()
+        for fills in batches:
+            # Read after settlement, which may have clamped quantities in place
+            for agent_id, symbol, side, quantity, price, fee in zip(
+                    fills["agent_ids"], fills["symbols"], fills["sides"],
+                    fills["quantities"], fills["prices"], fills["fees"]):
+                i, j = self._rows.get(int(agent_id)), self._columns.get(symbol)
+                if i is None or j is None or quantity <= 0:
+                    continue
+                unit = float(price) + side * float(fee) / quantity
+                self.trades[i] += 1
+                self._interval_trades[i] += 1
+                if side > 0:
+                    owned = max(held[i, j], 0)
+                    self._avg_cost[i, j] = (self._avg_cost[i, j] * owned + unit * quantity) / (owned + quantity)
+                else:
+                    realized = (unit - self._avg_cost[i, j]) * quantity
+                    self.wins[i] += realized > 0
+                    self.losses[i] += realized <= 0
+                held[i, j] += side * quantity
+        self._cash, self._positions = self._read_state()
+
+    def _fold(self):
+        """Turn this tick's cash/position changes into trade, win and loss counts"""
+        if self.execution is not None:
+            self._fold_fills()
+            return
+        cash, positions = self._read_state()
+        dq = positions - self._positions
+        traded = np.abs(dq).sum(axis=1)
+        if traded.any():
+            # Per-share price of the tick's trades (cash attributed by |quantity|)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                price = np.where(traded > 0, np.abs(cash - self._cash) / traded, 0.0)[:, None]
+
+            bought = dq > 0
+            held = np.maximum(self._positions, 0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                new_cost = (self._avg_cost * held + price * dq) / (held + dq)
+            self._avg_cost = np.where(bought, new_cost, self._avg_cost)
+
+            sold = dq < 0
+            realized = np.where(sold, (price - self._avg_cost) * -dq, 0.0)
+            self.wins += (sold & (realized > 0)).sum(axis=1)
+            self.losses += (sold & (realized <= 0)).sum(axis=1)
+
+            changed = (dq != 0).sum(axis=1)
+            self.trades += changed
+            self._interval_trades += changed
+
+        self._cash, self._positions = cash, positions
+
+    def after_tick(self, tick, current_time):
+        """Call once per tick; cheap unless a publish is due"""
+        self._tick = tick
+        self._fold()
+        if time.monotonic() - self._last_publish >= self.interval:
+            self.publish(current_time)
+
+    def publish(self, current_time=None):
+        """Build and store a snapshot now"""
+        now = time.monotonic()
+        elapsed = max(now - self._last_publish, 1e-9)
+        self._last_publish = now
+
+        prices = np.array([(self.simulator.get_market_data(s) or {}).get("mid_price") or 0.0
+                           for s in self.symbols])
+        equity = self._cash + self._positions @ prices
+        pnl = equity - self.starting_cash
+        closed = self.wins + self.losses
+
+        agents = []
+        for i, agent in enumerate(self.agents):
+            agents.append({
+                "agent_id": agent.agent_id,
+                "name": agent.name,
+                "equity": round(float(equity[i]), 2),
+                "pnl": round(float(pnl[i]), 2),
+                "pnl_pct": round(float(100 * pnl[i] / self.starting_cash[i]), 3) if self.starting_cash[i] else 0.0,
+                "trades": int(self.trades[i]),
+                "wins": int(self.wins[i]),
+                "losses": int(self.losses[i]),
+                "win_rate": round(float(100 * self.wins[i] / closed[i]), 1) if closed[i] else 0.0,
+                "trades_per_sec": round(float(self._interval_trades[i] / elapsed), 3),
+            })
+        self._interval_trades[:] = 0
+
+        with self._lock:
+            self.seq += 1
+            snapshot = {
+                "seq": self.seq,
+                "tick": self._tick,
+                "time": str(current_time) if current_time is not None else None,
+                "wall_time": time.time(),
+                "agents": agents,
+                "llm": self._llm_metrics(),
+            }
+            self.latest = snapshot
+            self.history.append(snapshot)
+        return snapshot
+
+    def _llm_metrics(self):
+        from llm_client import call_stats_snapshot, get_cache
+
+        call_stats = call_stats_snapshot()
+        metrics = {
+            "calls": call_stats["calls"],
+            "mean_latency_ms": round(1000 * call_stats["seconds"] / call_stats["calls"], 1)
+            if call_stats["calls"] else 0.0,
+        }
+        cache = get_cache()
+        if cache is not None:
+            metrics["cache_hit_rate"] = round(100 * cache.hit_rate(), 1)
+        if self.scheduler is not None and self.scheduler.decision_latencies:
+            latencies = np.array(self.scheduler.decision_latencies)
+            metrics["decision_p50_ms"] = round(float(1000 * np.percentile(latencies, 50)), 1)
+            metrics["decision_p95_ms"] = round(float(1000 * np.percentile(latencies, 95)), 1)
+        return metrics
+
+    # ------------------------------------------------------------------------
+    # HTTP side
+    # ------------------------------------------------------------------------
+
+    def _handler_class(self):
+        publisher = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                path = url.path.rstrip("/")
+                if path == "/metrics":
+                    with publisher._lock:
+                        payload = publisher.latest
+                    self._send(200, payload or {"seq": 0, "agents": []})
+                elif path == "/history":
+                    since = int(parse_qs(url.query).get("since", ["0"])[0])
+                    with publisher._lock:
+                        payload = [s for s in publisher.history if s["seq"] > since]
+                    self._send(200, payload)
+                elif path == "/health":
+                    self._send(200, {"ok": True})
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def fetch_metrics(url, path="/metrics", timeout=5):
+    """GET a publisher endpoint and decode its JSON"""
+    from urllib.request import urlopen
+
+    with urlopen(url.rstrip("/") + path, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))
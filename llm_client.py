@@ -0,0 +1,194 @@
+"""
+LLM Client - Single entry point for agent chat-completion calls
+
+All agents call chat_completion() instead of openai directly, so response
+caching (and anything else that has to see every call) lives in one place.
+
+A ResponseCache keyed by (model, messages, temperature, max_tokens) lets
+parameter sweeps and replays reuse responses wherever prompts are
+identical. Modes:
+
+    "read_write"  serve hits from the cache, store new responses
+    "replay"      serve hits only; a miss raises CacheMiss (no API call)
+    "record"      always call the API and store the response
+
+    install_cache(ResponseCache("results/llm_cache.sqlite"))
+
+With a router.ModelRouter installed (install_router), each call is sent to
+a backend chosen for its pipeline stage (the prompt template name).
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+CACHE_MODES = ("read_write", "replay", "record")
+
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a prompt has no recorded response"""
+
+
+class ResponseCache:
+    """SQLite-backed prompt -> response store, safe across threads and processes"""
+
+    def __init__(self, path, mode="read_write"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode} (expected one of {CACHE_MODES})")
+        self.path = str(path)
+        self.mode = mode
+        self.stats = {"hits": 0, "misses": 0, "writes": 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, content TEXT, created REAL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def key(model, messages, temperature, max_tokens):
+        payload = json.dumps([model, messages, temperature, max_tokens], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+            self.stats["hits" if row else "misses"] += 1
+        return row[0] if row else None
+
+    def put(self, key, model, content):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, created) VALUES (?, ?, ?, ?)",
+                (key, model, content, time.time())
+            )
+            self._conn.commit()
+            self.stats["writes"] += 1
+
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache = None
+
+# Real (uncached) API calls, for live metrics; updated from worker threads
+call_stats = {"calls": 0, "seconds": 0.0}
+_call_stats_lock = threading.Lock()
+_usage = threading.local()
+
+
+def call_stats_snapshot():
+    """Consistent copy of call_stats"""
+    with _call_stats_lock:
+        return dict(call_stats)
+
+
+def install_cache(cache):
+    """Route every chat_completion() through `cache` (None to disable)"""
+    global _cache
+    _cache = cache
+    return cache
+
+
+def get_cache():
+    return _cache
+
+
+@contextmanager
+def track_usage():
+    """Count real API calls and tokens made by this thread inside the block"""
+    usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    previous = getattr(_usage, "current", None)
+    _usage.current = usage
+    try:
+        yield usage
+    finally:
+        _usage.current = previous
+
+
+def _response_usage(messages, response, content):
+    reported = response.get("usage") if hasattr(response, "get") else None
+    if reported:
+        return {"calls": 1, "prompt_tokens": reported.get("prompt_tokens", 0),
+                "completion_tokens": reported.get("completion_tokens", 0)}
+    from prompt_templates import count_tokens
+    return {"calls": 1, "prompt_tokens": sum(count_tokens(m["content"]) for m in messages),
+            "completion_tokens": count_tokens(content)}
+
+
+_router = None
+
+
+def install_router(router):
+    """Send every chat_completion() through a router.ModelRouter (None to disable)"""
+    global _router
+    _router = router
+    return router
+
+
+def get_router():
+    return _router
+
+
+def chat_completion(model, messages, temperature, max_tokens, stage=None, agent=None):
+    """Return the assistant message text for one chat completion"""
+    router = _router
+    if router is not None:
+        return router.complete(stage, model, messages, temperature, max_tokens, agent)
+    return complete(model, messages, temperature, max_tokens)[0]
+
+
+def complete(model, messages, temperature, max_tokens, api_base=None, api_key=None, timeout=None):
+    """(content, usage) for one call on one backend; usage is None for cache hits"""
+    cache = _cache
+    key = None
+    if cache is not None:
+        key = ResponseCache.key(model, messages, temperature, max_tokens)
+        if cache.mode != "record":
+            content = cache.get(key)
+            if content is not None:
+                return content, None
+            if cache.mode == "replay":
+                raise CacheMiss(f"No recorded response for {model} prompt {key[:12]}")
+
+    import openai
+    backend = {}
+    if api_base is not None:
+        backend["api_base"] = api_base
+    if api_key is not None:
+        backend["api_key"] = api_key
+    if timeout is not None:
+        backend["request_timeout"] = timeout
+
+    started = time.perf_counter()
+    response = openai.ChatCompletion.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        **backend
+    )
+    with _call_stats_lock:
+        call_stats["calls"] += 1
+        call_stats["seconds"] += time.perf_counter() - started
+    content = response.choices[0].message.content
+
+    usage = _response_usage(messages, response, content)
+    tracked = getattr(_usage, "current", None)
+    if tracked is not None:
+        for name, value in usage.items():
+            tracked[name] += value
+
+    if cache is not None:
+        cache.put(key, model, content)
+    return content, usage
@@ -0,0 +1,358 @@
+"""
+Market Data Replay - Historical OHLCV bars from memory-mapped columnar caches
+
+Source files (CSV, Parquet or NumPy binary) are converted once into a
+per-symbol cache directory with one .npy file per column:
+
+    <cache_dir>/<SYMBOL>/timestamp.npy   int64 nanoseconds since epoch
+                         open.npy high.npy low.npy close.npy volume.npy
+                         meta.json       rows, range, source fingerprint
+
+Loading maps those files with np.load(mmap_mode="r"), so opening years of
+minute bars is a few syscalls, not a parse; pages are read on first touch.
+Seeking is a binary search on the timestamp column. replay() walks a date
+range in chunks and prefetches the next chunk on a background thread.
+
+    convert_file("data/AAPL_1min.csv", "cache", "AAPL")
+    feed = DataFeed("cache", ["AAPL"])
+    for timestamp in feed.replay("2023-01-03", "2023-12-29"):
+        data = feed.get_market_data("AAPL")   # same shape agents already use
+"""
+
+import csv
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+COLUMNS = ["open", "high", "low", "close", "volume"]
+TIMESTAMP_ALIASES = ["timestamp", "datetime", "date", "time", "ts"]
+CSV_CHUNK_ROWS = 262144
+
+# Epoch numbers below each bound are read in that unit: (bound, ns per unit)
+EPOCH_UNITS = ((1e11, 10 ** 9), (1e14, 10 ** 6), (1e17, 10 ** 3))
+
+
+def _epoch_to_ns(values):
+    """Epoch seconds / ms / us / ns -> int64 ns; the unit is picked by magnitude"""
+    values = np.asarray(values)
+    if not values.size:
+        return values.astype(np.int64)
+    magnitude = abs(float(values.flat[0]))
+    scale = next((scale for bound, scale in EPOCH_UNITS if magnitude < bound), 1)
+    if values.dtype.kind in "iu":
+        return values.astype(np.int64) * scale
+    return np.round(values.astype(np.float64) * scale).astype(np.int64)
+
+
+def to_ns(value):
+    """Timestamp-like (str, datetime, np.datetime64, epoch number) -> int64 ns"""
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        return int(_epoch_to_ns(np.array([value]))[0])
+    return int(np.datetime64(value, "ns").astype(np.int64))
+
+
+def _parse_timestamps(raw):
+    """Vectorized parse of a column of ISO strings or epoch numbers"""
+    raw = np.asarray(raw)
+    if raw.dtype.kind in "iuf":
+        return _epoch_to_ns(raw)
+    try:
+        numeric = raw.astype(np.float64)
+    except ValueError:
+        return raw.astype("datetime64[ns]").astype(np.int64)
+    if numeric.size and numeric.flat[0] >= 1e17:
+        # Integer ns strings lose precision as float64; parse them exactly when possible
+        try:
+            return raw.astype(np.int64)
+        except ValueError:
+            pass
+    return _epoch_to_ns(numeric)
+
+
+def _source_fingerprint(path):
+    stat = os.stat(path)
+    return {"source": str(Path(path).resolve()), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+# ============================================================================
+# CONVERSION
+# ============================================================================
+
+def _write_cache(target, arrays):
+    """Write column arrays (sorted by timestamp) atomically into `target`"""
+    order = np.argsort(arrays["timestamp"], kind="stable")
+    if not np.all(order == np.arange(len(order))):
+        arrays = {name: column[order] for name, column in arrays.items()}
+
+    target.mkdir(parents=True, exist_ok=True)
+    for name, column in arrays.items():
+        tmp = target / f"{name}.npy.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, column)
+        os.replace(tmp, target / f"{name}.npy")
+
+
+def _read_csv(path):
+    """CSV -> column arrays; uses pandas' C parser when available"""
+    try:
+        import pandas as pd
+    except ImportError:
+        return _read_csv_stdlib(path)
+
+    df = pd.read_csv(path, float_precision="round_trip")
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    ts_name = next((a for a in TIMESTAMP_ALIASES if a in df.columns), None)
+    if ts_name is None:
+        raise ValueError(f"{path}: no timestamp column (expected one of {TIMESTAMP_ALIASES})")
+    raw = df[ts_name]
+    if raw.dtype.kind in "iuf":
+        timestamps = _parse_timestamps(raw.to_numpy())
+    else:
+        timestamps = np.asarray(pd.to_datetime(raw).values, dtype="datetime64[ns]").astype(np.int64)
+    arrays = {"timestamp": timestamps}
+    close = df["close"].to_numpy(dtype=np.float64)
+    for name in COLUMNS:
+        arrays[name] = df[name].to_numpy(dtype=np.float64) if name in df.columns else (
+            close if name != "volume" else np.zeros_like(close))
+    return arrays
+
+
+def _read_csv_stdlib(path):
+    """Stream a CSV in chunks into column arrays"""
+    with open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        header = [h.strip().lower() for h in next(reader)]
+        ts_col = next((header.index(a) for a in TIMESTAMP_ALIASES if a in header), None)
+        if ts_col is None:
+            raise ValueError(f"{path}: no timestamp column (expected one of {TIMESTAMP_ALIASES})")
+        indices = {name: header.index(name) for name in COLUMNS if name in header}
+        if "close" not in indices:
+            raise ValueError(f"{path}: no close column")
+
+        chunks = {name: [] for name in ["timestamp"] + COLUMNS}
+        while True:
+            rows = [row for _, row in zip(range(CSV_CHUNK_ROWS), reader) if row]
+            if not rows:
+                break
+            columns = list(zip(*rows))
+            chunks["timestamp"].append(_parse_timestamps(np.array(columns[ts_col])))
+            close = np.array(columns[indices["close"]], dtype=np.float64)
+            for name in COLUMNS:
+                if name in indices:
+                    chunks[name].append(np.array(columns[indices[name]], dtype=np.float64))
+                else:
+                    chunks[name].append(close if name != "volume" else np.zeros_like(close))
+
+    return {name: np.concatenate(parts) if parts else np.zeros(0) for name, parts in chunks.items()}
+
+
+def _read_parquet(path):
+    import pandas as pd
+
+    df = pd.read_parquet(path)
+    df.columns = [str(c).lower() for c in df.columns]
+    ts_name = next((a for a in TIMESTAMP_ALIASES if a in df.columns), None)
+    timestamps = pd.to_datetime(df.index if ts_name is None else df[ts_name])
+    arrays = {"timestamp": np.asarray(timestamps.values, dtype="datetime64[ns]").astype(np.int64)}
+    close = df["close"].to_numpy(dtype=np.float64)
+    for name in COLUMNS:
+        arrays[name] = df[name].to_numpy(dtype=np.float64) if name in df.columns else (
+            close if name != "volume" else np.zeros_like(close))
+    return arrays
+
+
+def _read_binary(path):
+    """.npy structured array or .npz archive with timestamp + OHLCV fields"""
+    loaded = np.load(path, allow_pickle=False)
+    fields = loaded.files if hasattr(loaded, "files") else loaded.dtype.names
+    ts_name = next((a for a in TIMESTAMP_ALIASES if a in fields), None)
+    if ts_name is None:
+        raise ValueError(f"{path}: no timestamp field")
+    raw = np.asarray(loaded[ts_name])
+    arrays = {"timestamp": raw.astype("datetime64[ns]").astype(np.int64)
+              if raw.dtype.kind == "M" else _parse_timestamps(raw)}
+    close = np.asarray(loaded["close"], dtype=np.float64)
+    for name in COLUMNS:
+        arrays[name] = np.asarray(loaded[name], dtype=np.float64) if name in fields else (
+            close if name != "volume" else np.zeros_like(close))
+    return arrays
+
+
+READERS = {".csv": _read_csv, ".parquet": _read_parquet, ".pq": _read_parquet,
+           ".npy": _read_binary, ".npz": _read_binary}
+
+
+def convert_file(source, cache_dir, symbol, force=False):
+    """Convert a source file into the memory-mapped cache once; returns the cache dir"""
+    source = Path(source)
+    target = Path(cache_dir) / symbol
+    meta_path = target / "meta.json"
+    fingerprint = _source_fingerprint(source)
+
+    if not force and meta_path.exists():
+        with open(meta_path, "r") as f:
+            if json.load(f).get("fingerprint") == fingerprint:
+                return target
+
+    reader = READERS.get(source.suffix.lower())
+    if reader is None:
+        raise ValueError(f"Unsupported market data format: {source.suffix}")
+
+    arrays = reader(source)
+    _write_cache(target, arrays)
+
+    timestamps = np.load(target / "timestamp.npy", mmap_mode="r")
+    meta = {
+        "symbol": symbol,
+        "rows": int(len(timestamps)),
+        "start": str(np.datetime64(int(timestamps[0]), "ns")) if len(timestamps) else None,
+        "end": str(np.datetime64(int(timestamps[-1]), "ns")) if len(timestamps) else None,
+        "fingerprint": fingerprint,
+    }
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    return target
+
+
+# ============================================================================
+# MEMORY-MAPPED SERIES AND REPLAY FEED
+# ============================================================================
+
+class OHLCVSeries:
+    """One symbol's cached columns, memory-mapped read-only"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.timestamp = np.load(self.path / "timestamp.npy", mmap_mode="r")
+        for name in COLUMNS:
+            setattr(self, name, np.load(self.path / f"{name}.npy", mmap_mode="r"))
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def index_at(self, timestamp):
+        """Index of the last bar at or before `timestamp` (-1 if none)"""
+        return int(np.searchsorted(self.timestamp, to_ns(timestamp), side="right")) - 1
+
+    def slice(self, start, end):
+        """Row range [first bar >= start, first bar > end)"""
+        lo = int(np.searchsorted(self.timestamp, to_ns(start), side="left"))
+        hi = int(np.searchsorted(self.timestamp, to_ns(end), side="right"))
+        return lo, hi
+
+    def bar(self, index):
+        return {
+            "timestamp": int(self.timestamp[index]),
+            **{name: float(getattr(self, name)[index]) for name in COLUMNS},
+        }
+
+    def touch(self, lo, hi):
+        """Fault the pages of rows [lo, hi) into the page cache"""
+        for name in ["timestamp"] + COLUMNS:
+            column = getattr(self, name)
+            if hi > lo:
+                # Summing one value per 4 KB page reads every page without copying
+                step = max(1, 4096 // column.itemsize)
+                np.add.reduce(column[lo:hi:step])
+
+
+class DataFeed:
+    """Replays cached bars for several symbols; a drop-in market data source"""
+
+    def __init__(self, cache_dir, symbols, spread_bps=1.0, book_levels=5):
+        self.cache_dir = Path(cache_dir)
+        self.symbols = list(symbols)
+        self.series = {symbol: OHLCVSeries(self.cache_dir / symbol) for symbol in self.symbols}
+        self.spread_bps = spread_bps
+        self.book_levels = book_levels
+        self.current_time = None
+        self._cursor = {symbol: -1 for symbol in self.symbols}
+
+    def seek(self, timestamp):
+        """Position every symbol on its last bar at or before `timestamp`"""
+        self.current_time = to_ns(timestamp)
+        for symbol, series in self.series.items():
+            self._cursor[symbol] = series.index_at(self.current_time)
+        return self
+
+    def get_market_data(self, symbol):
+        """Market snapshot in the simulator's shape: mid_price plus synthetic book levels"""
+        index = self._cursor.get(symbol, -1)
+        if index < 0:
+            return {"mid_price": None, "bids": [], "asks": []}
+
+        series = self.series[symbol]
+        close = float(series.close[index])
+        volume = float(series.volume[index])
+        half_spread = close * self.spread_bps / 20000
+        level_size = volume / self.book_levels if self.book_levels else 0.0
+        tick = max(half_spread, 0.01)
+        return {
+            "mid_price": close,
+            "timestamp": int(series.timestamp[index]),
+            "open": float(series.open[index]),
+            "high": float(series.high[index]),
+            "low": float(series.low[index]),
+            "close": close,
+            "volume": volume,
+            "bids": [(close - half_spread - i * tick, level_size) for i in range(self.book_levels)],
+            "asks": [(close + half_spread + i * tick, level_size) for i in range(self.book_levels)],
+        }
+
+    def replay(self, start, end, chunk_rows=65536, prefetch=True):
+        """
+        Yield each bar timestamp (ns) in [start, end] across all symbols, with the
+        feed positioned on it. The next chunk is prefetched while one is consumed.
+        """
+        bounds = {symbol: series.slice(start, end) for symbol, series in self.series.items()}
+        positions = {symbol: lo for symbol, (lo, _) in bounds.items()}
+        self.seek(start)
+        prefetcher = None
+
+        while True:
+            # Merge the next chunk of timestamps from every symbol
+            chunk = []
+            for symbol, (lo, hi) in bounds.items():
+                position = positions[symbol]
+                if position < hi:
+                    upto = min(hi, position + chunk_rows)
+                    chunk.append(np.asarray(self.series[symbol].timestamp[position:upto]))
+            if not chunk:
+                break
+
+            horizon = min(c[-1] for c in chunk)
+            timestamps = np.unique(np.concatenate(chunk))
+            timestamps = timestamps[timestamps <= horizon]
+
+            for symbol, (lo, hi) in bounds.items():
+                series = self.series[symbol]
+                positions[symbol] = int(np.searchsorted(series.timestamp, horizon, side="right"))
+
+            if prefetch:
+                if prefetcher is not None:
+                    prefetcher.join()
+                prefetcher = threading.Thread(
+                    target=self._prefetch, args=(dict(positions), bounds, chunk_rows), daemon=True
+                )
+                prefetcher.start()
+
+            for timestamp in timestamps:
+                self.current_time = int(timestamp)
+                for symbol, series in self.series.items():
+                    cursor = self._cursor[symbol]
+                    ts_column = series.timestamp
+                    while cursor + 1 < len(ts_column) and ts_column[cursor + 1] <= timestamp:
+                        cursor += 1
+                    self._cursor[symbol] = cursor
+                yield int(timestamp)
+
+        if prefetcher is not None:
+            prefetcher.join()
+
+    def _prefetch(self, positions, bounds, chunk_rows):
+        for symbol, (lo, hi) in bounds.items():
+            position = positions[symbol]
+            self.series[symbol].touch(position, min(hi, position + chunk_rows))
@@ -0,0 +1,123 @@
+"""
+Agent Metrics - Per-agent performance metrics from results/*_results.json
+
+Pure standard library so it is cheap to import; scipy is only loaded by
+significance_tests().
+"""
+
+import json
+import statistics
+from datetime import datetime
+from pathlib import Path
+
+AGENT_FILES = ["stockagent", "tradingagents", "fingpt"]
+
+# Column order of comparison_metrics.csv
+METRIC_COLUMNS = [
+    "total_trades", "profitable_trades", "losing_trades", "win_rate",
+    "total_profit", "average_profit", "max_profit", "max_loss",
+    "std_deviation", "sharpe_ratio", "profit_factor", "avg_duration_hours",
+    "agent", "timestamp", "config",
+]
+
+
+def load_results(results_dir="results", agent_files=None):
+    """Load every available <agent>_results.json, keyed by agent file name"""
+    results_dir = Path(results_dir)
+    results = {}
+    for agent_file in agent_files or AGENT_FILES:
+        filepath = results_dir / f"{agent_file}_results.json"
+        if filepath.exists():
+            with open(filepath, "r") as f:
+                results[agent_file] = json.load(f)
+    return results
+
+
+def trade_profits(result):
+    return [trade.get("profit", 0) for trade in result.get("trades", [])]
+
+
+def compute_metrics(result):
+    """One comparison_metrics.csv row for a single agent's results"""
+    trades = result.get("trades", [])
+    profits = trade_profits(result)
+
+    gross_profit = sum(p for p in profits if p > 0)
+    gross_loss = -sum(p for p in profits if p < 0)
+    std = statistics.pstdev(profits) if profits else 0.0
+    average = statistics.mean(profits) if profits else 0.0
+
+    durations = []
+    for trade in trades:
+        try:
+            entry = datetime.fromisoformat(trade["entry_time"])
+            exit = datetime.fromisoformat(trade["exit_time"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        durations.append((exit - entry).total_seconds() / 3600)
+
+    return {
+        "total_trades": len(profits),
+        "profitable_trades": sum(1 for p in profits if p > 0),
+        "losing_trades": sum(1 for p in profits if p < 0),
+        "win_rate": 100 * sum(1 for p in profits if p > 0) / len(profits) if profits else 0.0,
+        "total_profit": sum(profits),
+        "average_profit": average,
+        "max_profit": max(profits) if profits else 0.0,
+        "max_loss": min(profits) if profits else 0.0,
+        "std_deviation": std,
+        "sharpe_ratio": average / std if std > 0 else 0.0,
+        "profit_factor": gross_profit / gross_loss if gross_loss > 0 else float("inf") if gross_profit else 0.0,
+        "avg_duration_hours": statistics.mean(durations) if durations else 0.0,
+        "agent": result.get("agent", ""),
+        "timestamp": result.get("timestamp", ""),
+        "config": str(result.get("config", {})),
+    }
+
+
+def significance_tests(results, alpha=0.05):
+    """Pairwise two-sample t-tests on trade profits: {"A_vs_B": {"p_value", "significant"}}"""
+    from itertools import combinations
+    from scipy import stats
+
+    tests = {}
+    for a, b in combinations(list(results.values()), 2):
+        profits_a, profits_b = trade_profits(a), trade_profits(b)
+        if len(profits_a) < 2 or len(profits_b) < 2:
+            continue
+        p_value = float(stats.ttest_ind(profits_a, profits_b).pvalue)
+        tests[f"{a.get('agent')}_vs_{b.get('agent')}"] = {
+            "p_value": p_value,
+            "significant": p_value < alpha,
+        }
+    return tests
+
+
+# Metrics ranked for agent_rankings.csv (higher value = better rank)
+RANK_METRICS = ["total_profit", "win_rate", "sharpe_ratio", "profit_factor", "total_trades"]
+
+
+def average_ranks(values):
+    """Descending ranks starting at 1, ties share the average rank"""
+    order = sorted(range(len(values)), key=lambda i: -values[i])
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2 + 1
+        i = j + 1
+    return ranks
+
+
+def rank_rows(rows):
+    """agent_rankings.csv rows: per-metric ranks and their mean as overall_rank"""
+    rankings = [{"agent": row["agent"]} for row in rows]
+    for metric in RANK_METRICS:
+        for ranking, rank in zip(rankings, average_ranks([row[metric] for row in rows])):
+            ranking[f"{metric}_rank"] = rank
+    for ranking in rankings:
+        ranking["overall_rank"] = sum(ranking[f"{m}_rank"] for m in RANK_METRICS) / len(RANK_METRICS)
+    return rankings
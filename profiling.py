@@ -0,0 +1,261 @@
+"""
+Profiling Hooks - Opt-in stage timers and sampling profiler
+
+Nothing is patched until Profiler.enable() is called, so a disabled
+profiler costs exactly nothing. Once enabled, on_tick and each pipeline
+stage method are wrapped with perf_counter_ns timers:
+
+    profiler = Profiler([StockAgentTrader, FinGPTAgent], simulator=sim)
+    with profiler:
+        scheduler.run(start, end)
+    profiler.print_report()
+    profiler.write_collapsed("profile.folded")   # flamegraph.pl / speedscope
+
+Pass sample_interval=0.005 to also run a sampling profiler over all
+threads; write its stacks with write_collapsed(path, sampled=True).
+
+Besides the agent stages, prompt rendering (PromptTemplate.render) and the
+raw LLM wait (openai.ChatCompletion.create) are timed, so _call_llm's self
+time is what is left for request building and JSON parsing.
+"""
+
+import sys
+import threading
+import time
+from collections import defaultdict
+
+# Stage methods wrapped for each agent class, in pipeline order
+STAGES = {
+    "StockAgentTrader": ["on_tick", "_build_prompt", "_call_llm", "_execute_decision"],
+    "FinGPTAgent": ["on_tick", "_analyze_sentiment", "_predict_price", "_assess_risk",
+                    "_make_decision", "_execute_decision", "_call_llm"],
+    "TradingAgentsSystem": ["on_tick", "_fundamental_analysis", "_technical_analysis",
+                            "_trader_decision", "_risk_management", "_execute_decision", "_call_llm"],
+}
+
+SIMULATOR_STAGES = ["get_market_data", "submit_order"]
+
+# Histogram bucket upper bounds in microseconds (powers of two up to ~67 s)
+BUCKET_BOUNDS_US = [2 ** i for i in range(27)]
+
+
+class StageStats:
+    """Call count, total time and log2 latency histogram for one stage"""
+
+    __slots__ = ("count", "total_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_US) + 1)
+
+    def add(self, elapsed_ns):
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        self.buckets[min((elapsed_ns // 1000).bit_length(), len(BUCKET_BOUNDS_US))] += 1
+
+    def percentile_us(self, pct):
+        """Upper bound of the bucket containing the pct-th percentile"""
+        if not self.count:
+            return 0
+        target = pct / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return BUCKET_BOUNDS_US[index] if index < len(BUCKET_BOUNDS_US) else self.max_ns // 1000
+        return self.max_ns // 1000
+
+
+class Profiler:
+    """Wraps agent stages (and optionally simulator calls) with low-overhead timers"""
+
+    def __init__(self, agent_classes=(), simulator=None, extra_targets=None,
+                 include_llm=True, include_prompts=True, sample_interval=None):
+        self.targets = []
+        for cls in agent_classes:
+            self.targets.append((cls, STAGES.get(cls.__name__, ["on_tick"])))
+        if simulator is not None:
+            self.targets.append((type(simulator), SIMULATOR_STAGES))
+        for cls, names in (extra_targets or {}).items():
+            self.targets.append((cls, list(names)))
+
+        self.include_llm = include_llm
+        self.include_prompts = include_prompts
+        self.sampler = SamplingProfiler(sample_interval) if sample_interval else None
+
+        self.stages = defaultdict(StageStats)
+        self.stacks = defaultdict(int)
+        self.enabled = False
+
+        self._originals = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------------
+    # Enable / disable
+    # ------------------------------------------------------------------------
+
+    def enable(self):
+        if self.enabled:
+            return self
+        for cls, names in self.targets:
+            for name in names:
+                self._wrap(cls, name, f"{cls.__name__}.{name}")
+
+        if self.include_prompts:
+            from prompt_templates import PromptTemplate
+            self._wrap(PromptTemplate, "render", "prompt_build")
+
+        if self.include_llm:
+            try:
+                import openai
+                self._wrap(openai.ChatCompletion, "create", "llm_wait")
+            except (ImportError, AttributeError):
+                pass
+
+        if self.sampler is not None:
+            self.sampler.start()
+        self.enabled = True
+        return self
+
+    def disable(self):
+        if not self.enabled:
+            return self
+        for cls, name, descriptor in reversed(self._originals):
+            if descriptor is None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, descriptor)
+        self._originals = []
+        if self.sampler is not None:
+            self.sampler.stop()
+        self.enabled = False
+        return self
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, *exc):
+        self.disable()
+
+    def _wrap(self, cls, name, label):
+        descriptor = cls.__dict__.get(name)
+        target = getattr(cls, name, None)
+        if target is None:
+            return
+
+        record = self._record
+        local = self._local
+
+        def timed(*args, **kwargs):
+            stack = getattr(local, "stack", None)
+            if stack is None:
+                stack = local.stack = []
+            stack.append([label, 0])
+            started = time.perf_counter_ns()
+            try:
+                return target(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter_ns() - started
+                frame = stack.pop()
+                if stack:
+                    stack[-1][1] += elapsed
+                record(label, stack, elapsed, elapsed - frame[1])
+
+        timed.__name__ = name
+        timed.__wrapped__ = target
+
+        if isinstance(descriptor, (classmethod, staticmethod)):
+            setattr(cls, name, staticmethod(timed))
+        else:
+            setattr(cls, name, timed)
+        self._originals.append((cls, name, descriptor))
+
+    def _record(self, label, stack, elapsed_ns, self_ns):
+        path = ";".join([frame[0] for frame in stack] + [label])
+        with self._lock:
+            self.stages[label].add(elapsed_ns)
+            self.stacks[path] += self_ns
+
+    # ------------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------------
+
+    def histogram(self):
+        """Per-stage summary: count, total/mean ms, p50/p99 us and raw buckets"""
+        return {
+            label: {
+                "count": stats.count,
+                "total_ms": stats.total_ns / 1e6,
+                "mean_ms": stats.total_ns / stats.count / 1e6 if stats.count else 0.0,
+                "p50_us": stats.percentile_us(50),
+                "p99_us": stats.percentile_us(99),
+                "max_ms": stats.max_ns / 1e6,
+                "buckets_us": dict(zip(BUCKET_BOUNDS_US + ["inf"], stats.buckets)),
+            }
+            for label, stats in self.stages.items()
+        }
+
+    def collapsed(self, sampled=False):
+        """Flamegraph collapsed stacks: stage self-time in us, or raw sample counts"""
+        if sampled:
+            return self.sampler.collapsed() if self.sampler is not None else []
+        return [f"{path} {ns // 1000}" for path, ns in sorted(self.stacks.items()) if ns >= 1000]
+
+    def write_collapsed(self, path, sampled=False):
+        with open(path, "w") as f:
+            f.write("\n".join(self.collapsed(sampled)) + "\n")
+        return path
+
+    def print_report(self):
+        print("=" * 80)
+        print("STAGE PROFILE")
+        print("=" * 80)
+        print(f"{'stage':<42}{'calls':>8}{'total ms':>12}{'mean ms':>10}{'p50 us':>10}{'p99 us':>10}")
+        print("-" * 80)
+        rows = sorted(self.histogram().items(), key=lambda item: -item[1]["total_ms"])
+        for label, row in rows:
+            print(f"{label:<42}{row['count']:>8}{row['total_ms']:>12.1f}"
+                  f"{row['mean_ms']:>10.2f}{row['p50_us']:>10}{row['p99_us']:>10}")
+
+
+class SamplingProfiler:
+    """Background thread that samples every thread's Python stack at an interval"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = defaultdict(int)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(names))] += 1
+
+    def collapsed(self):
+        """Collapsed stacks weighted by sample count"""
+        return [f"{stack} {count}" for stack, count in sorted(self.samples.items())]
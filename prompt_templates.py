@@ -0,0 +1,173 @@
+"""
+Prompt Templates - Precompiled prompts with a stable, cacheable prefix
+
+A PromptTemplate is parsed once into literal and field segments. Static
+fields (agent personality, traits, ...) are baked in with partial(), which
+is cached per agent class and personality, so each tick only formats the
+dynamic numbers.
+
+Every rendered prompt exposes:
+    static_prefix    system message + leading literal text of the user
+                     message; identical across ticks so provider-side
+                     prompt-prefix caching can reuse it
+    prefix_cache_key short hash of static_prefix
+    tokens           prompt-token estimate: the static part is counted once
+                     at compile time, only dynamic field values per render
+"""
+
+import hashlib
+import threading
+from string import Formatter
+
+_encoder = None
+_encoder_loaded = False
+
+
+def count_tokens(text):
+    """Token count via tiktoken when installed, else a ~4 chars/token estimate"""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoder = None
+        _encoder_loaded = True
+
+    if _encoder is not None:
+        return len(_encoder.encode(text))
+    return (len(text) + 3) // 4
+
+
+# Per-message overhead the chat API adds around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Every template ever compiled, for template_stats()
+_templates = []
+
+
+class RenderedPrompt:
+    """A filled-in template, ready to send as chat messages"""
+
+    __slots__ = ("system", "text", "static_prefix", "prefix_cache_key", "static_tokens", "tokens", "name")
+
+    def __init__(self, system, text, static_prefix, prefix_cache_key, static_tokens, tokens, name=None):
+        self.system = system
+        self.text = text
+        self.static_prefix = static_prefix
+        self.prefix_cache_key = prefix_cache_key
+        self.static_tokens = static_tokens
+        self.tokens = tokens
+        self.name = name
+
+    @property
+    def messages(self):
+        messages = []
+        if self.system is not None:
+            messages.append({"role": "system", "content": self.system})
+        messages.append({"role": "user", "content": self.text})
+        return messages
+
+    def __str__(self):
+        return self.text
+
+
+class PromptTemplate:
+    """str.format-style template compiled once into literal/field segments"""
+
+    def __init__(self, body, system=None, name=None):
+        self.body = body
+        self.system = system
+        self.name = name
+        self._segments = [
+            (literal, field, spec)
+            for literal, field, spec, _conversion in Formatter().parse(body)
+        ]
+        self.fields = [field for _, field, _ in self._segments if field is not None]
+
+        # Static prefix: system message plus the literal text before the first field
+        leading = self._segments[0][0] if self._segments else ""
+        self.static_prefix = (system + "\n" if system is not None else "") + leading
+        self.prefix_cache_key = hashlib.sha1(self.static_prefix.encode("utf-8")).hexdigest()[:16]
+
+        # Literal tokens are counted once here, never per render
+        literal_text = "".join(literal for literal, _, _ in self._segments)
+        self.static_tokens = count_tokens(self.static_prefix)
+        self._literal_tokens = count_tokens(literal_text)
+        self._system_tokens = count_tokens(system) if system is not None else 0
+        self._overhead = MESSAGE_OVERHEAD_TOKENS * (2 if system is not None else 1)
+
+        self.renders = 0
+        self.prompt_tokens = 0
+        self._stats_lock = threading.Lock()
+        _templates.append(self)
+
+    def partial(self, **static_fields):
+        """Bake static fields in as literals and return a new compiled template"""
+        parts = []
+        for literal, field, spec in self._segments:
+            parts.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is None:
+                continue
+            if field in static_fields:
+                value = format(static_fields[field], spec or "")
+                parts.append(value.replace("{", "{{").replace("}", "}}"))
+            else:
+                parts.append("{" + field + (":" + spec if spec else "") + "}")
+
+        system = self.system.format(**static_fields) if self.system is not None else None
+        return PromptTemplate("".join(parts), system=system, name=self.name)
+
+    def render(self, **fields):
+        """Fill dynamic fields; only the field values are token-counted"""
+        parts = []
+        dynamic_tokens = 0
+        for literal, field, spec in self._segments:
+            parts.append(literal)
+            if field is not None:
+                value = format(fields[field], spec or "")
+                parts.append(value)
+                dynamic_tokens += count_tokens(value)
+
+        tokens = self._system_tokens + self._literal_tokens + dynamic_tokens + self._overhead
+        with self._stats_lock:
+            self.renders += 1
+            self.prompt_tokens += tokens
+
+        return RenderedPrompt(
+            self.system, "".join(parts), self.static_prefix,
+            self.prefix_cache_key, self.static_tokens, tokens, self.name
+        )
+
+
+# ============================================================================
+# COMPILED TEMPLATE CACHE
+# ============================================================================
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def compiled_template(key, build):
+    """Return the template cached under `key`, building it once with build()"""
+    template = _compiled.get(key)
+    if template is None:
+        with _compiled_lock:
+            template = _compiled.get(key)
+            if template is None:
+                template = build()
+                _compiled[key] = template
+    return template
+
+
+def template_stats():
+    """Render counts and prompt-token totals for every template that has rendered"""
+    return {
+        (template.name, template.prefix_cache_key): {
+            "renders": template.renders,
+            "prompt_tokens": template.prompt_tokens,
+            "static_tokens": template.static_tokens,
+        }
+        for template in _templates
+        if template.renders
+    }
@@ -0,0 +1,262 @@
+"""
+Ranking Engine - Vectorized rank aggregation over many runs and configurations
+
+agent_rankings.csv averages five per-metric ranks for three agents in one
+run. RankingEngine does the same kind of ranking for hundreds of agent
+configurations (personality x model x risk_tolerance) across thousands of
+runs, and offers three aggregations:
+
+    weighted  mean over runs of the weighted per-metric rank, scaled to
+              0 (best) .. 1 (worst) within each run (lower = better)
+    borda     Borda points from each run's composite ordering, as the share
+              of that run's other configs beaten (higher = better)
+    kemeny    Kemeny-style consensus: Borda order refined by local
+              Kemenization (adjacent swaps that a majority of runs prefer)
+
+Runs are added incrementally with add_runs() / add_run(); aggregates are
+kept as running sums, so new runs only cost their own ranking. Configs
+missing from a run are NaN and are ranked among the configs present; the
+per-run scaling keeps a place in a 3-config run comparable to one in a
+300-config run. A run with a single config present compares nothing and
+only counts towards Kemeny.
+
+    engine = RankingEngine(["total_profit", "win_rate", "sharpe_ratio"])
+    engine.add_run({"Aggressive/gpt-4o-mini/0.8": {...metrics...}, ...})
+    engine.ranking("kemeny")
+"""
+
+import numpy as np
+
+from metrics import RANK_METRICS
+
+TIE_METHODS = ("average", "min", "max", "dense")
+AGGREGATIONS = ("weighted", "borda", "kemeny")
+
+
+def rank_rows_nan(values, ties="average", higher_is_better=True):
+    """
+    Rank each row of a 2-D array (1 = best); NaN entries stay NaN.
+    Ties share the average/min/max position, or consecutive dense ranks.
+    """
+    if ties not in TIE_METHODS:
+        raise ValueError(f"Unknown tie method: {ties} (expected one of {TIE_METHODS})")
+
+    values = np.asarray(values, dtype=np.float64)
+    n_rows, n_cols = values.shape
+    missing = np.isnan(values)
+    keys = -values if higher_is_better else values.copy()
+    keys[missing] = np.inf
+
+    order = np.argsort(keys, axis=1)
+    sorted_keys = np.take_along_axis(keys, order, axis=1)
+
+    positions = np.broadcast_to(np.arange(1, n_cols + 1, dtype=np.float64), (n_rows, n_cols))
+    starts = np.ones((n_rows, n_cols), dtype=bool)
+    starts[:, 1:] = sorted_keys[:, 1:] != sorted_keys[:, :-1]
+
+    if ties == "dense":
+        sorted_ranks = np.cumsum(starts, axis=1).astype(np.float64)
+    else:
+        first = np.maximum.accumulate(np.where(starts, positions, 0), axis=1)
+        ends = np.ones((n_rows, n_cols), dtype=bool)
+        ends[:, :-1] = starts[:, 1:]
+        last = np.flip(np.minimum.accumulate(
+            np.flip(np.where(ends, positions, np.inf), axis=1), axis=1), axis=1)
+        sorted_ranks = {"min": first, "max": last, "average": (first + last) / 2}[ties]
+
+    ranks = np.empty_like(sorted_ranks)
+    np.put_along_axis(ranks, order, sorted_ranks, axis=1)
+    ranks[missing] = np.nan
+    return ranks
+
+
+class RankingEngine:
+    """Incremental weighted / Borda / Kemeny-style ranking of configurations"""
+
+    def __init__(self, metrics=None, weights=None, higher_is_better=None, ties="average"):
+        self.metrics = list(metrics or RANK_METRICS)
+        weights = weights or {}
+        self.weights = np.array([float(weights.get(m, 1.0)) for m in self.metrics])
+        better = higher_is_better or {}
+        self.higher_is_better = [better.get(m, True) for m in self.metrics]
+        self.ties = ties
+
+        self.configs = []
+        self.config_index = {}
+        self.n_runs = 0
+
+        # Running aggregates, one entry per config
+        self._weighted_sum = np.zeros(0)
+        self._borda_sum = np.zeros(0)
+        self._appearances = np.zeros(0, dtype=np.int64)
+
+        # Composite rank of every config in every run, for Kemeny. Kept as
+        # appended blocks and concatenated lazily so add_runs stays O(block).
+        self._composite_blocks = []
+        self._composite_cache = None
+        self._kemeny_order = None
+
+    # ------------------------------------------------------------------------
+    # Adding runs
+    # ------------------------------------------------------------------------
+
+    def _ensure_configs(self, configs):
+        new = [c for c in configs if c not in self.config_index]
+        if not new:
+            return
+        for config in new:
+            self.config_index[config] = len(self.configs)
+            self.configs.append(config)
+        pad = len(new)
+        self._weighted_sum = np.concatenate([self._weighted_sum, np.zeros(pad)])
+        self._borda_sum = np.concatenate([self._borda_sum, np.zeros(pad)])
+        self._appearances = np.concatenate([self._appearances, np.zeros(pad, dtype=np.int64)])
+        self._composite_cache = None
+        if self._kemeny_order is not None:
+            new_columns = np.arange(len(self.configs) - pad, len(self.configs))
+            self._kemeny_order = np.concatenate([self._kemeny_order, new_columns])
+
+    def add_runs(self, values, configs=None):
+        """
+        Add a block of runs. values has shape (runs, configs, metrics), with NaN
+        where a config did not take part; configs names its columns (defaults
+        to the engine's current config order).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim != 3 or values.shape[2] != len(self.metrics):
+            raise ValueError(f"values must have shape (runs, configs, {len(self.metrics)})")
+
+        if configs is not None:
+            self._ensure_configs(configs)
+            columns = np.array([self.config_index[c] for c in configs])
+        elif values.shape[1] == len(self.configs):
+            columns = np.arange(values.shape[1])
+        else:
+            raise ValueError("configs must name the columns of values")
+
+        n_runs, n_cols, n_metrics = values.shape
+
+        # Per-metric ranks within each run
+        metric_ranks = np.empty_like(values)
+        for m in range(n_metrics):
+            metric_ranks[:, :, m] = rank_rows_nan(values[:, :, m], self.ties, self.higher_is_better[m])
+
+        # Weighted composite per (run, config); missing metrics drop out of the weights
+        present = ~np.isnan(metric_ranks)
+        weight_total = (present * self.weights).sum(axis=2)
+        composite = np.where(present, metric_ranks, 0.0) @ self.weights
+        with np.errstate(invalid="ignore", divide="ignore"):
+            composite = np.where(weight_total > 0, composite / weight_total, np.nan)
+
+        # Borda points from the composite ordering: configs beaten in that run
+        composite_ranks = rank_rows_nan(composite, self.ties, higher_is_better=False)
+        n_present = (~np.isnan(composite)).sum(axis=1, keepdims=True)
+        borda = n_present - composite_ranks
+
+        # Scale both to 0..1 by the run's own size, so large runs don't dominate
+        with np.errstate(invalid="ignore", divide="ignore"):
+            others = np.where(n_present > 1, n_present - 1, np.nan)
+            scaled_composite = (composite - 1) / others
+            scaled_borda = borda / others
+
+        self._weighted_sum[columns] += np.nansum(scaled_composite, axis=0)
+        self._borda_sum[columns] += np.nansum(scaled_borda, axis=0)
+        self._appearances[columns] += (~np.isnan(scaled_composite)).sum(axis=0)
+
+        block = np.full((n_runs, len(self.configs)), np.nan, dtype=np.float32)
+        block[:, columns] = composite_ranks
+        self._composite_blocks.append(block)
+        self._composite_cache = None
+        self.n_runs += n_runs
+
+    @property
+    def composite_ranks(self):
+        """(runs x configs) composite rank matrix, NaN where a config was absent"""
+        if self._composite_cache is None:
+            width = len(self.configs)
+            blocks = [
+                np.pad(block, ((0, 0), (0, width - block.shape[1])), constant_values=np.nan)
+                if block.shape[1] < width else block
+                for block in self._composite_blocks
+            ]
+            merged = np.vstack(blocks) if blocks else np.zeros((0, width), dtype=np.float32)
+            self._composite_blocks = [merged] if blocks else []
+            self._composite_cache = merged
+        return self._composite_cache
+
+    def add_run(self, run):
+        """Add one run given as {config: {metric: value}}"""
+        configs = list(run)
+        values = np.array([[[run[c].get(m, np.nan) for m in self.metrics] for c in configs]], dtype=np.float64)
+        self.add_runs(values, configs)
+
+    # ------------------------------------------------------------------------
+    # Aggregation
+    # ------------------------------------------------------------------------
+
+    def weighted_scores(self):
+        """Mean scaled weighted rank per config over the runs it appeared in (0 = best)"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self._appearances > 0, self._weighted_sum / self._appearances, np.nan)
+
+    def borda_scores(self):
+        """Mean share of the other configs beaten per run (higher = better)"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self._appearances > 0, self._borda_sum / self._appearances, np.nan)
+
+    def pairwise_margin(self, i, j):
+        """Runs preferring config i over j minus runs preferring j over i"""
+        composite = self.composite_ranks
+        a, b = composite[:, i], composite[:, j]
+        return int(np.sum(a < b)) - int(np.sum(b < a))
+
+    def kemeny_order(self, max_passes=None):
+        """
+        Consensus order (best first). Starts from the previous consensus (or the
+        Borda order) and swaps adjacent configs while a majority of runs prefers
+        the swap - a locally Kemeny-optimal ordering.
+        """
+        n = len(self.configs)
+        if self._kemeny_order is None or len(self._kemeny_order) != n:
+            scores = np.nan_to_num(self.borda_scores(), nan=-np.inf)
+            order = np.argsort(-scores, kind="stable")
+        else:
+            order = self._kemeny_order.copy()
+
+        passes = max_passes or n
+        composite = self.composite_ranks
+        for _ in range(passes):
+            swapped = False
+            for parity in (0, 1):
+                left = order[parity:-1:2]
+                right = order[parity + 1::2]
+                count = min(len(left), len(right))
+                left, right = left[:count], right[:count]
+                if not count:
+                    continue
+                a, b = composite[:, left], composite[:, right]
+                margin = (b < a).sum(axis=0) - (a < b).sum(axis=0)
+                swap = np.flatnonzero(margin > 0)
+                if len(swap):
+                    positions = parity + 2 * swap
+                    order[positions], order[positions + 1] = right[swap], left[swap]
+                    swapped = True
+            if not swapped:
+                break
+
+        self._kemeny_order = order
+        return order
+
+    def ranking(self, method="weighted"):
+        """[(rank, config, score)] best first; ties in score share a rank"""
+        if method not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation: {method} (expected one of {AGGREGATIONS})")
+
+        if method == "kemeny":
+            order = self.kemeny_order()
+            return [(position + 1, self.configs[i], float(position + 1)) for position, i in enumerate(order)]
+
+        scores = self.weighted_scores() if method == "weighted" else self.borda_scores()
+        ranks = rank_rows_nan(scores[None, :], self.ties, higher_is_better=(method == "borda"))[0]
+        order = np.argsort(np.nan_to_num(ranks, nan=np.inf), kind="stable")
+        return [(float(ranks[i]), self.configs[i], float(scores[i])) for i in order]
@@ -0,0 +1,379 @@
+"""
+Report Pipeline - Incremental, parallel generation of analysis artifacts
+
+Builds independent report artifacts from results/*_results.json:
+
+    per-run metric rows ─┬─> results/comparison_metrics.csv
+                         ├─> results/agent_rankings.csv
+                         ├─> results/summary_report.txt
+                         ├─> results/trading_agent_analysis.xlsx
+                         └─> visualizations/*.png (6 charts)
+
+Metric rows are cached per run file hash, and every artifact is keyed by
+the hash of the inputs it actually reads. Artifacts whose key matches the
+manifest (results/.report_manifest.json) and whose file still exists are
+skipped; the rest are rendered in a process pool. Adding one run therefore
+recomputes one metric row plus the artifacts that aggregate over runs.
+
+    python cli.py report            # incremental
+    python cli.py report --force    # rebuild everything
+"""
+
+import csv
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from metrics import AGENT_FILES, METRIC_COLUMNS, RANK_METRICS, compute_metrics, rank_rows
+
+# Bump when a renderer's output format changes so cached artifacts rebuild
+RENDER_VERSION = 1
+
+MANIFEST_NAME = ".report_manifest.json"
+
+CHARTS = {
+    "total_profit": ("total_profit", "Total Profit ($)"),
+    "win_rate": ("win_rate", "Win Rate (%)"),
+    "sharpe_ratio": ("sharpe_ratio", "Sharpe Ratio"),
+    "profit_factor": ("profit_factor", "Profit Factor"),
+}
+
+
+def _hash(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Artifact:
+    """One output file, the hash of its inputs and how to render it"""
+
+    def __init__(self, name, output, render, args, key):
+        self.name = name
+        self.output = Path(output)
+        self.render = render
+        self.args = args
+        self.key = key
+
+
+# ============================================================================
+# RENDERERS (module-level so they can run in worker processes)
+# ============================================================================
+
+def render_csv(output, rows, columns):
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(output)
+
+
+def render_summary(output, rows, rankings, profits_by_agent):
+    lines = [
+        "=" * 80,
+        "TRADING AGENT COMPARISON REPORT",
+        f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        "=" * 80,
+        "",
+        "PERFORMANCE METRICS BY AGENT:",
+        "-" * 80,
+    ]
+    for row in rows:
+        lines += [
+            "",
+            f"{row['agent']}:",
+            f"  Total Trades: {row['total_trades']}",
+            f"  Win Rate: {row['win_rate']:.2f}%",
+            f"  Total Profit: ${row['total_profit']:.2f}",
+            f"  Avg Profit/Trade: ${row['average_profit']:.2f}",
+            f"  Sharpe Ratio: {row['sharpe_ratio']:.3f}",
+            f"  Profit Factor: {row['profit_factor']:.2f}",
+        ]
+
+    lines += ["", "=" * 80, "AGENT RANKINGS:", "-" * 80]
+    for ranking in sorted(rankings, key=lambda r: r["overall_rank"]):
+        lines.append(f"{int(ranking['overall_rank'])}. {ranking['agent']} (Score: {ranking['overall_rank']:.2f})")
+
+    lines += ["", "=" * 80, "STATISTICAL SIGNIFICANCE TESTS:", "-" * 80]
+    try:
+        from metrics import significance_tests
+        results = {agent: {"agent": agent, "trades": [{"profit": p} for p in profits]}
+                   for agent, profits in profits_by_agent.items()}
+        for name, test in significance_tests(results).items():
+            verdict = "SIGNIFICANT" if test["significant"] else "NOT SIGNIFICANT"
+            lines += [f"{name}:", f"  p-value: {test['p_value']:.4f} ({verdict})"]
+    except ImportError:
+        lines.append("(scipy not installed - tests skipped)")
+
+    with open(output, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    return str(output)
+
+
+def render_xlsx(output, rows, rankings, trades_by_agent):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Metrics"
+    sheet.append(METRIC_COLUMNS)
+    for row in rows:
+        sheet.append([row[col] for col in METRIC_COLUMNS])
+
+    sheet = workbook.create_sheet("Rankings")
+    columns = ["agent"] + [f"{m}_rank" for m in RANK_METRICS] + ["overall_rank"]
+    sheet.append(columns)
+    for ranking in sorted(rankings, key=lambda r: r["overall_rank"]):
+        sheet.append([ranking[col] for col in columns])
+
+    for agent, trades in trades_by_agent.items():
+        sheet = workbook.create_sheet(f"{agent[:24]} Trades")
+        columns = ["trade_id", "symbol", "entry_price", "exit_price", "quantity",
+                   "profit", "entry_time", "exit_time"]
+        sheet.append(columns)
+        for trade in trades:
+            sheet.append([trade.get(col) for col in columns])
+
+    workbook.save(output)
+    return str(output)
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def render_bar_chart(output, rows, metric, label):
+    plt = _pyplot()
+    agents = [row["agent"] for row in rows]
+    values = [row[metric] for row in rows]
+    fig, ax = plt.subplots(figsize=(8, 5))
+    colors = ["tab:green" if v >= 0 else "tab:red" for v in values]
+    ax.bar(agents, values, color=colors)
+    ax.axhline(0, color="black", linewidth=0.8)
+    ax.set_title(f"{label} by Agent")
+    ax.set_ylabel(label)
+    fig.tight_layout()
+    fig.savefig(output, dpi=100)
+    plt.close(fig)
+    return str(output)
+
+
+def render_cumulative_profit(output, profits_by_agent):
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(10, 5))
+    for agent, profits in profits_by_agent.items():
+        total, curve = 0.0, []
+        for profit in profits:
+            total += profit
+            curve.append(total)
+        ax.plot(range(1, len(curve) + 1), curve, label=agent)
+    ax.axhline(0, color="black", linewidth=0.8)
+    ax.set_title("Cumulative Profit")
+    ax.set_xlabel("Trade #")
+    ax.set_ylabel("Profit ($)")
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(output, dpi=100)
+    plt.close(fig)
+    return str(output)
+
+
+def render_profit_distribution(output, profits_by_agent):
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(10, 5))
+    agents = list(profits_by_agent)
+    ax.boxplot([profits_by_agent[a] for a in agents], showfliers=False)
+    ax.set_xticks(range(1, len(agents) + 1))
+    ax.set_xticklabels(agents)
+    ax.axhline(0, color="black", linewidth=0.8)
+    ax.set_title("Profit per Trade Distribution")
+    ax.set_ylabel("Profit ($)")
+    fig.tight_layout()
+    fig.savefig(output, dpi=100)
+    plt.close(fig)
+    return str(output)
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+class ReportPipeline:
+    """Plans report artifacts, skips unchanged ones and renders the rest in parallel"""
+
+    def __init__(self, results_dir="results", viz_dir="visualizations", workers=None, force=False):
+        self.results_dir = Path(results_dir)
+        self.viz_dir = Path(viz_dir)
+        self.workers = workers
+        self.force = force
+        self.manifest_path = self.results_dir / MANIFEST_NAME
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if self.force or not self.manifest_path.exists():
+            return {"runs": {}, "artifacts": {}}
+        with open(self.manifest_path, "r") as f:
+            return json.load(f)
+
+    def _save_manifest(self):
+        tmp = self.manifest_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    # ------------------------------------------------------------------------
+
+    def load_runs(self):
+        """{run name: (file hash, metric row, trades)}; metric rows cached per hash"""
+        runs = {}
+        cached = self.manifest["runs"]
+        # The three reference agents first, in their usual order, then other runs
+        order = lambda path: (AGENT_FILES.index(path.name[:-13]) if path.name[:-13] in AGENT_FILES
+                              else len(AGENT_FILES), path.name)
+        for filepath in sorted(self.results_dir.glob("*_results.json"), key=order):
+            name = filepath.name[:-len("_results.json")]
+            digest = file_hash(filepath)
+            with open(filepath, "r") as f:
+                data = json.load(f)
+            entry = cached.get(name)
+            if entry is None or entry["hash"] != digest:
+                entry = cached[name] = {"hash": digest, "row": compute_metrics(data)}
+            runs[name] = (digest, dict(entry["row"]), data.get("trades", []))
+
+        for name in set(cached) - set(runs):
+            del cached[name]
+
+        # Disambiguate repeated agent names across runs
+        seen = {}
+        for row in (row for _, row, _ in runs.values()):
+            seen[row["agent"]] = seen.get(row["agent"], 0) + 1
+        for name, (_, row, _) in runs.items():
+            if seen[row["agent"]] > 1:
+                row["agent"] = f"{row['agent']} ({name})"
+        return runs
+
+    def plan(self, runs):
+        rows = [row for _, row, _ in runs.values()]
+        rankings = rank_rows(rows) if rows else []
+        run_hashes = {name: digest for name, (digest, _, _) in runs.items()}
+        trades_by_agent = {row["agent"]: trades for _, row, trades in runs.values()}
+        profits_by_agent = {agent: [t.get("profit", 0) for t in trades]
+                            for agent, trades in trades_by_agent.items()}
+
+
+        artifacts = [
+            Artifact("comparison_metrics", self.results_dir / "comparison_metrics.csv",
+                     render_csv, (rows, METRIC_COLUMNS), _hash("csv", RENDER_VERSION, rows)),
+            Artifact("agent_rankings", self.results_dir / "agent_rankings.csv",
+                     render_csv, (rankings, ["agent"] + [f"{m}_rank" for m in RANK_METRICS] + ["overall_rank"]),
+                     _hash("rankings", RENDER_VERSION, rankings)),
+            Artifact("summary_report", self.results_dir / "summary_report.txt",
+                     render_summary, (rows, rankings, profits_by_agent),
+                     _hash("summary", RENDER_VERSION, rows, rankings, run_hashes)),
+            Artifact("analysis_xlsx", self.results_dir / "trading_agent_analysis.xlsx",
+                     render_xlsx, (rows, rankings, trades_by_agent),
+                     _hash("xlsx", RENDER_VERSION, rows, rankings, run_hashes)),
+        ]
+
+        for chart, (metric, label) in CHARTS.items():
+            values = [(row["agent"], row[metric]) for row in rows]
+            artifacts.append(Artifact(
+                f"chart_{chart}", self.viz_dir / f"{chart}_comparison.png",
+                render_bar_chart, (rows, metric, label),
+                _hash("bar", RENDER_VERSION, chart, values)
+            ))
+        artifacts.append(Artifact(
+            "chart_cumulative_profit", self.viz_dir / "cumulative_profit.png",
+            render_cumulative_profit, (profits_by_agent,), _hash("cumulative", RENDER_VERSION, run_hashes)
+        ))
+        artifacts.append(Artifact(
+            "chart_profit_distribution", self.viz_dir / "profit_distribution.png",
+            render_profit_distribution, (profits_by_agent,), _hash("distribution", RENDER_VERSION, run_hashes)
+        ))
+        return artifacts
+
+    def stale(self, artifact):
+        if self.force or not artifact.output.exists():
+            return True
+        return self.manifest["artifacts"].get(artifact.name) != artifact.key
+
+    # ------------------------------------------------------------------------
+
+    def build(self):
+        """Render stale artifacts; returns {"built": [...], "skipped": [...], "failed": {...}}"""
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        self.viz_dir.mkdir(parents=True, exist_ok=True)
+
+        runs = self.load_runs()
+        if not runs:
+            self._save_manifest()
+            return {"built": [], "skipped": [], "failed": {}}
+
+        artifacts = {artifact.name: artifact for artifact in self.plan(runs)}
+        todo = {name for name, artifact in artifacts.items() if self.stale(artifact)}
+        summary = {"built": [], "skipped": sorted(set(artifacts) - todo), "failed": {}}
+
+        def finish(name, error=None):
+            if error is None:
+                self.manifest["artifacts"][name] = artifacts[name].key
+                summary["built"].append(name)
+            else:
+                self.manifest["artifacts"].pop(name, None)
+                summary["failed"][name] = str(error)
+
+        # Every artifact renders from the in-memory rows, so none waits on another
+        # and one failing never blocks the rest
+        if len(todo) <= 1 or self.workers == 1:
+            for name in sorted(todo):
+                artifact = artifacts[name]
+                try:
+                    artifact.render(artifact.output, *artifact.args)
+                    finish(name)
+                except Exception as e:
+                    finish(name, e)
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                running = {pool.submit(artifacts[name].render, artifacts[name].output, *artifacts[name].args): name
+                           for name in sorted(todo)}
+                for future in as_completed(running):
+                    try:
+                        future.result()
+                        finish(running[future])
+                    except Exception as e:
+                        finish(running[future], e)
+
+        self._save_manifest()
+        return summary
+
+
+def build_reports(results_dir="results", viz_dir="visualizations", workers=None, force=False):
+    """Run the pipeline and print what was rebuilt"""
+    summary = ReportPipeline(results_dir, viz_dir, workers, force).build()
+
+    print("=" * 80)
+    print("REPORT GENERATION")
+    print("=" * 80)
+    for name in summary["built"]:
+        print(f"  ✓ built   {name}")
+    for name in summary["skipped"]:
+        print(f"  · cached  {name}")
+    for name, error in summary["failed"].items():
+        print(f"  ✗ failed  {name}: {error}")
+    if not (summary["built"] or summary["skipped"] or summary["failed"]):
+        print(f"\n✗ No *_results.json files found in {results_dir}/")
+    return summary
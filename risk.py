@@ -0,0 +1,324 @@
+"""
+Risk Engine - Pre-trade checks for every order in a tick, as array operations
+
+Agents submit what their decision asks for; a simulator (or BacktestMarket)
+with a risk_engine holds the tick's orders and runs RiskEngine.check() once
+before anything is filled. Rules, applied in this order:
+
+    kill_switch             agent equity below (1 - max_drawdown_pct) of its
+                            peak: buys rejected, sells still allowed
+    max_order_pct           per agent (RISK_PROFILE): order value at most this
+                            share of equity (TradingAgents' 30% cap)
+    max_order_qty           global cap on shares per order
+    max_order_value         global cap on order value
+    affordability           buys limited to cash, cumulatively per agent
+    buy_scale               per agent (RISK_PROFILE): buys scaled down
+                            (FinGPT's risk_tolerance)
+    position_available      sells limited to the position held (no shorts)
+    max_position_pct        resulting position value at most this share of equity
+    max_gross_exposure_pct  resulting gross exposure at most this share of equity
+    symbol_capacity         all agents' combined position in a symbol capped
+                            at max_symbol_position (buys scaled pro rata)
+
+Each rule clamps quantities; an order clamped to zero is rejected and
+counted under that rule in stats["rejected"] (reductions in stats["clamped"]).
+
+With an ExecutionEngine attached (execution=...), orders approved earlier
+but still queued count against the limits: their reserved cash is not
+affordable, their sells are not available, and their buys already add to
+positions, gross exposure and symbol capacity.
+
+Per-agent limits come from an agent's RISK_PROFILE, a {limit: attribute}
+map read when the agent is registered. Without a risk engine, agents fall
+back to submit_decision(), which applies the same per-agent rules to a
+single order, net of what the agent's orders still queued in the
+simulator's ExecutionEngine already hold.
+"""
+
+import numpy as np
+
+from agent_state import account_view
+
+RULES = ("kill_switch", "max_order_pct", "max_order_qty", "max_order_value", "affordability",
+         "buy_scale", "position_available", "max_position_pct", "max_gross_exposure_pct",
+         "symbol_capacity")
+SIDES = {"BUY": 1, "SELL": -1}
+
+
+# ============================================================================
+# SINGLE-ORDER FALLBACK (no risk engine in the simulator)
+# ============================================================================
+
+def risk_profile(agent):
+    """{limit: value} from the agent's RISK_PROFILE attribute map"""
+    return {limit: getattr(agent, attribute)
+            for limit, attribute in getattr(agent, "RISK_PROFILE", {}).items()}
+
+
+def clamp_order(agent, side, quantity, price, symbol="STOCK", account=None):
+    """Affordability / position / buy_scale limits for one order"""
+    profile = risk_profile(agent)
+    cash, positions = account if account is not None else (agent.cash, agent.positions)
+    if side == "BUY":
+        max_affordable = int(cash / price)
+        quantity = min(quantity, max_affordable)
+        if "buy_scale" in profile:
+            quantity = int(quantity * profile["buy_scale"])
+    else:
+        current_position = positions.get(symbol, 0)
+        quantity = min(quantity, current_position)
+    return quantity
+
+
+def available(agent, simulator):
+    """(cash, positions) the agent can still commit: its account less its queued orders"""
+    cash, positions = account_view(agent, simulator)
+    execution = getattr(simulator, "execution", None)
+    if execution is None or not execution.pending:
+        return cash, positions
+    reserved_cash, reserved_shares = execution.reserved(agent.agent_id)
+    positions = dict(positions.items())
+    for symbol, shares in reserved_shares.items():
+        positions[symbol] = positions.get(symbol, 0) - shares
+    return cash - reserved_cash, positions
+
+
+def has_risk_engine(simulator):
+    return getattr(simulator, "risk_engine", None) is not None
+
+
+def submit_decision(agent, decision, simulator, price, symbol="STOCK"):
+    """
+    Submit a buy/sell decision; returns the signed quantity submitted. Orders
+    go through unclamped when the simulator has a risk_engine.
+    """
+    action = decision.get("action", "hold")
+    quantity = decision.get("quantity", 0)
+    if action not in ("buy", "sell") or not quantity > 0:
+        return 0
+
+    side = "BUY" if action == "buy" else "SELL"
+    if not has_risk_engine(simulator):
+        quantity = clamp_order(agent, side, quantity, price, symbol, available(agent, simulator))
+    if quantity > 0:
+        simulator.submit_order(agent.agent_id, symbol, side, quantity, price)
+        return quantity if side == "BUY" else -quantity
+    return 0
+
+
+# ============================================================================
+# VECTORIZED ENGINE
+# ============================================================================
+
+def _exclusive_group_cumsum(groups, values):
+    """Sum of earlier values in the same group (groups sorted, arrival-stable)"""
+    totals = np.cumsum(values)
+    starts = np.r_[True, groups[1:] != groups[:-1]]
+    base = np.maximum.accumulate(np.where(starts, np.arange(len(groups)), 0))
+    before = totals - values
+    return before - before[base]
+
+
+class RiskEngine:
+    """Global pre-trade limits checked for all of a tick's orders at once"""
+
+    def __init__(self, symbols=("STOCK",), max_order_qty=None, max_order_value=None,
+                 max_position_pct=None, max_gross_exposure_pct=None, max_drawdown_pct=None,
+                 max_symbol_position=None, ledger=None, execution=None):
+        self.symbols = list(symbols)
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.max_order_qty = max_order_qty
+        self.max_order_value = max_order_value
+        self.max_position_pct = max_position_pct
+        self.max_gross_exposure_pct = max_gross_exposure_pct
+        self.max_drawdown_pct = max_drawdown_pct
+        self.max_symbol_position = max_symbol_position
+        self.ledger = ledger
+        self.execution = execution
+
+        self.agents = []
+        self.agent_index = {}
+        self.buy_scale = np.zeros(0)
+        self.max_order_pct = np.zeros(0)
+        self.peak_equity = np.zeros(0)
+        self.marks = np.zeros(len(self.symbols))
+        self._orders = []
+
+        self.stats = {"checked": 0, "approved": 0,
+                      "rejected": {rule: 0 for rule in RULES},
+                      "clamped": {rule: 0 for rule in RULES}}
+
+    def register(self, agent):
+        """Add an agent and read its per-agent limits from RISK_PROFILE"""
+        if agent.agent_id in self.agent_index:
+            return
+        profile = risk_profile(agent)
+        self.agent_index[agent.agent_id] = len(self.agents)
+        self.agents.append(agent)
+        self.buy_scale = np.append(self.buy_scale, profile.get("buy_scale", np.nan))
+        self.max_order_pct = np.append(self.max_order_pct, profile.get("max_order_pct", np.nan))
+        self.peak_equity = np.append(self.peak_equity, agent.cash)
+
+    def _symbol(self, symbol):
+        column = self.symbol_index.get(symbol)
+        if column is None:
+            column = len(self.symbols)
+            self.symbols.append(symbol)
+            self.symbol_index[symbol] = column
+            self.marks = np.append(self.marks, 0.0)
+        return column
+
+    def submit(self, agent_id, symbol, side, quantity, price):
+        self._orders.append((self.agent_index[agent_id], self._symbol(symbol), SIDES[side], quantity, price))
+
+    @property
+    def pending(self):
+        return len(self._orders)
+
+    def _state(self):
+        """
+        (cash, positions, reserved cash, queued buys, queued sells) for every
+        registered agent; the last three come from orders still queued in the
+        ExecutionEngine
+        """
+        queued = self.execution.queued() if self.execution is not None else None
+        if queued is not None:
+            columns = np.array([self._symbol(symbol) for symbol in queued[1]], dtype=np.int64)
+        n, s = len(self.agents), len(self.symbols)
+        if self.ledger is not None:
+            slots = np.array([self.ledger.slots[a.agent_id] for a in self.agents], dtype=np.int64)
+            ledger_columns = [self.ledger._symbol_column(symbol) for symbol in self.symbols]
+            cash = self.ledger.cash[slots]
+            positions = self.ledger.positions[np.ix_(slots, ledger_columns)].astype(np.float64)
+        else:
+            cash = np.array([a.cash for a in self.agents], dtype=np.float64)
+            positions = np.array([[a.positions.get(symbol, 0) for symbol in self.symbols] for a in self.agents],
+                                 dtype=np.float64).reshape(n, s)
+
+        reserved, bought, sold = np.zeros(n), np.zeros((n, s)), np.zeros((n, s))
+        if queued is not None and len(columns):
+            agent_ids, _, sides, remaining, order_cash = queued
+            rows = np.array([self.agent_index.get(int(a), -1) for a in agent_ids], dtype=np.int64)
+            known = rows >= 0
+            rows, columns = rows[known], columns[known]
+            sides, remaining = sides[known], remaining[known].astype(np.float64)
+            np.add.at(reserved, rows, order_cash[known])
+            np.add.at(bought, (rows, columns), np.where(sides > 0, remaining, 0.0))
+            np.add.at(sold, (rows, columns), np.where(sides < 0, remaining, 0.0))
+        return cash, positions, reserved, bought, sold
+
+    def _apply(self, rule, quantity, limit, mask=None):
+        """Clamp quantity to limit (where mask) and count the effect under `rule`"""
+        limited = np.minimum(quantity, np.maximum(np.floor(limit), 0))
+        if mask is not None:
+            limited = np.where(mask, limited, quantity)
+        reduced = limited < quantity
+        self.stats["rejected"][rule] += int(np.sum(reduced & (limited <= 0)))
+        self.stats["clamped"][rule] += int(np.sum(reduced & (limited > 0)))
+        return limited
+
+    def check(self, prices=None):
+        """
+        Run every rule over the pending orders and clear them. Returns the
+        approved orders as a list of (agent_id, symbol, side, quantity, price).
+        """
+        if not self._orders:
+            return []
+        orders, self._orders = self._orders, []
+        agent_rows = np.array([o[0] for o in orders], dtype=np.int64)
+        columns = np.array([o[1] for o in orders], dtype=np.int64)
+        sides = np.array([o[2] for o in orders], dtype=np.int64)
+        quantity = np.array([o[3] for o in orders], dtype=np.float64)
+        price = np.array([o[4] for o in orders], dtype=np.float64)
+        buys, sells = sides > 0, sides < 0
+        self.stats["checked"] += len(orders)
+
+        # Marks: explicit prices, else the latest order price per symbol
+        if prices:
+            for symbol, mark in prices.items():
+                if mark:
+                    self.marks[self._symbol(symbol)] = mark
+            unmarked = self.marks[columns] <= 0
+            self.marks[columns[unmarked]] = price[unmarked]
+        else:
+            self.marks[columns] = price
+        cash, positions, reserved, queued_buys, queued_sells = self._state()
+        equity = cash + positions @ self.marks
+        self.peak_equity = np.maximum(self.peak_equity, equity)
+        order_equity = equity[agent_rows]
+
+        if self.max_drawdown_pct is not None:
+            killed = equity < (1 - self.max_drawdown_pct) * self.peak_equity
+            quantity = self._apply("kill_switch", quantity, 0, buys & killed[agent_rows])
+
+        order_pct = self.max_order_pct[agent_rows]
+        has_pct = ~np.isnan(order_pct)
+        if has_pct.any():
+            limit = np.where(has_pct, order_equity * np.nan_to_num(order_pct) / price, np.inf)
+            quantity = self._apply("max_order_pct", quantity, limit, has_pct)
+
+        if self.max_order_qty is not None:
+            quantity = self._apply("max_order_qty", quantity, self.max_order_qty)
+        if self.max_order_value is not None:
+            quantity = self._apply("max_order_value", quantity, self.max_order_value / price)
+
+        # Cumulative per agent (affordability) and per agent+symbol (positions)
+        by_agent = np.argsort(agent_rows, kind="stable")
+        spent_before = np.empty_like(quantity)
+        spent_before[by_agent] = _exclusive_group_cumsum(
+            agent_rows[by_agent], np.where(buys, quantity * price, 0.0)[by_agent])
+        quantity = self._apply("affordability", quantity,
+                               ((cash - reserved)[agent_rows] - spent_before) / price, buys)
+
+        scale = self.buy_scale[agent_rows]
+        has_scale = buys & ~np.isnan(scale)
+        if has_scale.any():
+            quantity = self._apply("buy_scale", quantity, quantity * np.nan_to_num(scale), has_scale)
+
+        holding_key = agent_rows * len(self.symbols) + columns
+        by_holding = np.argsort(holding_key, kind="stable")
+        sold_before = np.empty_like(quantity)
+        sold_before[by_holding] = _exclusive_group_cumsum(
+            holding_key[by_holding], np.where(sells, quantity, 0.0)[by_holding])
+        held = positions[agent_rows, columns]
+        quantity = self._apply("position_available", quantity,
+                               held - queued_sells[agent_rows, columns] - sold_before, sells)
+
+        if self.max_position_pct is not None:
+            bought_before = np.empty_like(quantity)
+            bought_before[by_holding] = _exclusive_group_cumsum(
+                holding_key[by_holding], np.where(buys, quantity, 0.0)[by_holding])
+            holding = held + queued_buys[agent_rows, columns] + bought_before
+            limit = self.max_position_pct * order_equity / price - holding
+            quantity = self._apply("max_position_pct", quantity, limit, buys)
+
+        if self.max_gross_exposure_pct is not None:
+            gross = (np.abs(positions) + queued_buys) @ self.marks
+            value_before = np.empty_like(quantity)
+            value_before[by_agent] = _exclusive_group_cumsum(
+                agent_rows[by_agent], np.where(buys, quantity * price, 0.0)[by_agent])
+            room = self.max_gross_exposure_pct * order_equity - gross[agent_rows] - value_before
+            quantity = self._apply("max_gross_exposure_pct", quantity, room / price, buys)
+
+        if self.max_symbol_position is not None:
+            demand = np.bincount(columns, weights=np.where(buys, quantity, 0.0), minlength=len(self.symbols))
+            room = np.maximum(self.max_symbol_position - (positions + queued_buys).sum(axis=0), 0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                ratio = np.where(demand > room, room / demand, 1.0)
+            quantity = self._apply("symbol_capacity", quantity, quantity * ratio[columns], buys)
+
+        approved = np.flatnonzero(quantity > 0)
+        self.stats["approved"] += len(approved)
+        return [(self.agents[agent_rows[i]].agent_id, self.symbols[columns[i]],
+                 "BUY" if sides[i] > 0 else "SELL", int(quantity[i]), float(price[i]))
+                for i in approved]
+
+    def print_report(self):
+        print("=" * 80)
+        print("PRE-TRADE RISK CHECKS")
+        print("=" * 80)
+        print(f"\nChecked {self.stats['checked']} order(s), approved {self.stats['approved']}")
+        print(f"\n{'rule':<26}{'rejected':>10}{'clamped':>10}")
+        print("-" * 80)
+        for rule in RULES:
+            print(f"{rule:<26}{self.stats['rejected'][rule]:>10}{self.stats['clamped'][rule]:>10}")
@@ -0,0 +1,280 @@
+"""
+Model Router - Per-stage backend pools with latency, error and cost-aware fallback
+
+Each pipeline stage (a prompt template name such as "fingpt.sentiment" or
+"tradingagents.trader") maps to an ordered pool of interchangeable
+backends. For every call the router:
+
+    1. drops backends that are cooling down after repeated failures
+    2. moves "degraded" backends (EWMA latency over latency_slo_ms, or recent
+       error rate over max_error_rate) behind healthy ones; one call in
+       probe_every still goes to a degraded backend to re-measure it
+    3. once less than budget_reserve of the run budget is left, prefers
+       the cheapest backends; once the budget is spent, only free ones
+    4. tries backends in that order until one answers
+
+Stages without a pool use the agent's own model on the default endpoint.
+LocalBackend answers in-process with a neutral "hold" response, so it is a
+zero-cost, zero-latency last resort that keeps a run going.
+
+Every call is appended to a JSONL routing log (run, agent, stage, backend,
+latency, outcome, cost, reason) so results can be compared across routing
+setups. Cache hits are logged but never count towards a backend's health;
+a replay-mode cache miss is logged and re-raised without trying another
+backend.
+
+    router = ModelRouter(
+        backends=[Backend("mini", "gpt-4o-mini", cost_per_1k=(0.15, 0.6)),
+                  Backend("fast", "gpt-3.5-turbo", cost_per_1k=(0.5, 1.5)),
+                  LocalBackend()],
+        pools={"tradingagents.trader": ["mini", "fast", "local"],
+               "fingpt.*": ["fast", "local"]},
+        budget=5.0, log_path="results/routing_log.jsonl")
+    install_router(router)
+"""
+
+import fnmatch
+import json
+import threading
+import time
+import uuid
+from collections import deque
+
+from llm_client import CacheMiss, complete
+
+
+class BudgetExceeded(Exception):
+    """Raised when the run budget is spent and no free backend is available"""
+
+
+class Backend:
+    """One OpenAI-compatible endpoint serving one model"""
+
+    def __init__(self, name, model, api_base=None, api_key=None, cost_per_1k=(0.0, 0.0), timeout=60):
+        self.name = name
+        self.model = model
+        self.api_base = api_base
+        self.api_key = api_key
+        self.cost_per_1k = cost_per_1k
+        self.timeout = timeout
+
+    def cost(self, usage):
+        if not usage:
+            return 0.0
+        prompt_rate, completion_rate = self.cost_per_1k
+        return (usage["prompt_tokens"] * prompt_rate + usage["completion_tokens"] * completion_rate) / 1000
+
+    def complete(self, messages, temperature, max_tokens):
+        return complete(self.model, messages, temperature, max_tokens,
+                        api_base=self.api_base, api_key=self.api_key, timeout=self.timeout)
+
+
+class LocalBackend(Backend):
+    """In-process stand-in: a neutral response every agent stage can parse"""
+
+    RESPONSE = json.dumps({
+        "action": "hold", "quantity": 0, "reasoning": "local fallback",
+        "confidence": 0.0, "sentiment": 0.0, "expected_change_pct": 0.0,
+        "risk_score": 0.5, "recommended_size_pct": 0, "outlook": "neutral",
+        "key_points": [], "trend": "sideways", "recommendation": "hold",
+    })
+
+    def __init__(self, name="local"):
+        super().__init__(name, "local", cost_per_1k=(0.0, 0.0))
+
+    def complete(self, messages, temperature, max_tokens):
+        return self.RESPONSE, {"calls": 1, "prompt_tokens": 0, "completion_tokens": 0}
+
+
+class BackendHealth:
+    """EWMA latency, recent outcomes and cooldown for one backend"""
+
+    def __init__(self, window):
+        self.ewma_ms = None
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.cost = 0.0
+
+    def error_rate(self):
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class ModelRouter:
+    """Routes each stage's calls across a backend pool"""
+
+    def __init__(self, backends, pools=None, budget=None, budget_reserve=0.2,
+                 latency_slo_ms=5000, max_error_rate=0.2, window=50, ewma_alpha=0.2,
+                 failures_to_cooldown=3, cooldown_seconds=30, probe_every=20, log_path=None, run_id=None):
+        self.backends = {backend.name: backend for backend in backends}
+        self.pools = dict(pools or {})
+        for stage, names in self.pools.items():
+            unknown = [name for name in names if name not in self.backends]
+            if unknown:
+                raise ValueError(f"Pool {stage!r} names unknown backend(s) {unknown} "
+                                 f"(expected some of {sorted(self.backends)})")
+        self.budget = budget
+        self.budget_reserve = budget_reserve
+        self.latency_slo_ms = latency_slo_ms
+        self.max_error_rate = max_error_rate
+        self.ewma_alpha = ewma_alpha
+        self.failures_to_cooldown = failures_to_cooldown
+        self.cooldown_seconds = cooldown_seconds
+        self.probe_every = probe_every
+
+        self.health = {name: BackendHealth(window) for name in self.backends}
+        self.spent = 0.0
+        self.stats = {"calls": 0, "fallbacks": 0, "failures": 0, "budget_routed": 0}
+        self._lock = threading.Lock()
+        self._calls_per_stage = {}
+
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.log_path = log_path
+        self._log = open(log_path, "a") if log_path else None
+
+    # ------------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------------
+
+    def pool(self, stage):
+        if stage in self.pools:
+            return self.pools[stage]
+        for pattern, names in self.pools.items():
+            if stage and fnmatch.fnmatchcase(stage, pattern):
+                return names
+        return None
+
+    def _degraded(self, health):
+        slow = health.ewma_ms is not None and health.ewma_ms > self.latency_slo_ms
+        return slow or health.error_rate() > self.max_error_rate
+
+    def plan(self, stage):
+        """(backend names in the order to try, reason) for the next call"""
+        names = self.pool(stage)
+        now = time.monotonic()
+        with self._lock:
+            count = self._calls_per_stage.get(stage, 0)
+            self._calls_per_stage[stage] = count + 1
+
+            available = [n for n in names if self.health[n].cooldown_until <= now]
+            if not available:
+                # Everything is cooling down: try the pool anyway
+                available = list(names)
+            healthy = [n for n in available if not self._degraded(self.health[n])]
+            degraded = [n for n in available if n not in healthy]
+            if degraded and count % self.probe_every == 0:
+                order, reason = degraded[:1] + healthy + degraded[1:], "probe"
+            else:
+                order = healthy + degraded
+                reason = "primary" if order[:1] == names[:1] else "health"
+
+            if self.budget is not None:
+                remaining = self.budget - self.spent
+                if remaining <= 0:
+                    order = [n for n in order if not any(self.backends[n].cost_per_1k)]
+                    reason = "budget_spent"
+                elif remaining < self.budget_reserve * self.budget:
+                    order = sorted(order, key=lambda n: sum(self.backends[n].cost_per_1k))
+                    reason = "budget_reserve"
+        return order, reason
+
+    def complete(self, stage, model, messages, temperature, max_tokens, agent=None):
+        """Content for one call, falling back through the stage's pool"""
+        if self.pool(stage) is None:
+            return complete(model, messages, temperature, max_tokens)[0]
+
+        order, reason = self.plan(stage)
+        if not order:
+            self._write_log(agent, stage, None, 0.0, "budget_exceeded", 0.0, reason)
+            raise BudgetExceeded(f"Budget of ${self.budget:.2f} spent and no free backend for {stage}")
+        if reason.startswith("budget"):
+            with self._lock:
+                self.stats["budget_routed"] += 1
+
+        last_error = None
+        for attempt, name in enumerate(order):
+            backend = self.backends[name]
+            started = time.perf_counter()
+            try:
+                content, usage = backend.complete(messages, temperature, max_tokens)
+            except CacheMiss:
+                # Strict replay: a missing response is the run's fault, not the backend's,
+                # and must not fall through to another backend (or the local hold)
+                self._write_log(agent, stage, name, 0.0, "cache_miss", 0.0, reason)
+                raise
+            except Exception as e:
+                elapsed_ms = 1000 * (time.perf_counter() - started)
+                self._observe(name, elapsed_ms, False, 0.0)
+                self._write_log(agent, stage, name, elapsed_ms, "error", 0.0, reason, error=str(e))
+                last_error = e
+                continue
+
+            elapsed_ms = 1000 * (time.perf_counter() - started)
+            cost = backend.cost(usage)
+            if usage is not None:
+                # Cache hits say nothing about the backend's latency or errors
+                self._observe(name, elapsed_ms, True, cost)
+            self._write_log(agent, stage, name, elapsed_ms, "ok" if usage is not None else "cache_hit", cost,
+                            reason if attempt == 0 else "fallback")
+            with self._lock:
+                self.stats["calls"] += 1
+                self.stats["fallbacks"] += attempt > 0
+            return content
+
+        with self._lock:
+            self.stats["failures"] += 1
+        raise last_error
+
+    def _observe(self, name, elapsed_ms, ok, cost):
+        with self._lock:
+            health = self.health[name]
+            health.calls += 1
+            health.cost += cost
+            self.spent += cost
+            health.outcomes.append(ok)
+            health.ewma_ms = elapsed_ms if health.ewma_ms is None else \
+                self.ewma_alpha * elapsed_ms + (1 - self.ewma_alpha) * health.ewma_ms
+            if ok:
+                health.consecutive_failures = 0
+            else:
+                health.consecutive_failures += 1
+                if health.consecutive_failures >= self.failures_to_cooldown:
+                    health.cooldown_until = time.monotonic() + self.cooldown_seconds
+                    health.consecutive_failures = 0
+
+    def _write_log(self, agent, stage, backend, latency_ms, outcome, cost, reason, error=None):
+        if self._log is None:
+            return
+        record = {"time": time.time(), "run": self.run_id, "agent": agent,
+                  "stage": stage, "backend": backend,
+                  "latency_ms": round(latency_ms, 2), "outcome": outcome,
+                  "cost": round(cost, 6), "reason": reason}
+        if error:
+            record["error"] = error
+        with self._lock:
+            self._log.write(json.dumps(record) + "\n")
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    # ------------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------------
+
+    def print_summary(self):
+        print("=" * 80)
+        print("MODEL ROUTING")
+        print("=" * 80)
+        print(f"\n{'backend':<16}{'model':<18}{'calls':>8}{'errors':>8}{'ewma ms':>10}{'cost $':>10}")
+        print("-" * 80)
+        for name, health in self.health.items():
+            errors = health.outcomes.count(False)
+            ewma = f"{health.ewma_ms:.0f}" if health.ewma_ms is not None else "-"
+            print(f"{name:<16}{self.backends[name].model:<18}{health.calls:>8}{errors:>8}"
+                  f"{ewma:>10}{health.cost:>10.4f}")
+        budget = f" of ${self.budget:.2f}" if self.budget is not None else ""
+        print(f"\nSpent ${self.spent:.4f}{budget}; {self.stats['fallbacks']} fallback(s), "
+              f"{self.stats['failures']} failed call(s)")
@@ -6,7 +6,6 @@ For now, it includes placeholder simulation code so you can test the framework.
 """
 
 import os
-import openai
 from result_saver import ResultSaver
 from datetime import datetime, timedelta
 import random
@@ -15,15 +14,24 @@ import random
 # SETUP
 # ============================================================================
 
-# Set API key (make sure this is set before running)
-openai.api_key = os.getenv('OPENAI_API_KEY')
-
-if not openai.api_key:
-    print("ERROR: OpenAI API key not set!")
-    print("Run this first: $env:OPENAI_API_KEY = 'sk-your-key'")
-    exit(1)
-
-print("✓ API key loaded")
+def require_api_key():
+    """
+    Load the OpenAI API key for live-LLM modes.
+    openai is imported here so sample mode never pays for it.
+    """
+    import openai
+    
+    openai.api_key = os.getenv('OPENAI_API_KEY')
+    
+    if not openai.api_key:
+        print("\n✗ ERROR: OpenAI API key not set!")
+        print("Run this command first:")
+        print("  PowerShell: $env:OPENAI_API_KEY = 'sk-your-key-here'")
+        print("  Linux/Mac: export OPENAI_API_KEY='sk-your-key-here'")
+        return False
+    
+    print("✓ API key loaded")
+    return True
 
 # ============================================================================
 # OPTION 1: QUICK TEST WITH SAMPLE DATA (NO API CALLS)
@@ -223,21 +231,20 @@ def run_fingpt_simulation():
 # MAIN EXECUTION
 # ============================================================================
 
-def main():
+def main(mode=1):
     """
     Main execution function
+    
+    mode 1: sample data (no API calls, no API key needed)
+    mode 2: real agent code (requires OPENAI_API_KEY)
     """
     print("=" * 80)
     print("TRADING AGENT SIMULATION RUNNER")
     print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 80)
     
-    # Verify API key is set
-    if not os.getenv('OPENAI_API_KEY'):
-        print("\n✗ ERROR: OpenAI API key not set!")
-        print("Run this command first:")
-        print("  PowerShell: $env:OPENAI_API_KEY = 'sk-your-key-here'")
-        print("  Linux/Mac: export OPENAI_API_KEY='sk-your-key-here'")
+    # Only live-LLM mode needs credentials
+    if mode == 2 and not require_api_key():
         return
     
     # Create results directory
@@ -251,8 +258,7 @@ def main():
     print("1. Run with sample data (quick test, no API calls)")
     print("2. Run with real agent code (requires your implementation)")
     
-    # For automatic execution, change this to 1 or 2:
-    mode = 1  # Change to 2 when you have real agent code
+    # Pass mode=2 (or use `python cli.py run`) when you have real agent code
     
     if mode == 1:
         print("\n→ Running with SAMPLE DATA (quick test)")
@@ -285,6 +291,7 @@ def main():
     print("  ✓ results/fingpt_results.json")
     print("\nNext step: Run the analysis")
     print("  python analyze_agents.py")
+    print("  python cli.py compare")
     print("\nOr manually:")
     print("  start results\\")
 
@@ -0,0 +1,185 @@
+"""
+Speculative Decisions - Start the next tick's LLM call before the tick arrives
+
+Between ticks an agent's prompt inputs barely change: cash and position
+only move when an order fills, and the price drifts a little. With a
+Speculator attached, the agent ends each tick by launching its next
+decision in the background, using projected state (its order filled at
+the current price, the price unchanged). On the next tick:
+
+    hit   the real (price, cash, position) is within tolerance of the
+          projection: the speculative decision is used, no LLM wait
+    miss  state moved too far: the speculation is discarded and the agent
+          decides normally; tokens it spent are counted as wasted
+
+    agent.speculator = Speculator(price_tolerance=0.0005)
+    ...
+    discard_speculations(agents)    # run end (TickScheduler.run does this)
+    speculation_report(agents)
+
+A speculation still pending when the run ends is cancelled, or waited for
+if its call already started, and counted as discarded and wasted.
+
+Speculative calls go through llm_client, so a ResponseCache still applies
+and wasted tokens only count real API calls. They share one thread pool of
+POOL_WORKERS threads; set_pool_size(n) changes it for the whole process.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_client import track_usage
+
+# Threads in the pool shared by every agent's speculative calls
+POOL_WORKERS = 16
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    """One shared pool for every agent's speculative calls"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=POOL_WORKERS, thread_name_prefix="speculate")
+        return _executor
+
+
+def set_pool_size(max_workers):
+    """Resize the shared pool; calls already launched finish on the old one"""
+    global POOL_WORKERS, _executor
+    with _executor_lock:
+        POOL_WORKERS = max_workers
+        old, _executor = _executor, None
+    if old is not None:
+        old.shutdown(wait=False)
+
+
+class Speculator:
+    """Holds one agent's in-flight speculative decision"""
+
+    def __init__(self, price_tolerance=0.0005, cash_tolerance=0.001):
+        self.price_tolerance = price_tolerance
+        self.cash_tolerance = cash_tolerance
+        self._pending = None
+        self._lock = threading.Lock()
+        self.stats = {"launched": 0, "hits": 0, "misses": 0, "errors": 0, "discarded": 0,
+                      "used_tokens": 0, "wasted_calls": 0, "wasted_tokens": 0}
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def matches(self, projected, actual):
+        """(price, cash, position) within tolerance; positions must be equal"""
+        price, cash, position = actual
+        projected_price, projected_cash, projected_position = projected
+        if position != projected_position:
+            return False
+        if abs(price - projected_price) > self.price_tolerance * abs(projected_price):
+            return False
+        return abs(cash - projected_cash) <= self.cash_tolerance * max(abs(projected_cash), 1.0)
+
+    def launch(self, state, decide):
+        """Run decide(price, cash, position) in the background for the next tick"""
+        self.discard()
+        future = _pool().submit(self._run, decide, state)
+        self._pending = (state, future)
+        self._count(launched=1)
+
+    @staticmethod
+    def _run(decide, state):
+        with track_usage() as usage:
+            result = decide(*state)
+        return result, usage
+
+    def take(self, state):
+        """The speculative decision if it was made for a matching state, else None"""
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return None
+
+        projected, future = pending
+        if not self.matches(projected, state):
+            self._count(misses=1)
+            self._waste(future)
+            return None
+
+        try:
+            result, usage = future.result()
+        except Exception:
+            self._count(errors=1)
+            return None
+        self._count(hits=1, used_tokens=usage["prompt_tokens"] + usage["completion_tokens"])
+        return result
+
+    def discard(self, wait=False):
+        """
+        Drop any in-flight speculation. With wait=True (the end of a run) a
+        call that already started is waited for, so its tokens are counted
+        as wasted before the report.
+        """
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        self._count(discarded=1)
+        self._waste(pending[1], wait)
+
+    def _waste(self, future, wait=False):
+        if future.cancel():
+            return
+
+        def count(done):
+            if done.cancelled() or done.exception() is not None:
+                return
+            usage = done.result()[1]
+            self._count(wasted_calls=usage["calls"],
+                        wasted_tokens=usage["prompt_tokens"] + usage["completion_tokens"])
+
+        if wait:
+            future.exception()  # blocks until the call finishes
+            count(future)
+        else:
+            future.add_done_callback(count)
+
+    def hit_rate(self):
+        resolved = self.stats["hits"] + self.stats["misses"] + self.stats["errors"]
+        return self.stats["hits"] / resolved if resolved else 0.0
+
+
+def discard_speculations(agents):
+    """Cancel (or wait out) every agent's pending speculation at the end of a run"""
+    for agent in agents:
+        speculator = getattr(agent, "speculator", None)
+        if speculator is not None:
+            speculator.discard(wait=True)
+
+
+def speculation_report(agents):
+    """Print hit rate and wasted tokens per agent and in total"""
+    totals = {}
+    print("=" * 80)
+    print("SPECULATIVE DECISIONS")
+    print("=" * 80)
+    print(f"\n{'agent':<24}{'launched':>10}{'hits':>8}{'misses':>8}{'hit rate':>10}"
+          f"{'used tok':>10}{'wasted tok':>12}")
+    print("-" * 80)
+    for agent in agents:
+        speculator = getattr(agent, "speculator", None)
+        if speculator is None:
+            continue
+        stats = speculator.stats
+        for key, value in stats.items():
+            totals[key] = totals.get(key, 0) + value
+        print(f"{agent.name:<24}{stats['launched']:>10}{stats['hits']:>8}{stats['misses']:>8}"
+              f"{100 * speculator.hit_rate():>9.1f}%{stats['used_tokens']:>10}{stats['wasted_tokens']:>12}")
+
+    resolved = totals.get("hits", 0) + totals.get("misses", 0) + totals.get("errors", 0)
+    if resolved:
+        print("-" * 80)
+        print(f"Total: hit rate {100 * totals['hits'] / resolved:.1f}%, "
+              f"{totals['wasted_calls']} wasted call(s), {totals['wasted_tokens']} wasted token(s), "
+              f"{totals['discarded']} discarded unused")
+    return totals
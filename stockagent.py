@@ -1,73 +1,116 @@
 ﻿"""StockAgent - Behavioral Finance Multi-Agent System"""
-import openai
 import json
 from framework.simulator.base_agent import BaseTradingAgent
+from agent_state import LedgerStateMixin, DecisionRing, account_view
+from prompt_templates import PromptTemplate, compiled_template
+from llm_client import CacheMiss, chat_completion
+from risk import submit_decision
 
-class StockAgentTrader(BaseTradingAgent):
+class StockAgentTrader(LedgerStateMixin, BaseTradingAgent):
     """Individual investor with personality-driven trading"""
     
+    DECISION_HISTORY = 256
+    
     PERSONALITIES = ["Conservative", "Aggressive", "Balanced", "Growth-Oriented"]
     
+    TRAITS = {
+        "Conservative": "risk-averse, prefer stable returns, avoid excessive trading",
+        "Aggressive": "risk-seeking, pursue high returns, willing to trade frequently",
+        "Balanced": "moderate risk tolerance, balanced approach",
+        "Growth-Oriented": "focus on long-term growth, patient"
+    }
+    
+    PROMPT = PromptTemplate(
+        """You are a {personality} stock trader.
+Personality: {traits}
+
+Current Situation:
+- Stock Price: ${current_price:.2f}
+- Your Cash: ${cash:.2f}
+- Your Position: {position} shares
+- Portfolio Value: ${portfolio_value:.2f}
+
+Decide: BUY, SELL, or HOLD
+
+Respond in JSON:
+{{"action": "buy|sell|hold", "quantity": <number>, "reasoning": "<brief explanation>"}}""",
+        system="You are a {personality} trader.",
+        name="stockagent.decision"
+    )
+    
     def __init__(self, agent_id, name, starting_cash, personality="Balanced"):
         super().__init__(agent_id, name, starting_cash)
         self.personality = personality if personality in self.PERSONALITIES else "Balanced"
         self.llm_model = "gpt-3.5-turbo"
-        self.decisions = []
+        self.temperature = 0.7
+        self.decisions = DecisionRing(self.DECISION_HISTORY)
+        self.speculator = None  # speculation.Speculator to prefetch next-tick decisions
         
     def on_tick(self, current_time, simulator):
         """Make trading decision based on personality"""
         
+        self._begin_tick(simulator)
         market_data = simulator.get_market_data("STOCK")
         current_price = market_data["mid_price"]
         
         if not current_price:
             return
         
-        # Build personality-based prompt
-        prompt = self._build_prompt(current_price, market_data)
+        cash, positions = account_view(self, simulator)
+        state = (current_price, cash, positions.get("STOCK", 0))
         
         try:
-            decision = self._call_llm(prompt)
-            self._execute_decision(decision, simulator, current_price)
+            decision = self.speculator.take(state) if self.speculator else None
+            if decision is None:
+                # Build personality-based prompt
+                prompt = self._build_prompt(current_price, market_data, state[1], state[2])
+                decision = self._call_llm(prompt)
+            filled = self._execute_decision(decision, simulator, current_price)
+            
+            if self.speculator:
+                # Next tick, assuming the order fills here and the price holds
+                self.speculator.launch(
+                    (current_price, state[1] - filled * current_price, state[2] + filled),
+                    self._speculative_decision
+                )
+        except CacheMiss:
+            # Strict replay: a missing response must fail the run, not become a hold
+            raise
         except Exception as e:
             print(f"{self.name} error: {e}")
     
-    def _build_prompt(self, current_price, market_data):
-        traits = {
-            "Conservative": "risk-averse, prefer stable returns, avoid excessive trading",
-            "Aggressive": "risk-seeking, pursue high returns, willing to trade frequently",
-            "Balanced": "moderate risk tolerance, balanced approach",
-            "Growth-Oriented": "focus on long-term growth, patient"
-        }
+    def _template(self):
+        """Decision template with personality baked in, compiled once per personality"""
+        return compiled_template(
+            (type(self).__name__, self.personality),
+            lambda: self.PROMPT.partial(personality=self.personality, traits=self.TRAITS[self.personality])
+        )
+    
+    def _build_prompt(self, current_price, market_data, cash=None, position=None):
+        cash = self.cash if cash is None else cash
+        position = self.positions.get('STOCK', 0) if position is None else position
         
-        return f"""You are a {self.personality} stock trader.
-Personality: {traits[self.personality]}
-
-Current Situation:
-- Stock Price: ${current_price:.2f}
-- Your Cash: ${self.cash:.2f}
-- Your Position: {self.positions.get('STOCK', 0)} shares
-- Portfolio Value: ${self.cash + self.positions.get('STOCK', 0) * current_price:.2f}
-
-Decide: BUY, SELL, or HOLD
-
-Respond in JSON:
-{{"action": "buy|sell|hold", "quantity": <number>, "reasoning": "<brief explanation>"}}"""
+        return self._template().render(
+            current_price=current_price,
+            cash=cash,
+            position=position,
+            portfolio_value=cash + position * current_price
+        )
+    
+    def _speculative_decision(self, price, cash, position):
+        return self._call_llm(self._build_prompt(price, None, cash, position))
     
     def _call_llm(self, prompt):
         """Call GPT for decision"""
-        response = openai.ChatCompletion.create(
+        content = chat_completion(
             model=self.llm_model,
-            messages=[
-                {"role": "system", "content": f"You are a {self.personality} trader."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
+            messages=prompt.messages,
+            temperature=self.temperature,
+            stage=prompt.name,
+            agent=self.agent_id,
             max_tokens=200
         )
         
-        content = response.choices[0].message.content
-        
         # Extract JSON
         start = content.find("{")
         end = content.rfind("}") + 1
@@ -77,20 +120,7 @@ Respond in JSON:
         return {"action": "hold", "quantity": 0}
     
     def _execute_decision(self, decision, simulator, current_price):
-        """Execute trading decision"""
-        action = decision.get("action", "hold")
-        quantity = decision.get("quantity", 0)
-        
-        if action == "buy" and quantity > 0:
-            max_affordable = int(self.cash / current_price)
-            quantity = min(quantity, max_affordable)
-            if quantity > 0:
-                simulator.submit_order(self.agent_id, "STOCK", "BUY", quantity, current_price)
-        
-        elif action == "sell" and quantity > 0:
-            current_position = self.positions.get("STOCK", 0)
-            quantity = min(quantity, current_position)
-            if quantity > 0:
-                simulator.submit_order(self.agent_id, "STOCK", "SELL", quantity, current_price)
-        
-        self.decisions.append(decision)
+        """Execute trading decision; returns the signed quantity submitted"""
+        submitted = submit_decision(self, decision, simulator, current_price)
+        self._record_decision(decision)
+        return submitted
@@ -0,0 +1,398 @@
+"""
+Parameter Sweep - Grid / random search over agent settings with walk-forward tests
+
+Sweeps the knobs that used to be hard-coded:
+
+    agent            stockagent | fingpt | tradingagents
+    personality      StockAgentTrader personality
+    risk_tolerance   FinGPTAgent.risk_tolerance
+    max_position_pct TradingAgentsSystem position cap (default 0.3)
+    model            the agent's main model (deep_llm for TradingAgents)
+    quick_model      TradingAgents analyst model
+    temperature      sampling temperature for every call
+
+Each candidate is backtested on every walk-forward train window (in a
+process pool); the best candidate per window is then scored on the
+following test window. Trials share one LLM ResponseCache, so identical
+prompts across settings (e.g. FinGPT sentiment for the same price) are
+answered once. Finished trials are appended to a JSONL checkpoint and
+skipped on restart; a trial's checkpoint key covers the data (feed_dir,
+symbols), tick_every, starting_cash and execution/risk settings, so a
+re-run on different data never reuses stale results.
+
+With decision_store="results/decisions", every trial's decisions and
+analyst reports are saved there under its checkpoint key (trials ship
+their history back and the sweep process is the store's only writer).
+
+    windows = walk_forward_windows("2023-01-01", "2023-12-31", timedelta(days=60), timedelta(days=20))
+    engine = SweepEngine(grid({"agent": ["fingpt"], "risk_tolerance": [0.3, 0.5, 0.8]}),
+                         windows, feed_dir="cache", symbols=["STOCK"])
+    engine.run()
+"""
+
+import hashlib
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from itertools import product
+from pathlib import Path
+
+from agent_registry import AGENT_CLASSES, load_agent_class
+from agent_state import AgentLedger, LedgerStateMixin
+from decision_store import RINGS, DecisionStore
+from execution import ExecutionEngine, settle
+from risk import RiskEngine
+
+
+# ============================================================================
+# SEARCH SPACES AND WINDOWS
+# ============================================================================
+
+def grid(space):
+    """Every combination of a {param: [values]} grid"""
+    names = list(space)
+    return [dict(zip(names, values)) for values in product(*(space[n] for n in names))]
+
+
+def random_search(space, n_samples, seed=0):
+    """
+    n_samples random candidates. Values may be lists (sampled uniformly) or
+    (low, high) tuples (float uniform, or int uniform when both are ints).
+    """
+    rng = random.Random(seed)
+    candidates = []
+    for _ in range(n_samples):
+        candidate = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                candidate[name] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) \
+                    else rng.uniform(low, high)
+            else:
+                candidate[name] = rng.choice(values)
+        candidates.append(candidate)
+    return candidates
+
+
+def walk_forward_windows(start, end, train, test, step=None, anchored=False):
+    """
+    [{"train": (start, end), "test": (start, end)}] rolling forward by `step`
+    (default: the test length). anchored=True keeps the train start fixed.
+    Windows are half-open [start, end): run_trial never replays the end bar,
+    so a train window and the test window that follows share no bars.
+    """
+    start = datetime.fromisoformat(str(start))
+    end = datetime.fromisoformat(str(end))
+    step = step or test
+    windows = []
+    train_start = start
+    while True:
+        train_end = train_start + train if not anchored else start + train + step * len(windows)
+        test_end = train_end + test
+        if test_end > end:
+            break
+        windows.append({
+            "train": (train_start.isoformat(), train_end.isoformat()),
+            "test": (train_end.isoformat(), test_end.isoformat()),
+        })
+        if not anchored:
+            train_start += step
+    return windows
+
+
+# ============================================================================
+# BACKTEST TRIAL (runs in worker processes)
+# ============================================================================
+
+class BacktestMarket:
+    """
+    Replay market for sweeps: DataFeed prices. Orders fill at the submitted
+    price, or through an ExecutionEngine (depth, impact, fees, latency) if given.
+    With a RiskEngine, a tick's orders are held and checked together in end_tick.
+    Registered ledger-backed agents keep their cash/positions in self.ledger.
+    """
+
+    def __init__(self, feed, execution=None, risk_engine=None):
+        self.feed = feed
+        self.execution = execution
+        self.risk_engine = risk_engine
+        if risk_engine is not None and risk_engine.execution is None:
+            # Orders queued in the execution engine count against the risk limits
+            risk_engine.execution = execution
+        self.agents = {}
+        self.ledger = AgentLedger(feed.symbols, capacity=64)
+        self.trades = 0
+        self.tick = 0
+
+    def register_agent(self, agent_id, agent):
+        self.agents[agent_id] = agent
+        if isinstance(agent, LedgerStateMixin):
+            self.ledger.attach(agent)
+        if self.risk_engine is not None:
+            self.risk_engine.register(agent)
+
+    def get_market_data(self, symbol):
+        return self.feed.get_market_data(symbol)
+
+    def submit_order(self, agent_id, symbol, side, quantity, price):
+        if self.risk_engine is not None:
+            self.risk_engine.submit(agent_id, symbol, side, quantity, price)
+            return
+        self._route(agent_id, symbol, side, quantity, price)
+
+    def _route(self, agent_id, symbol, side, quantity, price):
+        if self.execution is not None:
+            self.execution.submit(agent_id, symbol, side, quantity, price, self.feed.current_time)
+            return
+        agent = self.agents[agent_id]
+        signed = quantity if side == "BUY" else -quantity
+        agent.cash -= signed * price
+        agent.positions[symbol] = agent.positions.get(symbol, 0) + signed
+        self.trades += 1
+
+    def end_tick(self):
+        """Risk-check the tick's orders, then match queued orders against the current bar's book"""
+        if self.risk_engine is not None and self.risk_engine.pending:
+            prices = {s: self.feed.get_market_data(s)["mid_price"] for s in self.risk_engine.symbols}
+            for order in self.risk_engine.check(prices):
+                self._route(*order)
+        if self.execution is not None:
+            fills = self.execution.match(self.feed.current_time, self.feed.get_market_data)
+            settle(fills, self.agents, self.execution.stats)
+            self.trades += int((fills["quantities"] > 0).sum())
+
+
+def build_agent(params, agent_id=1, starting_cash=10000):
+    """Instantiate an agent and apply sweep parameters to it"""
+    agent_class = load_agent_class(params.get("agent", "stockagent"))
+    class_name = agent_class.__name__
+
+    if class_name == "StockAgentTrader":
+        agent = agent_class(agent_id, class_name, starting_cash, params.get("personality", "Balanced"))
+    else:
+        agent = agent_class(agent_id, class_name, starting_cash)
+
+    model_attribute = {"StockAgentTrader": "llm_model", "FinGPTAgent": "model",
+                       "TradingAgentsSystem": "deep_llm"}.get(class_name, "model")
+    if "model" in params:
+        setattr(agent, model_attribute, params["model"])
+    if "quick_model" in params and class_name == "TradingAgentsSystem":
+        agent.quick_llm = params["quick_model"]
+    for name in ("temperature", "risk_tolerance", "max_position_pct"):
+        if name in params and hasattr(agent, name):
+            setattr(agent, name, params[name])
+    return agent
+
+
+_worker_cache = None
+
+
+def run_trial(params, window, feed_dir, symbols, cache_path=None, tick_every=1, starting_cash=10000,
+              execution=None, risk=None, decisions=False):
+    """
+    Backtest one candidate over one (start, end) window; returns its scores.
+    execution: ExecutionEngine keyword arguments, or None for exact fills.
+    risk: RiskEngine keyword arguments, or None for per-agent order checks.
+    decisions: also return the agent's whole decision history (evicted
+    entries included) under "decisions", for the sweep's DecisionStore.
+    """
+    global _worker_cache
+    from llm_client import ResponseCache, install_cache
+    from market_data import DataFeed, to_ns
+
+    if cache_path and (_worker_cache is None or _worker_cache.path != str(cache_path)):
+        _worker_cache = install_cache(ResponseCache(cache_path))
+    hits_before = dict(_worker_cache.stats) if _worker_cache else {}
+
+    feed = DataFeed(feed_dir, symbols)
+    market = BacktestMarket(feed, ExecutionEngine(**execution) if execution is not None else None,
+                            RiskEngine(symbols, **risk) if risk is not None else None)
+    agent = build_agent(params, starting_cash=starting_cash)
+    market.register_agent(agent.agent_id, agent)
+    history = {}
+    if decisions:
+        for name in RINGS:
+            ring = getattr(agent, name, None)
+            if ring is not None:
+                history[name] = []
+                ring.spill = history[name].append
+
+    start, end = window
+    for i, timestamp in enumerate(feed.replay(start, to_ns(end) - 1)):
+        market.tick = i
+        if i % tick_every == 0:
+            current_time = datetime.fromtimestamp(timestamp / 1e9, timezone.utc).replace(tzinfo=None)
+            agent.on_tick(current_time, market)
+        market.end_tick()
+
+    prices = {symbol: feed.get_market_data(symbol)["mid_price"] or 0.0 for symbol in symbols}
+    equity = agent.cash + sum(agent.positions.get(s, 0) * prices[s] for s in symbols)
+    result = {
+        "final_equity": equity,
+        "return_pct": 100 * (equity / starting_cash - 1),
+        "trades": market.trades,
+    }
+    if market.execution is not None:
+        result["fees"] = market.execution.stats["fees"]
+        result["slippage_cost"] = market.execution.stats["slippage_cost"]
+    if market.risk_engine is not None:
+        result["risk_rejected"] = {rule: n for rule, n in market.risk_engine.stats["rejected"].items() if n}
+    if _worker_cache:
+        result["cache_hits"] = _worker_cache.stats["hits"] - hits_before.get("hits", 0)
+        result["cache_misses"] = _worker_cache.stats["misses"] - hits_before.get("misses", 0)
+    if decisions:
+        result["decisions"] = {"agent": agent.name,
+                               "records": [record for name, spilled in history.items()
+                                           for record in spilled + list(getattr(agent, name))]}
+    return result
+
+
+# ============================================================================
+# SWEEP ENGINE
+# ============================================================================
+
+def trial_key(params, phase, window, setup=None):
+    """Checkpoint key of one trial; setup holds the run-wide settings that change its result"""
+    fields = [params, phase, window] + ([setup] if setup else [])
+    payload = json.dumps(fields, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class SweepEngine:
+    """Walk-forward parameter sweep with a parallel pool and a resumable checkpoint"""
+
+    def __init__(self, candidates, windows, feed_dir, symbols, metric="return_pct",
+                 workers=None, checkpoint="results/sweep_checkpoint.jsonl",
+                 cache_path="results/llm_cache.sqlite", tick_every=1, starting_cash=10000,
+                 execution=None, risk=None, decision_store=None, trial=run_trial):
+        self.candidates = list(candidates)
+        self.windows = list(windows)
+        self.feed_dir = str(feed_dir)
+        self.symbols = list(symbols)
+        self.metric = metric
+        self.workers = workers
+        self.checkpoint = Path(checkpoint)
+        self.cache_path = str(cache_path) if cache_path else None
+        self.tick_every = tick_every
+        self.starting_cash = starting_cash
+        self.execution = execution
+        self.risk = risk
+        self.trial = trial
+        self.decision_store = DecisionStore(decision_store) if decision_store else None
+        self.setup = {"feed_dir": str(Path(feed_dir).resolve()), "symbols": self.symbols,
+                      "tick_every": tick_every, "starting_cash": starting_cash,
+                      "execution": execution, "risk": risk}
+        self.completed = self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        completed = {}
+        if self.checkpoint.exists():
+            with open(self.checkpoint, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn final line from an interrupted write
+                        continue
+                    if "error" in record:
+                        # Failed trials (API errors, replay cache misses) are retried
+                        continue
+                    completed[record["key"]] = record
+        return completed
+
+    def _record(self, record):
+        self.checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.checkpoint, "a") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.completed[record["key"]] = record
+
+    def _run_trials(self, jobs):
+        """jobs: [(params, phase, window_index, window)]; runs those not checkpointed"""
+        todo = [job for job in jobs if trial_key(job[0], job[1], job[3], self.setup) not in self.completed]
+        if not todo:
+            return
+        print(f"→ {len(todo)} trial(s) to run ({len(jobs) - len(todo)} already checkpointed)")
+
+        options = {"execution": self.execution, "risk": self.risk}
+        if self.decision_store is not None:
+            options["decisions"] = True
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                pool.submit(self.trial, params, window, self.feed_dir, self.symbols, self.cache_path,
+                            self.tick_every, self.starting_cash, **options): (params, phase, index, window)
+                for params, phase, index, window in todo
+            }
+            for future in as_completed(futures):
+                params, phase, index, window = futures[future]
+                record = {
+                    "key": trial_key(params, phase, window, self.setup),
+                    "params": params, "phase": phase, "window_index": index, "window": window,
+                }
+                try:
+                    record["result"] = future.result()
+                except Exception as e:
+                    record["error"] = str(e)
+                history = record.get("result", {}).pop("decisions", None)
+                if history is not None:
+                    self.decision_store.extend(record["key"], history["agent"], history["records"])
+                    self.decision_store.flush()
+                self._record(record)
+                score = record.get("result", {}).get(self.metric)
+                status = f"{self.metric}={score:.3f}" if score is not None else f"error: {record['error']}"
+                print(f"  ✓ {phase} window {index}: {params} → {status}")
+
+    def _score(self, params, phase, window):
+        record = self.completed.get(trial_key(params, phase, window, self.setup), {})
+        return record.get("result", {}).get(self.metric)
+
+    def run(self):
+        """Train every candidate on every window, then test each window's best"""
+        train_jobs = [(params, "train", i, tuple(w["train"]))
+                      for i, w in enumerate(self.windows) for params in self.candidates]
+        self._run_trials(train_jobs)
+
+        best = []
+        for i, w in enumerate(self.windows):
+            scored = [(self._score(p, "train", tuple(w["train"])), p) for p in self.candidates]
+            scored = [(s, p) for s, p in scored if s is not None]
+            best.append(max(scored, key=lambda item: item[0]) if scored else (None, None))
+
+        test_jobs = [(params, "test", i, tuple(self.windows[i]["test"]))
+                     for i, (_, params) in enumerate(best) if params is not None]
+        self._run_trials(test_jobs)
+
+        report = []
+        for i, (train_score, params) in enumerate(best):
+            window = self.windows[i]
+            report.append({
+                "window": i,
+                "train": window["train"],
+                "test": window["test"],
+                "best_params": params,
+                "train_score": train_score,
+                "test_score": self._score(params, "test", tuple(window["test"])) if params else None,
+            })
+        if self.decision_store is not None:
+            self.decision_store.close()
+        return report
+
+
+def print_report(report, metric="return_pct"):
+    print("=" * 80)
+    print("WALK-FORWARD SWEEP RESULTS")
+    print("=" * 80)
+    for row in report:
+        train = row["train_score"]
+        test = row["test_score"]
+        print(f"\nWindow {row['window']}: train {row['train'][0]} → {row['train'][1]}, "
+              f"test {row['test'][0]} → {row['test'][1]}")
+        print(f"  Best params: {row['best_params']}")
+        print(f"  Train {metric}: {train:.3f}" if train is not None else "  Train: no successful trials")
+        print(f"  Test {metric}:  {test:.3f}" if test is not None else "  Test: not available")
@@ -0,0 +1,97 @@
+"""Agent State Tests - Ledger-backed positions, bounded history and spill teardown"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from agent_state import AgentLedger, DecisionRing, JsonlSpill, LedgerStateMixin, memory_report
+from tick_scheduler import TickScheduler
+
+
+class LedgerAgent(LedgerStateMixin):
+    """Minimal agent using the ledger-backed cash/positions"""
+
+    def __init__(self, agent_id, cash, history=8, spill=None):
+        self.agent_id = agent_id
+        self.name = f"agent-{agent_id}"
+        self.cash = cash
+        self.positions = {}
+        self.decisions = DecisionRing(history, spill)
+
+    def on_tick(self, current_time, simulator):
+        self._record_decision({"action": "hold", "quantity": 0, "time": current_time})
+
+
+class NullSimulator:
+    def get_market_data(self, symbol):
+        return {"mid_price": 100.0}
+
+    def submit_order(self, *args):
+        pass
+
+
+def test_positions_view_lists_only_held_symbols():
+    ledger = AgentLedger(["STOCK"])
+    first, second = LedgerAgent(1, 1000), LedgerAgent(2, 1000)
+    ledger.attach(first)
+    ledger.attach(second)
+
+    first.positions["BOND"] = 5
+    assert dict(second.positions.items()) == {}
+    assert "BOND" not in second.positions and "STOCK" not in second.positions
+    assert len(second.positions) == 0
+    assert dict(first.positions.items()) == {"BOND": 5}
+    assert second.positions.get("BOND", 0) == 0
+
+    first.positions["BOND"] = 0
+    assert len(first.positions) == 0
+
+
+def test_duplicate_agent_id_is_rejected():
+    ledger = AgentLedger(["STOCK"])
+    ledger.attach(LedgerAgent(1, 1000))
+    with pytest.raises(ValueError):
+        ledger.attach(LedgerAgent(1, 500))
+
+
+def test_spilled_decisions_are_flushed_at_run_end(tmp_path):
+    path = tmp_path / "trades.jsonl"
+    agent = LedgerAgent(1, 1000, history=2, spill=JsonlSpill(str(path), "a1", buffer_size=100))
+    start = datetime(2024, 1, 1)
+    TickScheduler(NullSimulator(), [agent]).run(start, start + timedelta(minutes=5))
+
+    with open(path) as f:
+        spilled = [json.loads(line) for line in f]
+    assert len(spilled) == 3
+    assert len(agent.decisions) == 2 and agent.decisions.total == 5
+
+
+def test_memory_per_agent_stays_flat():
+    def report(count, decisions):
+        ledger = AgentLedger(["STOCK"], capacity=16)
+        agents = [LedgerAgent(i, 1000) for i in range(count)]
+        for agent in agents:
+            ledger.attach(agent)
+            for _ in range(decisions):
+                agent._record_decision({"action": "buy", "quantity": 1})
+        return memory_report(agents)
+
+    small, large = report(100, 10), report(2000, 10)
+    assert large["bytes_per_agent"] <= small["bytes_per_agent"] * 1.1
+    # History is capped by the ring, not by the number of decisions made
+    assert report(10, 1000)["max_bytes"] <= report(10, 10)["max_bytes"] * 1.1
+
+
+def test_backtest_market_keeps_registered_agents_in_its_ledger(tmp_path):
+    from benchmark import synthetic_feed
+    from sweep import BacktestMarket
+
+    market = BacktestMarket(synthetic_feed(str(tmp_path), datetime(2024, 1, 1), timedelta(minutes=1), 5))
+    agents = [LedgerAgent(agent_id, 1000.0 * agent_id) for agent_id in (1, 2)]
+    for agent in agents:
+        market.register_agent(agent.agent_id, agent)
+    agents[1].positions["STOCK"] = 3
+
+    assert all(agent._ledger is market.ledger for agent in agents)
+    assert list(market.ledger.cash[:2]) == [1000.0, 2000.0]
+    assert list(market.ledger.positions[:2, 0]) == [0, 3]
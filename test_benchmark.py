@@ -0,0 +1,50 @@
+"""Benchmark Tests - Fake LLM server, synthetic replay feed, case runner and comparison"""
+import json
+from datetime import datetime, timedelta
+from urllib.request import Request, urlopen
+
+import pytest
+
+from benchmark import compare, percentile, run_case, synthetic_feed
+from fake_llm_server import FakeLLMServer
+
+
+def test_fake_server_answers_chat_completions():
+    with FakeLLMServer() as server:
+        body = json.dumps({"model": "m", "messages": [{"role": "user", "content": "hi"}]}).encode()
+        request = Request(server.api_base + "/chat/completions", body, {"Content-Type": "application/json"})
+        reply = json.loads(urlopen(request, timeout=5).read())
+    content = json.loads(reply["choices"][0]["message"]["content"])
+    assert content["action"] in ("buy", "sell", "hold")
+    assert server.stats["requests"] == 1
+
+
+def test_synthetic_feed_replays_every_bar(tmp_path):
+    start = datetime(2025, 1, 1, 9, 30)
+    feed = synthetic_feed(str(tmp_path), start, timedelta(minutes=1), 10)
+    stamps = list(feed.replay(start, start + timedelta(minutes=9)))
+    assert len(stamps) == 10
+    assert feed.get_market_data("STOCK")["mid_price"] > 0
+
+
+def test_compare_flags_regressions():
+    case = {"agent": "stockagent", "population": 1, "mode": "sync"}
+    baseline = {"commit": "a", "cases": [dict(case, ticks_per_sec=10.0, peak_rss_mb=50.0)]}
+    current = {"commit": "b", "cases": [dict(case, ticks_per_sec=5.0, peak_rss_mb=50.0)]}
+    regressions = compare(baseline, current, threshold=0.1)
+    assert [r[1] for r in regressions] == ["ticks_per_sec"]
+    assert percentile([3, 1, 2], 50) == 2
+
+
+def test_run_case_uses_in_repo_market():
+    pytest.importorskip("framework.simulator.base_agent")
+    import openai
+
+    saved = openai.api_base, openai.api_key
+    try:
+        with FakeLLMServer() as server:
+            case = run_case("stockagent", 2, 3, server.api_base, "sync")
+    finally:
+        openai.api_base, openai.api_key = saved
+    assert case["decisions"] == 6
+    assert case["ticks_per_sec"] > 0
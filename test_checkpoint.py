@@ -0,0 +1,35 @@
+"""Checkpoint Tests - Snapshots skipped before capture while the writer is busy"""
+import threading
+import time
+
+from checkpoint import Checkpointer, load_checkpoint
+
+
+def test_busy_writer_skips_without_capturing(tmp_path):
+    captures = []
+    release = threading.Event()
+
+    def capture():
+        captures.append(len(captures))
+        return {"state": len(captures)}
+
+    checkpointer = Checkpointer(tmp_path, capture, every_ticks=1)
+    write = checkpointer._write
+    checkpointer._write = lambda job: (release.wait(5), write(job))
+
+    assert checkpointer.save(1, "t1")
+    while not checkpointer._queue.empty():  # writer picked up snapshot 1 and is stuck
+        time.sleep(0.001)
+    assert checkpointer.save(2, "t2")      # waits in the queue
+    extra_calls = []
+    checkpointer.after_tick(5, "t5", lambda: extra_calls.append(1) or {})
+
+    assert len(captures) == 2 and not extra_calls
+    assert checkpointer.stats["skipped"] == 1
+
+    release.set()
+    checkpointer.flush()
+    checkpointer.close()
+    assert checkpointer.stats["saved"] == 2
+    snapshot = load_checkpoint(tmp_path)
+    assert snapshot["tick"] == 2 and snapshot["components"]["state"] == 2
@@ -0,0 +1,33 @@
+"""CLI Tests - Lazy imports and the compare subcommand"""
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from cli import build_parser, main
+
+ROOT = Path(__file__).resolve().parent
+
+
+def test_importing_cli_loads_no_heavy_packages():
+    code = ("import sys, cli; cli.build_parser().parse_args(['view']); "
+            "print(sorted(m for m in ('openai', 'pandas', 'scipy', 'numpy') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_parser_routes_subcommands():
+    args = build_parser().parse_args(["view", "live", "--refresh", "0.5"])
+    assert args.target == "live" and args.refresh == 0.5
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(["view", "nonsense"])
+
+
+def test_compare_reads_results(tmp_path, capsys):
+    shutil.copy(ROOT / "stockagent_results.json", tmp_path / "stockagent_results.json")
+    assert main(["compare", "--results-dir", str(tmp_path), "--no-stats"]) == 0
+    assert "StockAgent" in capsys.readouterr().out
+
+    assert main(["compare", "--results-dir", str(tmp_path / "missing")]) == 1
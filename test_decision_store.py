@@ -0,0 +1,165 @@
+"""Decision Store Tests - Decisions keyed by simulation tick, with explicit confidence"""
+import math
+from datetime import datetime, timedelta
+
+import pytest
+
+from agent_state import DecisionRing, LedgerStateMixin
+from decision_store import DecisionStore
+from fake_llm_server import FakeLLMServer
+from tick_scheduler import TickScheduler
+
+START = datetime(2024, 1, 1)
+
+
+class Reporting(LedgerStateMixin):
+    """Logs two reports and one decision per tick, like TradingAgents"""
+
+    def __init__(self, agent_id, store, history=2):
+        self.agent_id = agent_id
+        self.name = f"reporting-{agent_id}"
+        self.cash = 1000.0
+        self.positions = {}
+        self.decisions = DecisionRing(history, store.spill("run", self.name))
+        self.analyst_reports = DecisionRing(history, store.spill("run", self.name))
+
+    def on_tick(self, current_time, simulator):
+        tick = self._begin_tick(simulator)
+        self.analyst_reports.append({"kind": "fundamental", "outlook": "bullish", "tick": tick})
+        self.analyst_reports.append({"kind": "technical", "recommendation": "hold", "tick": tick})
+        self._record_decision({"action": "hold", "quantity": 0})
+
+
+class Quote:
+    def get_market_data(self, symbol):
+        return {"mid_price": 100.0}
+
+    def submit_order(self, *args):
+        pass
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_spilled_and_ingested_rows_use_the_simulation_tick(tmp_path, mode):
+    store = DecisionStore(tmp_path / "decisions")
+    agent = Reporting(1, store)
+    scheduler = TickScheduler(Quote(), [agent], mode=mode, tick_interval=timedelta(minutes=1))
+    scheduler.run(START, START + timedelta(minutes=4))
+    store.ingest_agent("run", agent)
+    store.flush()
+
+    # Async agents skip the ticks they are still busy on: compare against the ticks decided on
+    decisions = store.records(store.query(kinds="decision", columns=("tick", "confidence")))
+    ticks = sorted(r["tick"] for r in decisions)
+    assert ticks == sorted(set(ticks)) and set(ticks) <= set(range(4))
+    if mode == "sync":
+        assert ticks == [0, 1, 2, 3]
+    assert all(r["confidence"] is None for r in decisions)
+
+    reports = store.records(store.query(kinds=["fundamental", "technical"], columns=("tick", "kind")))
+    assert sorted((r["tick"], r["kind"]) for r in reports) == [
+        (tick, kind) for tick in ticks for kind in ("fundamental", "technical")]
+    assert store.count(ticks=(ticks[-1], ticks[-1])) == 3
+
+
+def test_agents_without_a_tick_counter_count_their_own_ticks():
+    agent = Reporting(1, DecisionStore.__new__(DecisionStore), history=8)
+    agent.decisions.spill = agent.analyst_reports.spill = None
+    for _ in range(3):
+        agent.on_tick(START, Quote())
+    assert [d["tick"] for d in agent.decisions] == [0, 1, 2]
+    assert all(math.isnan(d["confidence"]) for d in agent.decisions)
+
+
+@pytest.mark.parametrize("module, class_name", [("stockagent", "StockAgentTrader"),
+                                                 ("fingpt", "FinGPTAgent"),
+                                                 ("tradingagents", "TradingAgentsSystem")])
+def test_agents_record_tick_and_confidence(module, class_name):
+    pytest.importorskip("framework.simulator.base_agent")
+    import openai
+
+    agent = getattr(__import__(module), class_name)(1, class_name, 10000.0)
+    saved = openai.api_base, openai.api_key
+    try:
+        with FakeLLMServer() as server:
+            openai.api_base, openai.api_key = server.api_base, "test"
+            scheduler = TickScheduler(Quote(), [agent], tick_interval=timedelta(minutes=1))
+            scheduler.run(START, START + timedelta(minutes=2))
+    finally:
+        openai.api_base, openai.api_key = saved
+
+    decisions = list(agent.decisions)
+    assert [d["tick"] for d in decisions] == [0, 1]
+    # The fake model always answers with a confidence; TradingAgents must keep it past risk management
+    assert all(0 <= d["confidence"] <= 1 for d in decisions)
+    if class_name == "TradingAgentsSystem":
+        assert [r["tick"] for r in agent.analyst_reports] == [0, 0, 1, 1]
+
+
+def write_store(path, runs=("run-a", "run-b"), ticks=5):
+    store = DecisionStore(path, segment_rows=4)
+    for run in runs:
+        for tick in range(ticks):
+            store.append(run, "agent", tick, {"action": "buy" if tick % 2 else "sell", "quantity": tick,
+                                              "confidence": 0.5, "reasoning": f"reason {tick % 2}",
+                                              "key_points": ["momentum"], "sentiment": "positive"})
+    store.close()
+
+
+def test_strings_are_read_lazily_and_decoded_only_for_records(tmp_path):
+    write_store(tmp_path / "decisions")
+
+    store = DecisionStore(tmp_path / "decisions")
+    assert store.string_ids is None
+    result = store.query(runs="run-b", agents="agent", action="buy",
+                         columns=("run", "tick", "reasoning", "key_points", "extra"))
+    assert store.string_ids is None
+    assert store.records(result) == [
+        {"run": "run-b", "tick": tick, "reasoning": "reason 1", "key_points": ["momentum"],
+         "sentiment": "positive"} for tick in (1, 3)]
+    assert store.string_ids is None
+    assert store.count(runs="missing") == 0
+    assert store.stats()["unique_strings"] == 8
+    store.close()
+
+
+def test_only_one_process_writes_a_store(tmp_path):
+    write_store(tmp_path / "decisions", runs=("run-a",))
+    first = DecisionStore(tmp_path / "decisions", segment_rows=4)
+    second = DecisionStore(tmp_path / "decisions", segment_rows=4)
+    first.append("run-c", "agent", 0, {"action": "hold", "reasoning": "new reason"})
+
+    with pytest.raises(RuntimeError, match="already open for writing"):
+        second.append("run-d", "agent", 0, {"action": "hold"})
+    first.close()
+
+    # Once the first writer closes, the second picks up its segments and strings
+    second.append("run-d", "agent", 0, {"action": "hold", "reasoning": "new reason"})
+    second.close()
+    store = DecisionStore(tmp_path / "decisions")
+    assert store.count() == 7
+    assert len({segment["file"] for segment in store.segments}) == len(store.segments)
+    records = store.records(store.query(runs=["run-c", "run-d"], columns=("run", "reasoning")))
+    assert records == [{"run": "run-c", "reasoning": "new reason"},
+                       {"run": "run-d", "reasoning": "new reason"}]
+    # "new reason" is stored once across both writers
+    assert store.stats()["unique_strings"] == 10
+
+
+def test_scheduler_fills_a_decision_store(tmp_path):
+    store = DecisionStore(tmp_path / "decisions")
+    agent = Reporting(1, store)
+    agent.decisions.spill = agent.analyst_reports.spill = None
+    scheduler = TickScheduler(Quote(), [agent], tick_interval=timedelta(minutes=1))
+    scheduler.run(START, START + timedelta(minutes=4), decision_store=store, run_id="scheduled")
+    store.close()
+
+    store = DecisionStore(tmp_path / "decisions")
+    assert store.count(runs="scheduled", kinds="decision") == 4
+    assert store.count(runs="scheduled") == 12
+
+
+def test_missing_string_index_is_rebuilt(tmp_path):
+    write_store(tmp_path / "decisions", runs=("run-a",))
+    (tmp_path / "decisions" / "strings.idx").unlink()
+    store = DecisionStore(tmp_path / "decisions")
+    assert {r["reasoning"] for r in store.records(store.query(columns=("reasoning",)))} == {"reason 0", "reason 1"}
@@ -0,0 +1,108 @@
+"""Execution Tests - Reservations for queued orders, fill-time clamps and order expiry"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from agent_state import AgentLedger
+from execution import ExecutionEngine, settle, settle_ledger
+from risk import submit_decision
+
+T0 = datetime(2024, 1, 1, 9, 30)
+
+
+class Trader:
+    def __init__(self, agent_id, cash, shares=0):
+        self.agent_id = agent_id
+        self.cash = cash
+        self.positions = {"STOCK": shares} if shares else {}
+
+
+class QueuedMarket:
+    """Simulator whose orders go through an ExecutionEngine"""
+
+    def __init__(self, execution, book):
+        self.execution = execution
+        self.book = book
+        self.now = T0
+
+    def get_market_data(self, symbol):
+        return self.book
+
+    def submit_order(self, agent_id, symbol, side, quantity, price):
+        self.execution.submit(agent_id, symbol, side, quantity, price, self.now)
+
+
+def test_queued_orders_reserve_shares_and_cash():
+    engine = ExecutionEngine(impact="none", fee_bps=10.0, latency=1.0)
+    market = QueuedMarket(engine, {"mid_price": 100.0})
+    seller, buyer = Trader(1, 0.0, shares=10), Trader(2, 1000.0)
+
+    assert submit_decision(seller, {"action": "sell", "quantity": 10}, market, 100.0) == -10
+    assert submit_decision(seller, {"action": "sell", "quantity": 10}, market, 100.0) == 0
+    assert submit_decision(buyer, {"action": "buy", "quantity": 5}, market, 100.0) == 5
+    # 500 + 0.5 in fees is already held: only 4 more shares are affordable
+    assert submit_decision(buyer, {"action": "buy", "quantity": 10}, market, 100.0) == 4
+    assert engine.reservations() == {1: (0.0, {"STOCK": 10}), 2: (pytest.approx(900.9), {})}
+
+    fills = engine.match(T0 + timedelta(seconds=1), market.get_market_data)
+    settle(fills, {1: seller, 2: buyer}, engine.stats)
+    assert seller.positions["STOCK"] == 0 and buyer.positions["STOCK"] == 9
+    assert buyer.cash >= 0 and engine.stats["settle_rejected"] == 0
+    assert engine.reserved(2) == (0.0, {})
+
+
+def test_settle_clamps_fills_to_cash_and_holdings():
+    engine = ExecutionEngine(impact="none", fee_bps=10.0, latency=0.0)
+    book = {"mid_price": 100.0, "asks": [(101.0, 100)], "bids": [(99.0, 100)]}
+    engine.submit(1, "STOCK", "SELL", 10, 100.0, T0)
+    engine.submit(1, "STOCK", "SELL", 10, 100.0, T0)
+    engine.submit(2, "STOCK", "BUY", 10, 100.0, T0)
+    fills = engine.match(T0, lambda symbol: book)
+
+    seller, buyer = Trader(1, 0.0, shares=10), Trader(2, 1000.0)
+    settle({name: column.copy() for name, column in fills.items()}, {1: seller, 2: buyer}, engine.stats)
+    assert seller.positions["STOCK"] == 0
+    assert buyer.positions["STOCK"] == 9 and 0 <= buyer.cash < 101.2
+    assert engine.stats["settle_rejected"] == 11
+
+    ledger = AgentLedger(["STOCK"])
+    ledger.add(1, 0.0, {"STOCK": 10})
+    ledger.add(2, 1000.0)
+    settled = settle_ledger(fills, ledger)
+    assert list(settled["quantities"]) == [10, 0, 9]
+    assert list(ledger.positions[:2, 0]) == [0, 9]
+    assert np.all(ledger.cash[:2] >= 0)
+
+
+def test_only_markets_without_depth_fill_at_the_mid():
+    engine = ExecutionEngine(impact="none", fee_bps=0.0)
+    engine.submit(1, "STOCK", "BUY", 5, 100.0, T0)
+    fills = engine.match(T0, lambda symbol: {"mid_price": 100.0})
+    assert list(fills["quantities"]) == [5] and list(fills["prices"]) == [100.0]
+    assert engine.pending == 0
+
+    # An explicitly empty or zero-size book is no liquidity, not unlimited liquidity at the mid
+    for book in ({"mid_price": 100.0, "asks": [(101.0, 0), (102.0, 0)]},
+                 {"mid_price": 100.0, "asks": [], "bids": [(99.0, 10)]}):
+        engine = ExecutionEngine(impact="none", fee_bps=0.0, max_age=60)
+        engine.submit(1, "STOCK", "BUY", 5, 100.0, T0)
+        fills = engine.match(T0, lambda symbol: book)
+        assert not fills["quantities"].sum() and engine.pending == 1
+        engine.match(T0 + timedelta(seconds=90), lambda symbol: book)
+        assert engine.pending == 0 and engine.stats["expired"] == 1
+
+
+def test_unmatchable_orders_expire_after_max_age():
+    halted = {"mid_price": None, "asks": [], "bids": []}
+    resting = ExecutionEngine(impact="none")
+    expiring = ExecutionEngine(impact="none", max_age=60)
+    for engine in (resting, expiring):
+        engine.submit(1, "STOCK", "BUY", 5, 100.0, T0)
+        engine.match(T0 + timedelta(seconds=30), lambda symbol: halted)
+        assert engine.pending == 1
+        engine.match(T0 + timedelta(seconds=90), lambda symbol: halted)
+
+    assert resting.pending == 1
+    assert expiring.pending == 0 and expiring.stats["expired"] == 1
+    assert expiring.reserved(1) == (0.0, {})
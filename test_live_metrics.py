@@ -0,0 +1,84 @@
+"""Live Metrics Tests - Trade folding, win/loss accounting and the HTTP endpoints"""
+from urllib.error import HTTPError
+
+import pytest
+
+from live_metrics import MetricsPublisher, fetch_metrics
+
+
+class Trader:
+    def __init__(self, agent_id, cash):
+        self.agent_id = agent_id
+        self.name = f"trader-{agent_id}"
+        self.cash = cash
+        self.positions = {}
+
+    def trade(self, quantity, price):
+        self.cash -= quantity * price
+        self.positions["STOCK"] = self.positions.get("STOCK", 0) + quantity
+
+
+class Quote:
+    price = 100.0
+
+    def get_market_data(self, symbol):
+        return {"mid_price": self.price}
+
+
+def test_round_trips_count_wins_and_losses():
+    winner, loser = Trader(1, 10000.0), Trader(2, 10000.0)
+    market = Quote()
+    with MetricsPublisher([winner, loser], market, interval=3600) as publisher:
+        winner.trade(10, 100.0)
+        loser.trade(10, 100.0)
+        publisher.after_tick(1, "t1")
+        winner.trade(-10, 110.0)
+        loser.trade(-5, 90.0)
+        publisher.after_tick(2, "t2")
+        assert publisher.latest is None  # interval not reached: nothing built yet
+
+        market.price = 90.0
+        snapshot = publisher.publish("t2")
+        assert fetch_metrics(publisher.url) == snapshot
+        assert [s["seq"] for s in fetch_metrics(publisher.url, "/history?since=0")] == [1]
+        assert fetch_metrics(publisher.url, "/health") == {"ok": True}
+        with pytest.raises(HTTPError):
+            fetch_metrics(publisher.url, "/nope")
+
+    first, second = snapshot["agents"]
+    assert (first["trades"], first["wins"], first["losses"], first["pnl"]) == (2, 1, 0, 100.0)
+    assert (second["trades"], second["wins"], second["losses"], second["pnl"]) == (2, 0, 1, -100.0)
+    assert first["win_rate"] == 100.0 and snapshot["tick"] == 2
+
+
+def test_fills_give_each_symbol_its_own_price():
+    from execution import ExecutionEngine, settle
+
+    trader = Trader(1, 10000.0)
+    engine = ExecutionEngine(impact="none", fee_bps=0.0)
+    prices = {"A": 100.0, "B": 10.0}
+    market = type("Market", (), {"get_market_data": lambda self, symbol: {"mid_price": prices[symbol]}})()
+
+    def tick(number, *orders):
+        for symbol, side, quantity in orders:
+            engine.submit(1, symbol, side, quantity, prices[symbol], number)
+        settle(engine.match(number, market.get_market_data), {1: trader}, engine.stats)
+        publisher.after_tick(number, number)
+
+    with MetricsPublisher([trader], market, symbols=("A", "B"), interval=3600, execution=engine) as publisher:
+        tick(1, ("A", "BUY", 10), ("B", "BUY", 10))
+        prices.update(A=110.0, B=9.0)
+        # One blended price (1190 / 20 shares) would call A a loss and B a win
+        tick(2, ("A", "SELL", 10), ("B", "SELL", 10))
+        assert (publisher.wins[0], publisher.losses[0]) == (1, 1)
+
+        # Selling and re-buying within one tick nets to no position change,
+        # but the sale still realizes a win
+        tick(3, ("A", "BUY", 5))
+        prices["A"] = 120.0
+        tick(4, ("A", "SELL", 5), ("A", "BUY", 5))
+        snapshot = publisher.publish(4)
+
+    agent = snapshot["agents"][0]
+    assert trader.positions["A"] == 5
+    assert (agent["trades"], agent["wins"], agent["losses"]) == (7, 2, 1)
@@ -0,0 +1,79 @@
+"""LLM Client Tests - Response cache modes and strict replay through the agents"""
+from datetime import datetime
+
+import pytest
+
+import llm_client
+from fake_llm_server import FakeLLMServer
+from llm_client import CacheMiss, ResponseCache, complete, install_cache
+
+MESSAGES = [{"role": "user", "content": "decide"}]
+
+
+@pytest.fixture
+def cache_file(tmp_path):
+    yield str(tmp_path / "responses.sqlite")
+    install_cache(None)
+
+
+def call(server):
+    return complete("m", MESSAGES, 0.0, 50, api_base=server.api_base, api_key="test")
+
+
+def test_read_write_caches_and_replay_serves_from_disk(cache_file):
+    with FakeLLMServer() as server:
+        install_cache(ResponseCache(cache_file))
+        content, usage = call(server)
+        assert usage is not None
+        assert call(server) == (content, None)
+        assert server.stats["requests"] == 1
+
+        install_cache(ResponseCache(cache_file, mode="replay"))
+        assert call(server) == (content, None)
+        assert server.stats["requests"] == 1
+
+
+def test_record_always_calls_and_replay_misses_raise(cache_file):
+    with FakeLLMServer() as server:
+        install_cache(ResponseCache(cache_file, mode="record"))
+        call(server)
+        call(server)
+        assert server.stats["requests"] == 2
+
+    install_cache(ResponseCache(cache_file, mode="replay"))
+    with pytest.raises(CacheMiss):
+        complete("m", [{"role": "user", "content": "never recorded"}], 0.0, 50)
+    with pytest.raises(ValueError):
+        ResponseCache(cache_file, mode="bogus")
+
+
+@pytest.mark.parametrize("module, class_name", [("stockagent", "StockAgentTrader"),
+                                                 ("fingpt", "FinGPTAgent"),
+                                                 ("tradingagents", "TradingAgentsSystem")])
+def test_replay_miss_fails_the_tick_instead_of_holding(cache_file, module, class_name):
+    pytest.importorskip("framework.simulator.base_agent")
+    agent_class = getattr(__import__(module), class_name)
+    agent = agent_class(0, "replayed", 10000.0)
+
+    class Market:
+        def get_market_data(self, symbol):
+            return {"mid_price": 100.0, "bid_price": 99.9, "ask_price": 100.1, "volume": 1000}
+
+        def submit_order(self, *args):
+            raise AssertionError("no order may be placed on a cache miss")
+
+    install_cache(ResponseCache(cache_file, mode="replay"))
+    with pytest.raises(CacheMiss):
+        agent.on_tick(datetime(2024, 1, 1), Market())
+    assert llm_client.get_cache().stats["misses"] >= 1
+
+
+def test_call_stats_count_every_threaded_call():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from llm_client import call_stats_snapshot
+
+    before = call_stats_snapshot()["calls"]
+    with FakeLLMServer() as server, ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: call(server), range(40)))
+    assert call_stats_snapshot()["calls"] - before == 40
@@ -0,0 +1,40 @@
+"""Market Data Tests - Timestamp units on every reader path and replay"""
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from market_data import DataFeed, _read_csv, _read_csv_stdlib, convert_file, to_ns
+
+EPOCH = 1700000000  # 2023-11-14T22:13:20Z
+EPOCH_NS = EPOCH * 10 ** 9
+
+
+def write_csv(path, stamps):
+    rows = [f"{stamp},{100 + i},{101 + i},{99 + i},{100.5 + i},1000" for i, stamp in enumerate(stamps)]
+    path.write_text("timestamp,open,high,low,close,volume\n" + "\n".join(rows) + "\n")
+    return path
+
+
+def test_to_ns_gives_the_same_instant_for_every_type():
+    expected = to_ns("2023-11-14T22:13:20")
+    assert expected == EPOCH_NS
+    for value in (EPOCH, float(EPOCH), np.int64(EPOCH), EPOCH * 1000, EPOCH_NS,
+                  np.datetime64("2023-11-14T22:13:20"), datetime(2023, 11, 14, 22, 13, 20)):
+        assert to_ns(value) == expected, value
+
+
+@pytest.mark.parametrize("reader", [_read_csv, _read_csv_stdlib])
+@pytest.mark.parametrize("stamps", [[EPOCH, EPOCH + 60], [EPOCH_NS, EPOCH_NS + 60 * 10 ** 9],
+                                    ["2023-11-14 22:13:20", "2023-11-14 22:14:20"]])
+def test_csv_readers_agree_on_timestamps(tmp_path, reader, stamps):
+    arrays = reader(write_csv(tmp_path / "bars.csv", stamps))
+    assert arrays["timestamp"].tolist() == [EPOCH_NS, EPOCH_NS + 60 * 10 ** 9]
+
+
+def test_seconds_epoch_csv_replays_by_date(tmp_path):
+    convert_file(write_csv(tmp_path / "bars.csv", [EPOCH, EPOCH + 60, EPOCH + 120]), tmp_path / "cache", "STOCK")
+    feed = DataFeed(tmp_path / "cache", ["STOCK"])
+    stamps = list(feed.replay("2023-11-14", "2023-11-15"))
+    assert stamps == [EPOCH_NS, EPOCH_NS + 60 * 10 ** 9, EPOCH_NS + 120 * 10 ** 9]
+    assert feed.get_market_data("STOCK")["mid_price"] == 102.5
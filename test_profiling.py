@@ -0,0 +1,36 @@
+"""Profiling Tests - Stage timers are opt-in, nest correctly and unpatch cleanly"""
+import time
+
+from profiling import Profiler
+
+
+class Pipeline:
+    def on_tick(self):
+        self.stage()
+        return "done"
+
+    def stage(self):
+        time.sleep(0.002)
+
+
+def test_disabled_profiler_patches_nothing():
+    original = Pipeline.__dict__["on_tick"]
+    Profiler([Pipeline], include_llm=False, include_prompts=False)
+    assert Pipeline.__dict__["on_tick"] is original
+
+
+def test_stages_are_timed_and_restored():
+    original = Pipeline.__dict__["stage"]
+    profiler = Profiler(extra_targets={Pipeline: ["on_tick", "stage"]}, include_llm=False, include_prompts=False)
+    with profiler:
+        assert Pipeline().on_tick() == "done"
+        Pipeline().on_tick()
+
+    assert Pipeline.__dict__["stage"] is original
+    histogram = profiler.histogram()
+    assert histogram["Pipeline.on_tick"]["count"] == 2
+    assert histogram["Pipeline.stage"]["count"] == 2
+    assert histogram["Pipeline.on_tick"]["total_ms"] >= histogram["Pipeline.stage"]["total_ms"] >= 4
+
+    stacks = dict(line.rsplit(" ", 1) for line in profiler.collapsed())
+    assert "Pipeline.on_tick;Pipeline.stage" in stacks
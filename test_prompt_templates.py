@@ -0,0 +1,43 @@
+"""Prompt Template Tests - Rendering matches str.format, partials and the compile cache"""
+from prompt_templates import PromptTemplate, compiled_template
+
+BODY = """You are a {personality} trader.
+Price: ${price:.2f}
+Cash: ${cash:.2f}
+Respond in JSON: {{"action": "buy|sell|hold"}}"""
+
+
+def test_render_matches_str_format():
+    template = PromptTemplate(BODY, system="You are a {personality} trader.", name="test.decision")
+    fields = {"personality": "Aggressive", "price": 101.237, "cash": 5000}
+    prompt = template.partial(personality="Aggressive").render(price=101.237, cash=5000)
+
+    assert prompt.text == BODY.format(**fields)
+    assert prompt.messages == [{"role": "system", "content": "You are a Aggressive trader."},
+                               {"role": "user", "content": BODY.format(**fields)}]
+    assert prompt.name == "test.decision"
+
+
+def test_static_prefix_is_stable_across_renders():
+    template = PromptTemplate(BODY).partial(personality="Balanced")
+    first = template.render(price=1.0, cash=2.0)
+    second = template.render(price=3.0, cash=4.0)
+
+    assert first.text != second.text
+    assert first.static_prefix == second.static_prefix
+    assert first.static_prefix.startswith("You are a Balanced trader.\nPrice: $")
+    assert first.prefix_cache_key == second.prefix_cache_key
+    assert template.renders == 2
+
+
+def test_compiled_template_builds_once():
+    builds = []
+
+    def build():
+        builds.append(1)
+        return PromptTemplate(BODY).partial(personality="Conservative")
+
+    first = compiled_template(("test", "Conservative"), build)
+    second = compiled_template(("test", "Conservative"), build)
+    assert first is second
+    assert len(builds) == 1
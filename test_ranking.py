@@ -0,0 +1,65 @@
+"""Ranking Engine Tests - Tie handling, NaN configs and incremental aggregation"""
+import numpy as np
+
+from ranking import RankingEngine, rank_rows_nan
+
+
+def test_rank_rows_handles_ties_and_missing():
+    values = np.array([[3.0, 1.0, 3.0, np.nan]])
+    assert rank_rows_nan(values, "average")[0, :3].tolist() == [1.5, 3.0, 1.5]
+    assert rank_rows_nan(values, "min")[0, :3].tolist() == [1.0, 3.0, 1.0]
+    assert rank_rows_nan(values, "dense")[0, :3].tolist() == [1.0, 2.0, 1.0]
+    assert np.isnan(rank_rows_nan(values)[0, 3])
+
+
+def test_aggregations_agree_on_a_dominant_config():
+    engine = RankingEngine(["profit", "win_rate"])
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        noise = rng.normal(0, 0.1, 3)
+        engine.add_run({
+            "best": {"profit": 3 + noise[0], "win_rate": 0.9},
+            "mid": {"profit": 2 + noise[1], "win_rate": 0.5},
+            "worst": {"profit": 1 + noise[2], "win_rate": 0.1},
+        })
+    for method in ("weighted", "borda", "kemeny"):
+        assert [config for _, config, _ in engine.ranking(method)] == ["best", "mid", "worst"]
+
+
+def test_incremental_runs_match_one_block():
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=(30, 4, 2))
+    configs = ["a", "b", "c", "d"]
+
+    whole = RankingEngine(["x", "y"])
+    whole.add_runs(values, configs)
+    pieces = RankingEngine(["x", "y"])
+    for start in range(0, 30, 7):
+        pieces.add_runs(values[start:start + 7], configs)
+
+    assert np.allclose(whole.weighted_scores(), pieces.weighted_scores())
+    assert np.allclose(whole.borda_scores(), pieces.borda_scores())
+
+
+def test_absent_configs_are_ranked_among_those_present():
+    engine = RankingEngine(["profit"])
+    engine.add_run({"a": {"profit": 1.0}, "b": {"profit": 2.0}})
+    engine.add_run({"a": {"profit": 1.0}, "c": {"profit": 5.0}})
+    scores = dict(zip(engine.configs, engine.weighted_scores()))
+    assert scores == {"a": 1.0, "b": 0.0, "c": 0.0}
+
+
+def test_scores_are_scaled_by_each_runs_size():
+    engine = RankingEngine(["profit"])
+    engine.add_run({f"f{i}": {"profit": 11.0 - i} for i in range(11)})
+    engine.add_run({"b": {"profit": 1.0}, "c": {"profit": 2.0}})
+    engine.add_run({"solo": {"profit": 1.0}})
+
+    weighted = dict(zip(engine.configs, engine.weighted_scores()))
+    borda = dict(zip(engine.configs, engine.borda_scores()))
+    # Third of eleven beats last of two (raw mean ranks would say 3 > 2)
+    assert np.isclose(weighted["f2"], 0.2) and weighted["b"] == 1.0
+    assert weighted["f2"] < weighted["b"]
+    # Winning a 2-config run beats winning one of ten pairings (raw Borda ties them at 1)
+    assert borda["c"] == 1.0 and np.isclose(borda["f9"], 0.1)
+    assert np.isnan(weighted["solo"]) and np.isnan(borda["solo"])
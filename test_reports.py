@@ -0,0 +1,58 @@
+"""Report Pipeline Tests - Incremental rebuilds keyed on input hashes"""
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from reports import ReportPipeline
+
+ROOT = Path(__file__).resolve().parent
+
+
+def setup_results(tmp_path):
+    results = tmp_path / "results"
+    results.mkdir()
+    for name in ("stockagent", "fingpt"):
+        shutil.copy(ROOT / f"{name}_results.json", results / f"{name}_results.json")
+    return results, tmp_path / "visualizations"
+
+
+def test_second_build_skips_everything(tmp_path):
+    results, viz = setup_results(tmp_path)
+    first = ReportPipeline(results, viz, workers=1).build()
+    assert not first["failed"]
+    assert (results / "comparison_metrics.csv").exists()
+    assert (results / "summary_report.txt").exists()
+
+    second = ReportPipeline(results, viz, workers=1).build()
+    assert second["built"] == []
+    assert sorted(second["skipped"]) == sorted(first["built"])
+
+
+def test_changed_run_rebuilds_only_dependent_artifacts(tmp_path):
+    results, viz = setup_results(tmp_path)
+    ReportPipeline(results, viz, workers=1).build()
+
+    path = results / "fingpt_results.json"
+    data = json.loads(path.read_text())
+    data["trades"] = data["trades"][:-1]
+    path.write_text(json.dumps(data))
+
+    rebuilt = ReportPipeline(results, viz, workers=1).build()
+    assert "comparison_metrics" in rebuilt["built"]
+    assert "chart_cumulative_profit" in rebuilt["built"]
+    assert not rebuilt["failed"]
+
+    forced = ReportPipeline(results, viz, workers=1, force=True).build()
+    assert forced["skipped"] == []
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_a_failed_artifact_does_not_block_the_others(tmp_path, workers):
+    results, viz = setup_results(tmp_path)
+    (results / "comparison_metrics.csv").mkdir()
+
+    summary = ReportPipeline(results, viz, workers=workers).build()
+    assert list(summary["failed"]) == ["comparison_metrics"]
+    assert {"agent_rankings", "summary_report", "chart_total_profit"} <= set(summary["built"])
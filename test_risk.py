@@ -0,0 +1,76 @@
+"""Risk Tests - Pre-trade limits that count orders still queued for execution"""
+from datetime import datetime, timedelta
+
+from benchmark import synthetic_feed
+from execution import ExecutionEngine
+from risk import RiskEngine
+from sweep import BacktestMarket
+
+START = datetime(2024, 1, 1, 9, 30)
+
+
+class Trader:
+    """Sends the same order every tick, whatever it already has in flight"""
+
+    def __init__(self, agent_id, side, cash=0.0, shares=0):
+        self.agent_id = agent_id
+        self.side = side
+        self.cash = cash
+        self.positions = {"STOCK": shares} if shares else {}
+        self.low_water = (cash, shares)
+
+    def on_tick(self, current_time, simulator):
+        price = simulator.get_market_data("STOCK")["mid_price"]
+        quantity = 10 if self.side == "SELL" else int(1000 / price)
+        simulator.submit_order(self.agent_id, "STOCK", self.side, quantity, price)
+
+    def observe(self):
+        self.low_water = (min(self.low_water[0], self.cash),
+                          min(self.low_water[1], self.positions.get("STOCK", 0)))
+
+
+def test_queued_orders_count_against_limits_with_latency(tmp_path):
+    feed = synthetic_feed(str(tmp_path), START, timedelta(minutes=1), 8)
+    risk = RiskEngine(["STOCK"])
+    execution = ExecutionEngine(impact="none", fee_bps=5.0, latency=150)
+    market = BacktestMarket(feed, execution, risk)
+    seller, buyer = Trader(1, "SELL", shares=10), Trader(2, "BUY", cash=1000.0)
+    for agent in (seller, buyer):
+        market.register_agent(agent.agent_id, agent)
+
+    def run(first, last):
+        for _ in feed.replay(START + timedelta(minutes=first), START + timedelta(minutes=last)):
+            seller.on_tick(None, market)
+            buyer.on_tick(None, market)
+            market.end_tick()
+            seller.observe()
+            buyer.observe()
+
+    # Bars 0-2: the first sell and buy wait out their latency; copies see them queued
+    run(0, 2)
+    assert risk.execution is execution
+    assert risk.stats["approved"] == 2 and execution.pending == 2
+    assert risk.stats["rejected"]["position_available"] == 2
+    assert risk.stats["rejected"]["affordability"] == 2
+
+    run(3, 7)
+    assert seller.positions["STOCK"] == 0 and seller.low_water[1] == 0
+    assert buyer.low_water[0] >= 0 and buyer.positions["STOCK"] > 0
+    assert execution.stats["settle_rejected"] == 0
+
+
+def test_queued_buys_fill_position_and_symbol_room():
+    execution = ExecutionEngine(latency=60)
+    risk = RiskEngine(["STOCK"], max_position_pct=0.5, max_symbol_position=30, execution=execution)
+    first, second = Trader(1, "BUY", cash=10000.0), Trader(2, "BUY", cash=10000.0)
+    risk.register(first)
+    risk.register(second)
+    execution.submit(1, "STOCK", "BUY", 40, 100.0, START)
+
+    risk.submit(1, "STOCK", "BUY", 40, 100.0)
+    risk.submit(2, "STOCK", "BUY", 40, 100.0)
+    approved = risk.check({"STOCK": 100.0})
+    # Agent 1 already has 40 of its 50-share cap queued; 30 symbol shares minus 40 queued leaves none
+    assert approved == []
+    assert risk.stats["clamped"]["max_position_pct"] == 1
+    assert risk.stats["rejected"]["symbol_capacity"] == 2
@@ -0,0 +1,95 @@
+"""Router Tests - Pool validation, fallback, budget routing and cache-hit accounting"""
+import json
+
+import pytest
+
+from llm_client import chat_completion, install_router
+from router import Backend, BudgetExceeded, LocalBackend, ModelRouter
+
+MESSAGES = [{"role": "user", "content": "decide"}]
+USAGE = {"calls": 1, "prompt_tokens": 1000, "completion_tokens": 1000}
+
+
+class Scripted(Backend):
+    """Backend answering from a script: "ok", "hit" (cache hit, no usage) or "fail" """
+
+    def __init__(self, name, script, cost_per_1k=(1.0, 1.0)):
+        super().__init__(name, name, cost_per_1k=cost_per_1k)
+        self.script = list(script)
+
+    def complete(self, messages, temperature, max_tokens):
+        outcome = self.script.pop(0) if self.script else "ok"
+        if outcome == "fail":
+            raise ConnectionError(f"{self.name} down")
+        return f"{self.name}:{outcome}", USAGE if outcome == "ok" else None
+
+
+def read_log(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_pools_must_name_known_backends():
+    with pytest.raises(ValueError, match="typo"):
+        ModelRouter([LocalBackend()], pools={"fingpt.*": ["local", "typo"]})
+
+
+def test_cache_hits_leave_backend_health_alone(tmp_path):
+    log = tmp_path / "routing.jsonl"
+    primary = Scripted("primary", ["fail", "fail", "hit", "hit", "fail"])
+    router = ModelRouter([primary, LocalBackend()], pools={"s": ["primary", "local"]},
+                         max_error_rate=1.0, failures_to_cooldown=3, log_path=log, run_id="run-1")
+    install_router(router)
+    try:
+        answers = [chat_completion("m", MESSAGES, 0.0, 10, stage="s", agent=7) for _ in range(5)]
+    finally:
+        install_router(None)
+        router.close()
+
+    local = LocalBackend.RESPONSE
+    assert answers == [local, local, "primary:hit", "primary:hit", local]
+    health = router.health["primary"]
+    # Two hits between the failures must not reset the failure streak
+    assert list(health.outcomes) == [False, False, False]
+    assert health.cooldown_until > 0 and health.ewma_ms is not None
+    assert router.stats["fallbacks"] == 3
+
+    records = read_log(log)
+    assert {(r["run"], r["agent"]) for r in records} == {("run-1", 7)}
+    assert [r["outcome"] for r in records if r["backend"] == "primary"] == ["error", "error", "cache_hit",
+                                                                            "cache_hit", "error"]
+
+
+def test_spent_budget_routes_to_free_backends_only():
+    paid = Scripted("paid", [])
+    router = ModelRouter([paid, LocalBackend()], pools={"s": ["paid", "local"]}, budget=1.0)
+    assert router.complete("s", "m", MESSAGES, 0.0, 10) == "paid:ok"
+    assert router.spent == pytest.approx(2.0)
+    assert router.complete("s", "m", MESSAGES, 0.0, 10) == LocalBackend.RESPONSE
+    assert router.stats["budget_routed"] == 1
+
+    paid_only = ModelRouter([Scripted("paid", [])], pools={"s": ["paid"]}, budget=1.0)
+    paid_only.complete("s", "m", MESSAGES, 0.0, 10)
+    with pytest.raises(BudgetExceeded):
+        paid_only.complete("s", "m", MESSAGES, 0.0, 10)
+
+
+def test_replay_cache_miss_is_raised_not_routed_to_local(tmp_path):
+    from llm_client import CacheMiss, ResponseCache, install_cache
+
+    log = tmp_path / "routing.jsonl"
+    router = ModelRouter([Backend("mini", "gpt-4o-mini"), LocalBackend()], pools={"s": ["mini", "local"]},
+                         log_path=log)
+    install_cache(ResponseCache(str(tmp_path / "cache.sqlite"), mode="replay"))
+    install_router(router)
+    try:
+        with pytest.raises(CacheMiss):
+            chat_completion("gpt-4o-mini", MESSAGES, 0.0, 10, stage="s", agent=1)
+    finally:
+        install_router(None)
+        install_cache(None)
+        router.close()
+
+    assert router.health["mini"].calls == 0 and not router.health["mini"].outcomes
+    assert router.health["local"].calls == 0
+    assert [r["outcome"] for r in read_log(log)] == ["cache_miss"]
@@ -0,0 +1,100 @@
+"""Speculation Tests - Hits, misses and speculations left pending at the end of a run"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from fake_llm_server import FakeLLMServer
+from llm_client import complete
+import speculation
+from speculation import Speculator, set_pool_size, speculation_report
+from tick_scheduler import TickScheduler
+
+STATE = (100.0, 1000.0, 0)
+
+
+def llm_decision(server, gate=None, started=None):
+    def decide(price, cash, position):
+        if started is not None:
+            started.set()
+        if gate is not None:
+            gate.wait(5)
+        return complete("m", [{"role": "user", "content": f"{price} {cash} {position}"}], 0.0, 50,
+                        api_base=server.api_base, api_key="test")[0]
+    return decide
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_hits_use_the_decision_and_misses_waste_it():
+    speculator = Speculator()
+    with FakeLLMServer() as server:
+        speculator.launch(STATE, llm_decision(server))
+        assert speculator.take(STATE) is not None
+        started, gate = threading.Event(), threading.Event()
+        speculator.launch(STATE, llm_decision(server, gate, started))
+        assert started.wait(5)  # running, so the miss cannot cancel it
+        assert speculator.take((101.0, 1000.0, 0)) is None
+        gate.set()
+        assert wait_for(lambda: speculator.stats["wasted_calls"] == 1)
+
+    stats = speculator.stats
+    assert (stats["launched"], stats["hits"], stats["misses"]) == (2, 1, 1)
+    assert stats["used_tokens"] > 0 and stats["wasted_tokens"] > 0
+    assert speculator.hit_rate() == 0.5
+
+
+class Speculating:
+    """Launches a speculation every tick and never takes it"""
+
+    def __init__(self, agent_id, decide):
+        self.agent_id = agent_id
+        self.name = f"speculating-{agent_id}"
+        self.cash = 1000.0
+        self.positions = {}
+        self.speculator = Speculator()
+        self.decide = decide
+
+    def on_tick(self, current_time, simulator):
+        self.speculator.launch(STATE, self.decide)
+
+
+class Quote:
+    def get_market_data(self, symbol):
+        return {"mid_price": 100.0}
+
+
+def test_run_end_discards_and_counts_pending_speculations():
+    gate = threading.Event()
+    with FakeLLMServer() as server:
+        agent = Speculating(1, llm_decision(server, gate))
+        scheduler = TickScheduler(Quote(), [agent], tick_interval=timedelta(minutes=1))
+        threading.Timer(0.05, gate.set).start()
+        start = datetime(2024, 1, 1)
+        scheduler.run(start, start + timedelta(minutes=3))
+
+    stats = agent.speculator.stats
+    assert agent.speculator._pending is None
+    assert stats["launched"] == 3 and stats["discarded"] == 3
+    # Every launch either never started (cancelled) or ran to completion and was counted
+    assert stats["wasted_calls"] == server.stats["requests"]
+    assert speculation_report([agent])["discarded"] == 3
+
+
+def test_pool_size_is_a_process_wide_setting():
+    default = speculation.POOL_WORKERS
+    try:
+        set_pool_size(2)
+        first, second = Speculator(), Speculator()
+        with FakeLLMServer() as server:
+            first.launch(STATE, llm_decision(server))
+            second.launch(STATE, llm_decision(server))
+            assert speculation._pool()._max_workers == 2
+            assert first.take(STATE) is not None and second.take(STATE) is not None
+    finally:
+        set_pool_size(default)
+    assert speculation._pool()._max_workers == default
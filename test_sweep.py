@@ -0,0 +1,132 @@
+"""Sweep Tests - Walk-forward windows, half-open replay and retry of failed trials"""
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from agent_registry import AGENT_CLASSES
+from agent_state import DecisionRing
+from benchmark import synthetic_feed
+from decision_store import DecisionStore
+from sweep import SweepEngine, grid, run_trial, walk_forward_windows
+
+START = datetime(2024, 1, 1)
+seen_ticks = []
+
+
+class ReplayRecorder:
+    """Agent stand-in that records the bars it is ticked on"""
+
+    def __init__(self, agent_id, name, starting_cash):
+        self.agent_id = agent_id
+        self.name = name
+        self.cash = starting_cash
+        self.positions = {}
+
+    def on_tick(self, current_time, simulator):
+        seen_ticks.append(current_time)
+
+
+class Deciding(ReplayRecorder):
+    """Holds every tick, keeping only the last two decisions in memory"""
+
+    def __init__(self, agent_id, name, starting_cash):
+        super().__init__(agent_id, name, starting_cash)
+        self.decisions = DecisionRing(2)
+
+    def on_tick(self, current_time, simulator):
+        self.decisions.append({"action": "hold", "quantity": 0, "tick": simulator.tick})
+
+
+def flaky_trial(params, window, feed_dir, symbols, cache_path, tick_every, starting_cash,
+                execution=None, risk=None):
+    """Fails the first time each trial runs (a transient API error), then succeeds"""
+    marker = Path(feed_dir) / f"seen_{window[0]}_{params['x']}".replace(":", "")
+    if not marker.exists():
+        marker.touch()
+        raise RuntimeError("transient API error")
+    return {"return_pct": params["x"]}
+
+
+def test_windows_are_contiguous_and_non_overlapping():
+    windows = walk_forward_windows("2024-01-01", "2024-03-01", timedelta(days=20), timedelta(days=10))
+    assert len(windows) == 4
+    for window in windows:
+        assert window["train"][1] == window["test"][0]
+    assert grid({"a": [1, 2], "b": [3]}) == [{"a": 1, "b": 3}, {"a": 2, "b": 3}]
+
+
+def test_train_and_test_replays_share_no_bars(tmp_path, monkeypatch):
+    monkeypatch.setitem(AGENT_CLASSES, "recorder", ("test_sweep", "ReplayRecorder"))
+    synthetic_feed(str(tmp_path), START, timedelta(minutes=1), 60)
+    window = walk_forward_windows(START, START + timedelta(minutes=60), timedelta(minutes=30),
+                                  timedelta(minutes=30))[0]
+
+    ticks = {}
+    for phase in ("train", "test"):
+        seen_ticks.clear()
+        run_trial({"agent": "recorder"}, window[phase], str(tmp_path), ["STOCK"])
+        ticks[phase] = list(seen_ticks)
+
+    assert len(ticks["train"]) == len(ticks["test"]) == 30
+    assert not set(ticks["train"]) & set(ticks["test"])
+    assert ticks["test"][0] == START + timedelta(minutes=30)
+
+
+def test_failed_trials_are_retried_on_resume(tmp_path):
+    windows = walk_forward_windows("2024-01-01", "2024-01-31", timedelta(days=10), timedelta(days=10))
+    checkpoint = tmp_path / "sweep.jsonl"
+
+    def engine():
+        return SweepEngine(grid({"x": [1, 2]}), windows, feed_dir=tmp_path, symbols=["STOCK"],
+                           workers=1, checkpoint=checkpoint, cache_path=None, trial=flaky_trial)
+
+    first = engine().run()
+    assert all(row["best_params"] is None for row in first)
+    assert engine().completed == {}
+
+    second = engine().run()
+    assert [row["best_params"] for row in second] == [{"x": 2}] * len(windows)
+    # Window 1's test bars start where no train trial did, so its first attempt fails too
+    assert [row["test_score"] for row in second] == [2, None]
+
+    third = engine().run()
+    assert [row["test_score"] for row in third] == [2, 2]
+
+
+def test_checkpoint_keys_cover_data_and_tick_spacing(tmp_path):
+    windows = walk_forward_windows("2024-01-01", "2024-01-21", timedelta(days=10), timedelta(days=10))
+    checkpoint = tmp_path / "sweep.jsonl"
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+
+    def engine(feed_dir, **settings):
+        return SweepEngine(grid({"x": [1]}), windows, feed_dir=tmp_path / feed_dir, symbols=["STOCK"],
+                           workers=1, checkpoint=checkpoint, cache_path=None, trial=always_one, **settings)
+
+    engine("a").run()
+    train = tuple(windows[0]["train"])
+    assert engine("a")._score({"x": 1}, "train", train) == 1.0
+    others = [engine("b"), engine("a", tick_every=5), engine("a", starting_cash=500),
+              SweepEngine(grid({"x": [1]}), windows, feed_dir=tmp_path / "a", symbols=["OTHER"],
+                          workers=1, checkpoint=checkpoint, cache_path=None, trial=always_one)]
+    assert all(other._score({"x": 1}, "train", train) is None for other in others)
+
+
+def always_one(params, window, feed_dir, symbols, cache_path, tick_every, starting_cash,
+               execution=None, risk=None):
+    return {"return_pct": 1.0}
+
+
+def test_sweep_keeps_every_trial_decision_in_a_store(tmp_path, monkeypatch):
+    monkeypatch.setitem(AGENT_CLASSES, "deciding", ("test_sweep", "Deciding"))
+    synthetic_feed(str(tmp_path), START, timedelta(minutes=1), 40)
+    windows = walk_forward_windows(START, START + timedelta(minutes=40), timedelta(minutes=20),
+                                   timedelta(minutes=20))
+    engine = SweepEngine([{"agent": "deciding"}], windows, feed_dir=tmp_path, symbols=["STOCK"],
+                         workers=1, checkpoint=tmp_path / "sweep.jsonl", cache_path=None,
+                         decision_store=tmp_path / "decisions")
+    engine.run()
+
+    store = DecisionStore(tmp_path / "decisions")
+    assert all("decisions" not in record["result"] for record in engine.completed.values())
+    for key in engine.completed:
+        assert sorted(r["tick"] for r in store.records(store.query(runs=key, columns=("tick",)))) == list(range(20))
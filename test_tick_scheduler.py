@@ -0,0 +1,101 @@
+"""Tick Scheduler Tests - Order stats, async account snapshots and async checkpoints"""
+import threading
+from datetime import datetime, timedelta
+
+from agent_state import account_view
+from checkpoint import Checkpointer, capture_simulation, load_checkpoint, restore_simulation
+from tick_scheduler import TickScheduler
+
+START = datetime(2024, 1, 1)
+
+
+class Market:
+    """Fills every order at the submitted price"""
+
+    def __init__(self, agents):
+        self.agents = {agent.agent_id: agent for agent in agents}
+        self.price = 100.0
+        self.fills = []
+
+    def get_market_data(self, symbol):
+        return {"mid_price": self.price}
+
+    def submit_order(self, agent_id, symbol, side, quantity, price):
+        agent = self.agents[agent_id]
+        signed = quantity if side == "BUY" else -quantity
+        agent.cash -= signed * price
+        agent.positions[symbol] = agent.positions.get(symbol, 0) + signed
+        self.fills.append((agent_id, side, quantity))
+
+
+class BuyOne:
+    """Buys one share every tick and remembers the cash it decided on"""
+
+    def __init__(self, agent_id, cash=1000.0, gate=None):
+        self.agent_id = agent_id
+        self.cash = cash
+        self.positions = {}
+        self.seen_cash = []
+        self.gate = gate
+
+    def on_tick(self, current_time, simulator):
+        cash, _ = account_view(self, simulator)
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.seen_cash.append(cash)
+        price = simulator.get_market_data("STOCK")["mid_price"]
+        simulator.submit_order(self.agent_id, "STOCK", "BUY", 1, price)
+
+
+def run(mode, ticks=6, latency=None):
+    agents = [BuyOne(1), BuyOne(2)]
+    market = Market(agents)
+    scheduler = TickScheduler(market, agents, mode=mode, latency=latency, tick_interval=timedelta(minutes=1))
+    stats = scheduler.run(START, START + timedelta(minutes=ticks))
+    return stats, market
+
+
+def test_sync_and_async_count_orders_alike():
+    sync_stats, sync_market = run("sync")
+    async_stats, async_market = run("async", latency=60)
+    assert sync_stats["orders"] == len(sync_market.fills) == 12
+    assert async_stats["orders"] == len(async_market.fills)
+    assert async_stats["orders"] > 0
+
+
+def test_async_agents_decide_on_a_snapshot_of_their_account():
+    gate = threading.Event()
+    agent = BuyOne(1, cash=1000.0, gate=gate)
+    scheduler = TickScheduler(Market([agent]), [agent], mode="async")
+    scheduler.step(START)
+    agent.cash = 0.0  # a fill settling on the tick thread mid-decision
+    gate.set()
+    scheduler.drain()
+    assert agent.seen_cash == [1000.0]
+
+
+def test_async_runs_are_checkpointed_and_resume_identically(tmp_path):
+    ticks, latency = 9, 120
+
+    agents = [BuyOne(1), BuyOne(2)]
+    market = Market(agents)
+    TickScheduler(market, agents, mode="async", latency=latency).run(START, START + timedelta(minutes=ticks))
+    expected = [(a.cash, dict(a.positions)) for a in agents]
+
+    agents = [BuyOne(1), BuyOne(2)]
+    market = Market(agents)
+    checkpointer = Checkpointer(tmp_path, lambda: capture_simulation(agents), every_ticks=2)
+    scheduler = TickScheduler(market, agents, mode="async", latency=latency)
+    scheduler.run(START, START + timedelta(minutes=5), checkpointer=checkpointer)
+    checkpointer.close()
+    assert checkpointer.stats["saved"] >= 1
+
+    snapshot = load_checkpoint(tmp_path)
+    assert snapshot["components"]["scheduler"]["in_flight"]
+    agents = [BuyOne(1), BuyOne(2)]
+    market = Market(agents)
+    restore_simulation(snapshot["components"], agents)
+    scheduler = TickScheduler(market, agents, mode="async", latency=latency)
+    next_time = scheduler.resume(snapshot)
+    scheduler.run(next_time, START + timedelta(minutes=ticks))
+    assert [(a.cash, dict(a.positions)) for a in agents] == expected
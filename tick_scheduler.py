@@ -0,0 +1,270 @@
+"""
+Tick Scheduler - Drives agent on_tick calls, optionally overlapping LLM latency
+
+Two modes:
+
+    "sync"   every agent's on_tick runs to completion, in registration order,
+             before the tick ends (the original behaviour, kept for exact
+             comparisons)
+    "async"  each agent's on_tick runs in a worker thread against a snapshot
+             of the market and of its own cash/positions (read through
+             agent_state.account_view); its orders are held back and land on
+             the tick when the response "arrives", while the simulation keeps
+             ticking
+
+Decision latency in async mode is either the real wall-clock time of the
+LLM chain (latency=None), a fixed number of seconds, or a callable
+latency(agent) -> seconds for realistic simulated delays.
+
+Checkpoints in async mode wait for the decisions in flight to finish (without
+landing them early) and store their held-back orders, so a resumed run lands
+them on the same ticks.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+
+from agent_state import close_spills
+from speculation import discard_speculations
+
+MODES = ("sync", "async")
+
+
+class CountingSimulator:
+    """Pass-through simulator proxy that counts orders in sync mode"""
+
+    def __init__(self, simulator, scheduler):
+        self._simulator = simulator
+        self._scheduler = scheduler
+
+    def submit_order(self, *args, **kwargs):
+        self._scheduler.stats["orders"] += 1
+        return self._simulator.submit_order(*args, **kwargs)
+
+    @property
+    def tick(self):
+        return self._scheduler.tick
+
+    def __getattr__(self, name):
+        return getattr(self._simulator, name)
+
+
+class DeferredSimulator:
+    """Simulator proxy handed to agents running off the tick loop"""
+
+    def __init__(self, simulator, snapshot, lock, account_snapshots=None, tick=None):
+        self._simulator = simulator
+        self._snapshot = snapshot
+        self._lock = lock
+        self.account_snapshots = account_snapshots or {}
+        self.tick = tick
+        self.orders = []
+
+    def get_market_data(self, symbol):
+        data = self._snapshot.get(symbol)
+        if data is None:
+            with self._lock:
+                data = self._simulator.get_market_data(symbol)
+            self._snapshot[symbol] = data
+        return data
+
+    def submit_order(self, *args, **kwargs):
+        self.orders.append((args, kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._simulator, name)
+
+
+class PendingDecision:
+    """An in-flight agent decision and the tick its orders should land on"""
+
+    __slots__ = ("agent", "future", "proxy", "submitted_tick", "due_tick", "started")
+
+    def __init__(self, agent, future, proxy, submitted_tick, due_tick, started):
+        self.agent = agent
+        self.future = future
+        self.proxy = proxy
+        self.submitted_tick = submitted_tick
+        self.due_tick = due_tick
+        self.started = started
+
+
+class TickScheduler:
+    """Runs agents tick by tick in "sync" or "async" mode"""
+
+    def __init__(self, simulator, agents, mode="sync", latency=None,
+                 tick_interval=timedelta(minutes=1), symbols=("STOCK",),
+                 max_workers=32, latency_history=10000):
+        if mode not in MODES:
+            raise ValueError(f"Unknown scheduler mode: {mode} (expected one of {MODES})")
+
+        self.simulator = simulator
+        self.agents = list(agents)
+        self.mode = mode
+        self.latency = latency
+        self.tick_interval = tick_interval
+        self.symbols = list(symbols)
+        self.max_workers = max_workers
+
+        self.tick = 0
+        self.pending = {}
+        self.decision_latencies = deque(maxlen=latency_history)
+        self.stats = {"ticks": 0, "decisions": 0, "orders": 0, "late_decisions": 0}
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._counting = CountingSimulator(simulator, self)
+
+    # ------------------------------------------------------------------------
+    # Tick loop
+    # ------------------------------------------------------------------------
+
+    def step(self, current_time):
+        """Advance the simulation by one tick"""
+        if self.mode == "sync":
+            self._step_sync(current_time)
+        else:
+            self._step_async(current_time)
+        self.tick += 1
+        self.stats["ticks"] += 1
+
+    def run(self, start, end, checkpointer=None, publisher=None, decision_store=None, run_id="run"):
+        """
+        Step from start to end (exclusive) at tick_interval, then drain and
+        flush the agents' decision spill sinks.
+        With a decision_store.DecisionStore, every agent's rings spill into it
+        under run_id and what is left in them is ingested at the end.
+        With a checkpoint.Checkpointer, snapshots are taken between ticks when
+        due; in async mode the decisions in flight are finished first and their
+        held-back orders saved with the scheduler state.
+        A live_metrics.MetricsPublisher is updated after every tick.
+        """
+        if decision_store is not None:
+            decision_store.attach(run_id, self.agents)
+        current_time = start
+        while current_time < end:
+            self.step(current_time)
+            if publisher is not None:
+                publisher.after_tick(self.tick, current_time)
+            if checkpointer is not None:
+                checkpointer.after_tick(self.tick, current_time, self._checkpoint_state)
+            current_time += self.tick_interval
+        self.drain()
+        discard_speculations(self.agents)
+        close_spills(self.agents)
+        if decision_store is not None:
+            for agent in self.agents:
+                decision_store.ingest_agent(run_id, agent)
+            decision_store.flush()
+        if publisher is not None:
+            publisher.publish(current_time)
+        if checkpointer is not None:
+            checkpointer.flush()
+        return self.stats
+
+    def state(self):
+        """Counters plus the finished-but-not-landed decisions (async mode)"""
+        in_flight = []
+        for agent_id, entry in self.pending.items():
+            if entry.future.done():
+                in_flight.append({"agent_id": agent_id, "orders": list(entry.proxy.orders),
+                                  "latency": entry.future.result(),
+                                  "submitted_tick": entry.submitted_tick, "due_tick": entry.due_tick})
+        return {"tick": self.tick, "stats": dict(self.stats), "in_flight": in_flight}
+
+    def _checkpoint_state(self):
+        """Checkpoint component; waits for in-flight decisions so agents are quiescent"""
+        for entry in self.pending.values():
+            entry.future.result()
+        return {"scheduler": self.state()}
+
+    def resume(self, snapshot):
+        """Restore counters and held-back orders; returns the time of the next tick"""
+        state = snapshot["components"]["scheduler"]
+        self.tick = state["tick"]
+        self.stats = dict(state["stats"])
+        agents = {agent.agent_id: agent for agent in self.agents}
+        self.pending = {}
+        for saved in state.get("in_flight", []):
+            future = Future()
+            future.set_result(saved["latency"])
+            proxy = DeferredSimulator(self.simulator, {}, self._lock)
+            proxy.orders = list(saved["orders"])
+            self.pending[saved["agent_id"]] = PendingDecision(
+                agents[saved["agent_id"]], future, proxy, saved["submitted_tick"], saved["due_tick"], 0.0
+            )
+        return snapshot["current_time"] + self.tick_interval
+
+    def drain(self):
+        """Wait for every in-flight decision and land its orders"""
+        for agent_id in list(self.pending):
+            entry = self.pending.pop(agent_id)
+            entry.future.result()
+            self._land(entry)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _step_sync(self, current_time):
+        for agent in self.agents:
+            started = time.perf_counter()
+            agent.on_tick(current_time, self._counting)
+            self.decision_latencies.append(time.perf_counter() - started)
+            self.stats["decisions"] += 1
+
+    def _step_async(self, current_time):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        # Land responses that have arrived (or are due, for simulated latency)
+        for agent_id in list(self.pending):
+            entry = self.pending[agent_id]
+            if self._arrived(entry):
+                del self.pending[agent_id]
+                self._land(entry)
+
+        # Idle agents start a new decision against this tick's market
+        snapshot = {symbol: self.simulator.get_market_data(symbol) for symbol in self.symbols}
+        for agent in self.agents:
+            if agent.agent_id in self.pending:
+                continue
+            account = {agent.agent_id: (agent.cash, dict(agent.positions.items()))}
+            proxy = DeferredSimulator(self.simulator, dict(snapshot), self._lock, account, self.tick)
+            future = self._executor.submit(self._decide, agent, current_time, proxy)
+            self.pending[agent.agent_id] = PendingDecision(
+                agent, future, proxy, self.tick, self._due_tick(agent), time.perf_counter()
+            )
+
+    def _decide(self, agent, current_time, proxy):
+        started = time.perf_counter()
+        agent.on_tick(current_time, proxy)
+        return time.perf_counter() - started
+
+    def _due_tick(self, agent):
+        if self.latency is None:
+            return None
+        seconds = self.latency(agent) if callable(self.latency) else self.latency
+        ticks = math.ceil(seconds / self.tick_interval.total_seconds())
+        return self.tick + max(1, ticks)
+
+    def _arrived(self, entry):
+        if entry.due_tick is None:
+            return entry.future.done()
+        if self.tick < entry.due_tick:
+            return False
+        if not entry.future.done():
+            # Simulated latency is a contract: block so runs are reproducible
+            self.stats["late_decisions"] += 1
+            entry.future.result()
+        return True
+
+    def _land(self, entry):
+        self.decision_latencies.append(entry.future.result())
+        self.stats["decisions"] += 1
+        for args, kwargs in entry.proxy.orders:
+            self.simulator.submit_order(*args, **kwargs)
+            self.stats["orders"] += 1
@@ -1,21 +1,60 @@
 ﻿"""TradingAgents - Institutional Trading Firm System"""
-import openai
 import json
 from framework.simulator.base_agent import BaseTradingAgent
+from agent_state import LedgerStateMixin, DecisionRing, account_view
+from prompt_templates import PromptTemplate
+from llm_client import CacheMiss, chat_completion
+from risk import has_risk_engine, submit_decision
 
-class TradingAgentsSystem(BaseTradingAgent):
+FUNDAMENTAL_PROMPT = PromptTemplate(
+    """As a Fundamental Analyst, analyze this stock at ${price:.2f}.
+Provide brief analysis in JSON:
+{{"outlook": "bullish|bearish|neutral", "key_points": ["point1", "point2"]}}""",
+    name="tradingagents.fundamental"
+)
+
+TECHNICAL_PROMPT = PromptTemplate(
+    """As a Technical Analyst, analyze this stock at ${price:.2f}.
+Market has {bid_levels} bid levels, {ask_levels} ask levels.
+Provide analysis in JSON:
+{{"trend": "up|down|sideways", "recommendation": "buy|sell|hold"}}""",
+    name="tradingagents.technical"
+)
+
+TRADER_PROMPT = PromptTemplate(
+    """You are the Lead Trader. Make final decision.
+
+Fundamental Analyst: {outlook}
+Technical Analyst: {recommendation}
+
+Current Price: ${price:.2f}
+Your Cash: ${cash:.2f}
+Your Position: {position} shares
+
+Decide trade in JSON:
+{{"action": "buy|sell|hold", "quantity": <number>, "confidence": <0-1>}}""",
+    name="tradingagents.trader"
+)
+
+class TradingAgentsSystem(LedgerStateMixin, BaseTradingAgent):
     """Multi-specialist institutional trading system"""
     
+    DECISION_HISTORY = 256
+    RISK_PROFILE = {"max_order_pct": "max_position_pct"}  # applied by RiskEngine when present
+    
     def __init__(self, agent_id, name, starting_cash):
         super().__init__(agent_id, name, starting_cash)
         self.quick_llm = "gpt-3.5-turbo"
         self.deep_llm = "gpt-4o-mini"  # Using available model
-        self.analyst_reports = []
-        self.decisions = []
+        self.temperature = 0.5
+        self.max_position_pct = 0.3
+        self.analyst_reports = DecisionRing(self.DECISION_HISTORY)
+        self.decisions = DecisionRing(self.DECISION_HISTORY)
         
     def on_tick(self, current_time, simulator):
         """Full institutional workflow"""
         
+        tick = self._begin_tick(simulator)
         market_data = simulator.get_market_data("STOCK")
         current_price = market_data["mid_price"]
         
@@ -26,60 +65,68 @@ class TradingAgentsSystem(BaseTradingAgent):
             # Step 1: Analyst reports
             fundamental = self._fundamental_analysis(current_price)
             technical = self._technical_analysis(current_price, market_data)
+            self.analyst_reports.append({"kind": "fundamental", **fundamental, "tick": tick})
+            self.analyst_reports.append({"kind": "technical", **technical, "tick": tick})
             
             # Step 2: Trader decision
-            decision = self._trader_decision(current_price, fundamental, technical)
+            cash, positions = account_view(self, simulator)
+            decision = self._trader_decision(current_price, fundamental, technical, cash, positions.get("STOCK", 0))
             
             # Step 3: Risk management
-            final_decision = self._risk_management(decision, current_price)
+            final_decision = self._risk_management(decision, current_price, simulator)
             
             # Step 4: Execute
             self._execute_decision(final_decision, simulator, current_price)
             
+        except CacheMiss:
+            # Strict replay: a missing response must fail the run, not become a hold
+            raise
         except Exception as e:
             print(f"{self.name} error: {e}")
     
     def _fundamental_analysis(self, price):
         """Fundamental analyst report"""
-        prompt = f"""As a Fundamental Analyst, analyze this stock at ${price:.2f}.
-Provide brief analysis in JSON:
-{{"outlook": "bullish|bearish|neutral", "key_points": ["point1", "point2"]}}"""
+        prompt = FUNDAMENTAL_PROMPT.render(price=price)
         
         return self._call_llm(prompt, self.quick_llm)
     
     def _technical_analysis(self, price, market_data):
         """Technical analyst report"""
-        prompt = f"""As a Technical Analyst, analyze this stock at ${price:.2f}.
-Market has {len(market_data.get('bids', []))} bid levels, {len(market_data.get('asks', []))} ask levels.
-Provide analysis in JSON:
-{{"trend": "up|down|sideways", "recommendation": "buy|sell|hold"}}"""
+        prompt = TECHNICAL_PROMPT.render(
+            price=price,
+            bid_levels=len(market_data.get('bids', [])),
+            ask_levels=len(market_data.get('asks', []))
+        )
         
         return self._call_llm(prompt, self.quick_llm)
     
-    def _trader_decision(self, price, fundamental, technical):
+    def _trader_decision(self, price, fundamental, technical, cash=None, position=None):
         """Trader synthesizes information"""
-        prompt = f"""You are the Lead Trader. Make final decision.
-
-Fundamental Analyst: {fundamental.get('outlook', 'neutral')}
-Technical Analyst: {technical.get('recommendation', 'hold')}
-
-Current Price: ${price:.2f}
-Your Cash: ${self.cash:.2f}
-Your Position: {self.positions.get('STOCK', 0)} shares
-
-Decide trade in JSON:
-{{"action": "buy|sell|hold", "quantity": <number>, "confidence": <0-1>}}"""
+        prompt = TRADER_PROMPT.render(
+            outlook=fundamental.get('outlook', 'neutral'),
+            recommendation=technical.get('recommendation', 'hold'),
+            price=price,
+            cash=self.cash if cash is None else cash,
+            position=self.positions.get('STOCK', 0) if position is None else position
+        )
         
         return self._call_llm(prompt, self.deep_llm)
     
-    def _risk_management(self, decision, price):
+    def _risk_management(self, decision, price, simulator=None):
         """Risk team validates decision"""
         action = decision.get("action", "hold")
         quantity = decision.get("quantity", 0)
+        confidence = decision.get("confidence", float("nan"))
         
-        # Apply 30% position limit
-        portfolio_value = self.cash + self.positions.get("STOCK", 0) * price
-        max_position_value = portfolio_value * 0.3
+        if has_risk_engine(simulator):
+            # The simulator's RiskEngine applies max_position_pct with every other limit
+            return {"action": action, "quantity": quantity, "original_quantity": quantity,
+                    "confidence": confidence}
+        
+        # Apply position limit (30% of portfolio by default)
+        cash, positions = account_view(self, simulator)
+        portfolio_value = cash + positions.get("STOCK", 0) * price
+        max_position_value = portfolio_value * self.max_position_pct
         max_quantity = int(max_position_value / price) if price > 0 else 0
         
         adjusted_quantity = min(quantity, max_quantity)
@@ -87,44 +134,34 @@ Decide trade in JSON:
         return {
             "action": action,
             "quantity": adjusted_quantity,
-            "original_quantity": quantity
+            "original_quantity": quantity,
+            "confidence": confidence
         }
     
     def _execute_decision(self, decision, simulator, current_price):
         """Execute validated decision"""
-        action = decision.get("action", "hold")
-        quantity = decision.get("quantity", 0)
-        
-        if action == "buy" and quantity > 0:
-            max_affordable = int(self.cash / current_price)
-            quantity = min(quantity, max_affordable)
-            if quantity > 0:
-                simulator.submit_order(self.agent_id, "STOCK", "BUY", quantity, current_price)
-        
-        elif action == "sell" and quantity > 0:
-            current_position = self.positions.get("STOCK", 0)
-            quantity = min(quantity, current_position)
-            if quantity > 0:
-                simulator.submit_order(self.agent_id, "STOCK", "SELL", quantity, current_price)
-        
-        self.decisions.append(decision)
+        submit_decision(self, decision, simulator, current_price)
+        self._record_decision(decision)
     
     def _call_llm(self, prompt, model):
         """Call LLM API"""
         try:
-            response = openai.ChatCompletion.create(
+            content = chat_completion(
                 model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.5,
+                messages=prompt.messages,
+                temperature=self.temperature,
+                stage=prompt.name,
+                agent=self.agent_id,
                 max_tokens=300
             )
             
-            content = response.choices[0].message.content
             start = content.find("{")
             end = content.rfind("}") + 1
             
             if start != -1 and end > start:
                 return json.loads(content[start:end])
             return {}
+        except CacheMiss:
+            raise
         except:
             return {}
@@ -3,10 +3,33 @@ Simple Results Viewer
 View your analysis results without Excel
 """
 
-import pandas as pd
+import csv
 import json
 from pathlib import Path
 
+
+def read_csv_rows(filepath):
+    """Read a CSV into a list of dicts, converting numeric cells to float"""
+    rows = []
+    with open(filepath, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            for key, value in row.items():
+                try:
+                    row[key] = float(value)
+                except (TypeError, ValueError):
+                    pass
+            rows.append(row)
+    return rows
+
+
+def format_table(rows, columns):
+    """Right-aligned plain-text table (same layout as DataFrame.to_string(index=False))"""
+    widths = [max([len(col)] + [len(str(row[col])) for row in rows]) for col in columns]
+    lines = [" ".join(col.rjust(width) for col, width in zip(columns, widths))]
+    for row in rows:
+        lines.append(" ".join(str(row[col]).rjust(width) for col, width in zip(columns, widths)))
+    return "\n".join(lines)
+
 def view_results():
     """Display results in console"""
     
@@ -68,7 +91,7 @@ def view_results():
         print("PERFORMANCE COMPARISON")
         print("=" * 80)
         
-        df = pd.read_csv(csv_file)
+        rows = read_csv_rows(csv_file)
         
         # Show key metrics
         print("\nKey Metrics:")
@@ -79,24 +102,26 @@ def view_results():
                        'average_profit', 'sharpe_ratio', 'profit_factor']
         
         # Check which columns exist
-        available_cols = [col for col in display_cols if col in df.columns]
+        available_cols = [col for col in display_cols if rows and col in rows[0]]
         
         if available_cols:
-            display_df = df[available_cols].copy()
+            formats = {
+                'total_trades': lambda x: f"{x:.0f}",
+                'win_rate': lambda x: f"{x:.1f}%",
+                'total_profit': lambda x: f"${x:.2f}",
+                'average_profit': lambda x: f"${x:.2f}",
+                'sharpe_ratio': lambda x: f"{x:.3f}",
+                'profit_factor': lambda x: f"{x:.2f}",
+            }
             
-            # Format numbers
-            if 'win_rate' in display_df.columns:
-                display_df['win_rate'] = display_df['win_rate'].apply(lambda x: f"{x:.1f}%")
-            if 'total_profit' in display_df.columns:
-                display_df['total_profit'] = display_df['total_profit'].apply(lambda x: f"${x:.2f}")
-            if 'average_profit' in display_df.columns:
-                display_df['average_profit'] = display_df['average_profit'].apply(lambda x: f"${x:.2f}")
-            if 'sharpe_ratio' in display_df.columns:
-                display_df['sharpe_ratio'] = display_df['sharpe_ratio'].apply(lambda x: f"{x:.3f}")
-            if 'profit_factor' in display_df.columns:
-                display_df['profit_factor'] = display_df['profit_factor'].apply(lambda x: f"{x:.2f}")
+            display_rows = []
+            for row in rows:
+                display_rows.append({
+                    col: formats[col](row[col]) if col in formats and isinstance(row[col], float) else row[col]
+                    for col in available_cols
+                })
             
-            print(display_df.to_string(index=False))
+            print(format_table(display_rows, available_cols))
     
     # ========================================================================
     # VIEW RANKINGS
@@ -109,13 +134,13 @@ def view_results():
         print("AGENT RANKINGS")
         print("=" * 80)
         
-        rankings = pd.read_csv(rankings_file)
-        rankings = rankings.sort_values('overall_rank')
+        rankings = read_csv_rows(rankings_file)
+        rankings.sort(key=lambda row: row['overall_rank'])
         
         print("\nRanking by Overall Performance:")
         print("-" * 80)
         
-        for idx, row in rankings.iterrows():
+        for row in rankings:
             rank = int(row['overall_rank'])
             agent = row['agent']
             medal = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else "  "
@@ -217,6 +242,35 @@ def open_visualizations():
         print(f"Could not open folder: {e}")
 
 
+def watch_live(url="http://127.0.0.1:8766", refresh=2.0, once=False):
+    """Attach to a running simulation's live metrics endpoint and print updates"""
+    import time
+    from live_metrics import fetch_metrics
+
+    columns = ["name", "equity", "pnl", "pnl_pct", "trades", "win_rate", "trades_per_sec"]
+    last_seq = None
+    try:
+        while True:
+            try:
+                snapshot = fetch_metrics(url)
+            except OSError as e:
+                print(f"✗ Could not reach {url}: {e}")
+                return
+            if snapshot.get("seq") != last_seq and snapshot.get("agents"):
+                last_seq = snapshot["seq"]
+                print("\n" + "=" * 80)
+                print(f"LIVE METRICS - tick {snapshot['tick']} ({snapshot['time']})")
+                print("=" * 80)
+                print(format_table(snapshot["agents"], columns))
+                llm = snapshot.get("llm", {})
+                print("\nLLM: " + ", ".join(f"{key}={value}" for key, value in llm.items()))
+            if once:
+                return
+            time.sleep(refresh)
+    except KeyboardInterrupt:
+        pass
+
+
 if __name__ == "__main__":
     import sys
     
@@ -227,10 +281,13 @@ if __name__ == "__main__":
             open_csv_in_excel()
         elif command == "charts":
             open_visualizations()
+        elif command == "live":
+            watch_live(*sys.argv[2:3])
         else:
             print("Usage:")
             print("  python view_results.py       - Show results in console")
             print("  python view_results.py csv   - Open CSV in Excel")
             print("  python view_results.py charts - Open visualizations folder")
+            print("  python view_results.py live [url] - Watch a running simulation")
     else:
         view_results()